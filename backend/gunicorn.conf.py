@@ -0,0 +1,53 @@
+"""
+Gunicorn settings (picked up automatically when gunicorn is started from backend/)
+"""
+import os
+import shutil
+import tempfile
+
+# Prometheus client multiprocess mode: each worker writes its samples to files in this
+# directory and /api/metrics aggregates them. Must be set before workers import the app.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'options-tracker-metrics'))
+
+# Import the app once in the master and fork the workers from it, so the interpreter,
+# libraries and routes are shared copy-on-write instead of loaded again per worker.
+# Importing app does no I/O (see create_app); the hooks below do it at the right time.
+preload_app = True
+
+def on_starting(server):
+    # Start each deploy from empty counters
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+def _dispose_engines(app, close=True):
+    from models import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+def when_ready(server):
+    # Migrate once in the master before any worker is forked, then drop the master's
+    # connections so no worker inherits an open socket
+    from app import initialize_database, print_startup_config
+    app = server.app.wsgi()
+    print_startup_config(app)
+    initialize_database(app)
+    _dispose_engines(app)
+
+def post_fork(server, worker):
+    # Forget any pooled connection copied from the master without closing it (it belongs to the master)
+    _dispose_engines(server.app.wsgi(), close=False)
+
+def post_worker_init(worker):
+    from app import start_keep_alive
+    start_keep_alive(worker.wsgi)
+
+def worker_exit(server, worker):
+    # Stop the parse/simulation pools with the worker so their processes aren't orphaned
+    from utils.process_pool import shutdown_pools
+    shutdown_pools()
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,8 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from datetime import datetime, date, timedelta
+from sqlalchemy import event, inspect, or_, and_
+from sqlalchemy.orm import Session, object_session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from werkzeug.security import generate_password_hash, check_password_hash
+from utils.read_replica import RoutingSession
 
-db = SQLAlchemy()
+# RoutingSession sends @read_from_replica views' reads to DATABASE_REPLICA_URL when set
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -19,6 +24,8 @@ class User(db.Model):
     reset_token_expires = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Last commit that wrote on this user's behalf; their reads skip the replica shortly after
+    last_write_at = db.Column(db.DateTime, nullable=True)
     
     # Relationships
     accounts = db.relationship('Account', backref='user', lazy=True, cascade='all, delete-orphan')
@@ -56,6 +63,8 @@ class Account(db.Model):
     deposits = db.relationship('Deposit', backref='account', lazy=True, cascade='all, delete-orphan')
     withdrawals = db.relationship('Withdrawal', backref='account', lazy=True, cascade='all, delete-orphan')
     trades = db.relationship('Trade', backref='account', lazy=True, cascade='all, delete-orphan')
+    monthly_pnl = db.relationship('MonthlyPnl', lazy=True, cascade='all, delete-orphan')
+    snapshots = db.relationship('AccountSnapshot', lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
         return {
@@ -119,7 +128,7 @@ class StockPosition(db.Model):
     cost_basis_per_share = db.Column(db.Numeric(10, 2), nullable=False)  # Cost basis per share
     acquired_date = db.Column(db.Date, nullable=False)  # When shares were acquired
     status = db.Column(db.String(20), default='Open')  # 'Open', 'Called Away'
-    source_trade_id = db.Column(db.Integer, db.ForeignKey('trades.id'), nullable=True)  # Which trade created this position (CSP assignment or LEAPS exercise)
+    source_trade_id = db.Column(db.Integer, db.ForeignKey('trades.id'), nullable=True, index=True)  # Which trade created this position (CSP assignment or LEAPS exercise)
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -129,17 +138,31 @@ class StockPosition(db.Model):
     source_trade = db.relationship('Trade', foreign_keys=[source_trade_id], backref='created_stock_positions')
     covered_calls = db.relationship('Trade', foreign_keys='[Trade.stock_position_id]', backref='stock_position', lazy=True)
     
-    def get_available_shares(self):
+    @staticmethod
+    def committed_shares_by_position(position_ids):
+        """
+        Shares used by open covered calls, per stock position, in one grouped query.
+        Returns {position_id: shares}; positions without open covered calls are omitted.
+        """
+        if not position_ids:
+            return {}
+        rows = db.session.query(Trade.stock_position_id, db.func.sum(Trade.shares_used)).filter(
+            Trade.stock_position_id.in_(position_ids),
+            Trade.status == 'Open',
+            Trade.trade_type == 'Covered Call'
+        ).group_by(Trade.stock_position_id)
+        return {position_id: int(shares or 0) for position_id, shares in rows}
+    
+    def get_available_shares(self, committed_shares=None):
         """
         Calculate available shares (total shares minus shares used by open covered calls)
+        Pass committed_shares (from committed_shares_by_position) to skip the query.
         """
-        total_used = sum(
-            trade.shares_used for trade in self.covered_calls 
-            if trade.status == 'Open' and trade.trade_type == 'Covered Call'
-        )
-        return max(0, self.shares - total_used)
+        if committed_shares is None:
+            committed_shares = StockPosition.committed_shares_by_position([self.id]).get(self.id, 0) if self.id else 0
+        return max(0, self.shares - committed_shares)
     
-    def to_dict(self, include_available_shares=False):
+    def to_dict(self, include_available_shares=False, committed_shares=None):
         result = {
             'id': self.id,
             'account_id': self.account_id,
@@ -156,11 +179,18 @@ class StockPosition(db.Model):
         }
         
         if include_available_shares:
-            result['available_shares'] = self.get_available_shares()
-            result['shares_used'] = self.shares - self.get_available_shares()
+            available_shares = self.get_available_shares(committed_shares)
+            result['available_shares'] = available_shares
+            result['shares_used'] = self.shares - available_shares
         
         return result
 
+# Trade statuses whose P&L is realized
+REALIZED_STATUSES = ['Closed', 'Assigned', 'Called Away', 'Expired']
+
+# Trade actions that open a position (the trades that carry remaining_open_quantity)
+OPENING_ACTIONS = ['Sold to Open', 'Bought to Open']
+
 class Trade(db.Model):
     __tablename__ = 'trades'
     
@@ -207,11 +237,38 @@ class Trade(db.Model):
     stock_position_id = db.Column(db.Integer, db.ForeignKey('stock_positions.id'), nullable=True)  # Which stock position this covered call uses
     shares_used = db.Column(db.Integer, nullable=True)  # How many shares this covered call uses (contracts × 100)
     
+    # Import de-duplication: stable content hash of the source row (set only for imported trades)
+    import_fingerprint = db.Column(db.String(64), nullable=True)
+    
+    # Contracts still open on an opening trade (denormalized from the closing children;
+    # NULL for closing legs and for rows not backfilled yet)
+    remaining_open_quantity = db.Column(db.Integer, nullable=True)
+    
     # Additional fields
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_trades_account_import_fingerprint', 'account_id', 'import_fingerprint'),
+        db.Index('ix_trades_stock_position_status', 'stock_position_id', 'status'),
+        db.Index('ix_trades_open_expiration', 'account_id', 'status', 'expiration_date'),
+        db.Index('ix_trades_parent_trade_id', 'parent_trade_id'),
+    )
+    
+    @staticmethod
+    def pnl_loader_options():
+        """
+        Loader options for queries whose trades go through calculate_realized_pnl or
+        to_dict: eager-loads the parent, stock position and two levels of children
+        those walk, so the work is a fixed number of queries however many trades.
+        """
+        return (
+            selectinload(Trade.parent_trade),
+            selectinload(Trade.stock_position),
+            selectinload(Trade.child_trades).selectinload(Trade.child_trades)
+        )
+    
     def calculate_realized_pnl(self):
         """
         Calculate realized P&L for this trade based on its lifecycle.
@@ -236,7 +293,7 @@ class Trade(db.Model):
         # Scenario 1b: This is a closing trade (Bought to Close, Sold to Close, or Expired) - two-entry approach
         elif self.parent_trade_id and (self.trade_action in ['Bought to Close', 'Sold to Close', 'Expired'] or 
                                         self.status == 'Expired'):
-            parent = Trade.query.get(self.parent_trade_id)
+            parent = self.parent_trade
             if parent:
                 parent_premium = float(parent.premium) if parent.premium else 0
                 closing_premium = float(self.premium) if self.premium else 0
@@ -326,7 +383,7 @@ class Trade(db.Model):
             
             # Use actual cost basis from stock position if available
             if self.stock_position_id and self.strike_price:
-                stock_position = StockPosition.query.get(self.stock_position_id)
+                stock_position = self.stock_position
                 if stock_position and stock_position.cost_basis_per_share:
                     # Calculate stock appreciation using actual cost basis
                     # Stock appreciation: (Call Strike - Cost Basis) × Quantity × 100
@@ -342,7 +399,7 @@ class Trade(db.Model):
                 # Fallback: try to find assignment trade (legacy support)
                 assignment_trade = None
                 if self.parent_trade_id:
-                    assignment_trade = Trade.query.get(self.parent_trade_id)
+                    assignment_trade = self.parent_trade
                 
                 # If parent is assignment, calculate stock appreciation
                 if assignment_trade and assignment_trade.trade_type == 'Assignment' and assignment_trade.assignment_price and self.strike_price:
@@ -379,7 +436,7 @@ class Trade(db.Model):
                     # For closed Assignment trades, the realized P&L is the parent CSP's premium
                     # This represents the premium received from the CSP that was assigned
                     if self.parent_trade_id:
-                        parent = Trade.query.get(self.parent_trade_id)
+                        parent = self.parent_trade
                         if parent and parent.trade_type == 'CSP' and parent.premium:
                             # Use parent CSP's premium as realized P&L
                             realized_pnl = float(parent.premium)
@@ -398,8 +455,52 @@ class Trade(db.Model):
         return round(realized_pnl, 2)
     
     def get_remaining_open_quantity(self):
-        """Calculate how many contracts are still open (not yet closed)"""
-        if self.trade_action not in ['Sold to Open', 'Bought to Open']:
+        """How many contracts are still open: the stored count, derived from children if not set yet"""
+        if self.trade_action not in OPENING_ACTIONS:
+            return 0
+        if self.remaining_open_quantity is not None:
+            return self.remaining_open_quantity
+        return self.compute_remaining_open_quantity()
+    
+    def refresh_remaining_open_quantity(self):
+        """Re-derive the stored remaining_open_quantity from the closing children"""
+        if self.trade_action in OPENING_ACTIONS:
+            self.remaining_open_quantity = self.compute_remaining_open_quantity()
+        else:
+            self.remaining_open_quantity = None
+        return self.remaining_open_quantity
+    
+    def reserve_open_quantity(self, quantity):
+        """
+        Atomically take quantity contracts off remaining_open_quantity.
+        
+        A single guarded UPDATE, so two closes racing on the same trade can't both
+        succeed: the row lock serializes them and the second sees too few contracts.
+        Returns False (and changes nothing) if fewer than quantity are still open.
+        """
+        session = object_session(self) or db.session
+        if self.remaining_open_quantity is None:
+            self.refresh_remaining_open_quantity()
+            session.flush()
+        table = Trade.__table__
+        result = session.execute(
+            table.update()
+            .where(table.c.id == self.id, table.c.remaining_open_quantity >= quantity)
+            .values(remaining_open_quantity=table.c.remaining_open_quantity - quantity)
+        )
+        if result.rowcount != 1:
+            return False
+        remaining = session.execute(
+            db.select(table.c.remaining_open_quantity).where(table.c.id == self.id)
+        ).scalar()
+        set_committed_value(self, 'remaining_open_quantity', remaining)
+        # The handler set the exact count; don't re-derive it from children at commit
+        session.info.setdefault(_RESERVED_KEY, set()).add(self.id)
+        return True
+    
+    def compute_remaining_open_quantity(self):
+        """Calculate how many contracts are still open (not yet closed) from the closing children"""
+        if self.trade_action not in OPENING_ACTIONS:
             # Not an opening trade, return 0
             return 0
         
@@ -433,6 +534,17 @@ class Trade(db.Model):
         
         return max(0, remaining)  # Don't return negative
     
+    def get_pnl_date(self):
+        """
+        Date the trade's P&L counts as realized (used to bucket monthly returns).
+        close_date if set, otherwise trade_date for closed/assigned/called away/expired trades.
+        """
+        if self.close_date:
+            return self.close_date
+        if self.status in REALIZED_STATUSES and self.trade_date:
+            return self.trade_date
+        return None
+    
     def get_days_held(self):
         """Calculate number of days the position was held"""
         from datetime import date
@@ -483,7 +595,7 @@ class Trade(db.Model):
         
         # For Assignment trades, use parent CSP's premium as realized P&L for return % calculation
         if self.trade_type == 'Assignment' and self.parent_trade_id and realized_pnl == 0:
-            parent = Trade.query.get(self.parent_trade_id)
+            parent = self.parent_trade
             if parent and parent.trade_type == 'CSP' and parent.premium:
                 # Use parent CSP's premium as the realized P&L for return calculation
                 realized_pnl = float(parent.premium)
@@ -590,12 +702,33 @@ class Trade(db.Model):
         # Default to current status or Open
         return self.status or 'Open'
     
+    def corrected_status(self):
+        """
+        Status for an opening trade after its closing children changed: what
+        auto_determine_status says, unless the current status looks deliberate (open with
+        contracts left, assigned, called away, marked closed by hand, or a past trade
+        entered as still open). Other trades keep their status.
+        """
+        if self.trade_action not in OPENING_ACTIONS:
+            return self.status
+        if self.status == 'Open' and self.get_remaining_open_quantity() > 0:
+            return self.status
+        if self.status in ['Called Away', 'Assigned']:
+            return self.status
+        # Manually marked closed (e.g. expired worthless)
+        if self.status == 'Closed' and not self.close_date:
+            return self.status
+        # Historical entry that hasn't been closed yet
+        if self.status == 'Open' and self.expiration_date and self.expiration_date < date.today() and not self.close_date:
+            return self.status
+        return self.auto_determine_status()
+    
     def get_trade_chain(self):
         """
         Get the full trade chain: parent -> this -> children
         Returns a dict with parent, current, and children trades
         """
-        parent = Trade.query.get(self.parent_trade_id) if self.parent_trade_id else None
+        parent = self.parent_trade
         children = self.child_trades
         
         return {
@@ -640,7 +773,7 @@ class Trade(db.Model):
             realized_pnl = self.calculate_realized_pnl()
             # For Assignment trades, show parent CSP's premium as realized P&L
             if self.trade_type == 'Assignment' and realized_pnl == 0 and self.parent_trade_id:
-                parent = Trade.query.get(self.parent_trade_id)
+                parent = self.parent_trade
                 if parent and parent.trade_type == 'CSP' and parent.premium:
                     realized_pnl = float(parent.premium)
             result['realized_pnl'] = realized_pnl
@@ -665,3 +798,329 @@ class Trade(db.Model):
         
         return result
 
+class MonthlyPnl(db.Model):
+    """
+    Rollup of realized P&L per account and calendar month (by Trade.get_pnl_date).
+    Kept up to date by the session hooks below; rebuild with scripts/rebuild_monthly_pnl.py.
+    """
+    __tablename__ = 'monthly_pnl'
+    
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    realized_pnl = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    trade_count = db.Column(db.Integer, nullable=False, default=0)  # Trades with non-zero realized P&L
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @staticmethod
+    def bucket_trades_query(session, account_ids, year, month, through=None):
+        """
+        Opening trades (closing legs are counted by their parent) of the accounts whose P&L
+        lands in the month, or only up to and including through when given
+        """
+        start = date(year, month, 1)
+        end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        if through is not None:
+            end = min(end, through + timedelta(days=1))
+        return session.query(Trade).filter(
+            Trade.account_id.in_(account_ids),
+            ~and_(Trade.trade_action.in_(['Bought to Close', 'Sold to Close']), Trade.parent_trade_id.isnot(None)),
+            or_(
+                and_(Trade.close_date >= start, Trade.close_date < end),
+                and_(Trade.close_date.is_(None), Trade.status.in_(REALIZED_STATUSES),
+                     Trade.trade_date >= start, Trade.trade_date < end)
+            )
+        )
+    
+    @classmethod
+    def refresh_bucket(cls, session, account_id, year, month):
+        """Recompute one (account, year, month) row from its trades; drops the row if it is empty"""
+        realized_pnl = 0
+        trade_count = 0
+        for trade in cls.bucket_trades_query(session, [account_id], year, month):
+            trade_pnl = trade.calculate_realized_pnl()
+            if trade_pnl != 0:
+                realized_pnl += trade_pnl
+                trade_count += 1
+        
+        row = session.get(cls, (account_id, year, month))
+        if trade_count == 0:
+            if row is not None:
+                session.delete(row)
+            return None
+        if row is None:
+            row = cls(account_id=account_id, year=year, month=month)
+            session.add(row)
+        row.realized_pnl = round(realized_pnl, 2)
+        row.trade_count = trade_count
+        return row
+    
+    @classmethod
+    def rebuild(cls, session, account_ids=None):
+        """
+        Recompute the rollup from scratch (all accounts, or only account_ids).
+        Returns the number of month rows written. The caller commits.
+        """
+        delete_query = session.query(cls)
+        trade_query = session.query(Trade)
+        if account_ids is not None:
+            delete_query = delete_query.filter(cls.account_id.in_(account_ids))
+            trade_query = trade_query.filter(Trade.account_id.in_(account_ids))
+        delete_query.delete(synchronize_session=False)
+        
+        buckets = set()
+        for trade in trade_query:
+            pnl_date = trade.get_pnl_date()
+            if pnl_date:
+                buckets.add((trade.account_id, pnl_date.year, pnl_date.month))
+        
+        rows = 0
+        for account_id, year, month in sorted(buckets):
+            if cls.refresh_bucket(session, account_id, year, month) is not None:
+                rows += 1
+        return rows
+    
+    def to_dict(self):
+        return {
+            'account_id': self.account_id,
+            'year': self.year,
+            'month': self.month,
+            'realized_pnl': float(self.realized_pnl) if self.realized_pnl else 0,
+            'trade_count': self.trade_count
+        }
+
+class AccountSnapshot(db.Model):
+    """
+    End-of-day account values for the equity curve (see utils/equity_snapshots.py).
+    """
+    __tablename__ = 'account_snapshots'
+    
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), primary_key=True)
+    snapshot_date = db.Column(db.Date, primary_key=True)
+    total_capital = db.Column(db.Numeric(15, 2), nullable=False, default=0)  # Initial balance + deposits - withdrawals + realized P&L
+    realized_pnl = db.Column(db.Numeric(15, 2), nullable=False, default=0)  # Realized P&L to date
+    open_premium = db.Column(db.Numeric(15, 2), nullable=False, default=0)  # Premium of positions open at end of day
+    capital_at_risk = db.Column(db.Numeric(15, 2), nullable=False, default=0)  # Strike (or assignment price) x open contracts x 100
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'account_id': self.account_id,
+            'date': self.snapshot_date.isoformat(),
+            'total_capital': float(self.total_capital) if self.total_capital else 0,
+            'realized_pnl': float(self.realized_pnl) if self.realized_pnl else 0,
+            'open_premium': float(self.open_premium) if self.open_premium else 0,
+            'capital_at_risk': float(self.capital_at_risk) if self.capital_at_risk else 0
+        }
+
+# ---------------------------------------------------------------------------
+# remaining_open_quantity maintenance
+#
+# The close handlers take contracts off with Trade.reserve_open_quantity. Every
+# other write (new trades, imports, edits, deletes) is caught here: each flush
+# records the opening trades whose count may have changed (the trade itself when
+# a field the count depends on changes, and the old and new parent of any written
+# closing leg) and they are re-derived from their children just before commit,
+# along with their status (Trade.corrected_status) unless the transaction set it.
+# Registered ahead of the monthly_pnl hooks so those see the refreshed rows.
+# ---------------------------------------------------------------------------
+
+_REMAINING_KEY = 'remaining_open_pending'
+_RESERVED_KEY = 'remaining_open_reserved'
+_STATUS_SET_KEY = 'status_set_explicitly'
+_REMAINING_FIELDS = ('trade_action', 'contract_quantity', 'close_date', 'close_premium', 'status', 'parent_trade_id')
+
+@event.listens_for(Session, 'before_flush')
+def _collect_remaining_open_changes(session, flush_context, instances):
+    pending = session.info.setdefault(_REMAINING_KEY, set())
+    
+    for obj in session.new:
+        if isinstance(obj, Trade):
+            if obj.parent_trade_id:
+                pending.add(obj.parent_trade_id)
+            # A new trade has no children in the database yet
+            if obj.remaining_open_quantity is None and obj.trade_action in OPENING_ACTIONS:
+                obj.remaining_open_quantity = obj.compute_remaining_open_quantity()
+    
+    explicit = session.info.setdefault(_STATUS_SET_KEY, set())
+    for obj in session.dirty:
+        if isinstance(obj, Trade) and obj.id is not None:
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in _REMAINING_FIELDS):
+                pending.add(obj.id)
+                if obj.parent_trade_id:
+                    pending.add(obj.parent_trade_id)
+            if state.attrs['status'].history.has_changes():
+                explicit.add(obj.id)
+    
+    # Old parents of closing legs that were moved or deleted
+    changed_ids = [obj.id for obj in list(session.dirty) + list(session.deleted)
+                   if isinstance(obj, Trade) and obj.id is not None]
+    if changed_ids:
+        table = Trade.__table__
+        old_parents = session.connection().execute(
+            db.select(table.c.parent_trade_id)
+            .where(table.c.id.in_(changed_ids), table.c.parent_trade_id.isnot(None))
+        )
+        pending.update(parent_id for (parent_id,) in old_parents)
+
+@event.listens_for(Session, 'before_commit')
+def _refresh_remaining_open(session):
+    # before_commit runs ahead of commit's own flush, so flush here to collect those changes too
+    session.flush()
+    pending = session.info.pop(_REMAINING_KEY, set())
+    pending -= session.info.pop(_RESERVED_KEY, set())
+    explicit = session.info.pop(_STATUS_SET_KEY, set())
+    if not pending:
+        return
+    
+    for trade in session.query(Trade).filter(Trade.id.in_(pending), Trade.trade_action.in_(OPENING_ACTIONS)):
+        # Loaded children may predate this transaction's inserts and deletes
+        session.expire(trade, ['child_trades'])
+        trade.refresh_remaining_open_quantity()
+        # Leave statuses this transaction set itself (the close handlers, edits) alone
+        if trade.id not in explicit:
+            status = trade.corrected_status()
+            if status != trade.status:
+                trade.status = status
+    session.flush()
+    session.info.pop(_REMAINING_KEY, None)
+    session.info.pop(_STATUS_SET_KEY, None)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_remaining_open_changes(session):
+    session.info.pop(_REMAINING_KEY, None)
+    session.info.pop(_RESERVED_KEY, None)
+    session.info.pop(_STATUS_SET_KEY, None)
+
+# ---------------------------------------------------------------------------
+# Incremental monthly_pnl maintenance
+#
+# Every flush records which months may have changed: the old and new P&L dates of
+# each written trade, its parent (a closing leg changes the parent's P&L) and any
+# covered call on a changed stock position (cost basis feeds called-away P&L).
+# Just before commit those months are recomputed, so trade writes, closes and
+# imports keep the rollup current without each route having to remember to.
+# ---------------------------------------------------------------------------
+
+_PENDING_KEY = 'monthly_pnl_pending'
+
+def _add_bucket(pending, account_id, pnl_date):
+    if account_id is not None and pnl_date is not None:
+        pending['buckets'].add((account_id, pnl_date.year, pnl_date.month))
+
+@event.listens_for(Session, 'before_flush')
+def _collect_monthly_pnl_changes(session, flush_context, instances):
+    pending = session.info.setdefault(_PENDING_KEY, {'buckets': set(), 'trade_ids': set(), 'stock_position_ids': set()})
+    
+    # New values of written trades
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Trade):
+            _add_bucket(pending, obj.account_id, obj.close_date)
+            _add_bucket(pending, obj.account_id, obj.trade_date)
+            if obj.parent_trade_id:
+                pending['trade_ids'].add(obj.parent_trade_id)
+        elif isinstance(obj, StockPosition) and obj.id is not None:
+            pending['stock_position_ids'].add(obj.id)
+    
+    # Old values still in the database (attributes are usually expired after a commit,
+    # so the instance itself doesn't know what it is being changed from)
+    changed_ids = [obj.id for obj in list(session.dirty) + list(session.deleted)
+                   if isinstance(obj, Trade) and obj.id is not None]
+    if changed_ids:
+        table = Trade.__table__
+        old_rows = session.connection().execute(
+            db.select(table.c.account_id, table.c.close_date, table.c.trade_date, table.c.parent_trade_id)
+            .where(table.c.id.in_(changed_ids))
+        )
+        for account_id, close_date, trade_date, parent_trade_id in old_rows:
+            _add_bucket(pending, account_id, close_date)
+            _add_bucket(pending, account_id, trade_date)
+            if parent_trade_id:
+                pending['trade_ids'].add(parent_trade_id)
+
+@event.listens_for(Session, 'before_commit')
+def _refresh_monthly_pnl(session):
+    # before_commit runs ahead of commit's own flush, so flush here to collect those changes too
+    session.flush()
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending or not any(pending.values()):
+        return
+    
+    related = []
+    if pending['trade_ids']:
+        related += session.query(Trade).filter(Trade.id.in_(pending['trade_ids'])).all()
+    if pending['stock_position_ids']:
+        related += session.query(Trade).filter(Trade.stock_position_id.in_(pending['stock_position_ids'])).all()
+    for trade in related:
+        _add_bucket(pending, trade.account_id, trade.close_date)
+        _add_bucket(pending, trade.account_id, trade.trade_date)
+    
+    for account_id, year, month in sorted(pending['buckets']):
+        MonthlyPnl.refresh_bucket(session, account_id, year, month)
+        # The same changes move the equity curve from that month on
+        _mark_snapshots_stale(session, account_id, date(year, month, 1))
+    # Flush the rollup rows now; the hook above then finds nothing new to recompute
+    session.flush()
+    session.info.pop(_PENDING_KEY, None)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_monthly_pnl_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+
+# ---------------------------------------------------------------------------
+# account_snapshots invalidation
+#
+# A snapshot is only valid while nothing on or before its date changes. Trade
+# changes are dated by the monthly_pnl hooks above (from the first of each
+# changed month); cash flows and initial balances are collected here. Just before
+# commit every account's snapshots from its earliest changed date on are deleted,
+# and the equity curve recomputes those days until the snapshot job records them.
+# ---------------------------------------------------------------------------
+
+_SNAPSHOTS_STALE_KEY = 'snapshots_stale_from'
+
+def _mark_snapshots_stale(session, account_id, day):
+    if account_id is None or day is None:
+        return
+    stale = session.info.setdefault(_SNAPSHOTS_STALE_KEY, {})
+    if account_id not in stale or day < stale[account_id]:
+        stale[account_id] = day
+
+@event.listens_for(Session, 'before_flush')
+def _collect_snapshot_changes(session, flush_context, instances):
+    # New values of written cash flows
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Deposit):
+            _mark_snapshots_stale(session, obj.account_id, obj.deposit_date)
+        elif isinstance(obj, Withdrawal):
+            _mark_snapshots_stale(session, obj.account_id, obj.withdrawal_date)
+        elif isinstance(obj, Account) and obj.id is not None:
+            if inspect(obj).attrs['initial_balance'].history.has_changes():
+                _mark_snapshots_stale(session, obj.id, date.min)
+    
+    # Old values still in the database
+    for model, date_column in ((Deposit, Deposit.deposit_date), (Withdrawal, Withdrawal.withdrawal_date)):
+        changed_ids = [obj.id for obj in list(session.dirty) + list(session.deleted)
+                       if isinstance(obj, model) and obj.id is not None]
+        if changed_ids:
+            old_rows = session.connection().execute(
+                db.select(model.account_id, date_column).where(model.id.in_(changed_ids))
+            )
+            for account_id, day in old_rows:
+                _mark_snapshots_stale(session, account_id, day)
+
+@event.listens_for(Session, 'before_commit')
+def _invalidate_snapshots(session):
+    # Registered after _refresh_monthly_pnl, which has flushed and dated the trade changes
+    stale = session.info.pop(_SNAPSHOTS_STALE_KEY, None)
+    if not stale:
+        return
+    
+    table = AccountSnapshot.__table__
+    for account_id, day in stale.items():
+        session.execute(table.delete().where(table.c.account_id == account_id, table.c.snapshot_date >= day))
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_snapshot_changes(session):
+    session.info.pop(_SNAPSHOTS_STALE_KEY, None)
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Account, Deposit, Withdrawal, Trade
+from models import db, Account, Deposit, Withdrawal
 from datetime import datetime
+from utils.capital_utils import account_capital_query
 
 accounts_bp = Blueprint('accounts', __name__)
 
@@ -10,38 +11,21 @@ def get_user_id():
     user_id_str = get_jwt_identity()
     return int(user_id_str) if user_id_str else None
 
+def get_accounts_with_capital(user_id):
+    """List a user's accounts as dicts with total_capital (initial balance + deposits - withdrawals + realized P&L)"""
+    account_dicts = []
+    for account, total_capital in account_capital_query().filter(Account.user_id == user_id).order_by(Account.id):
+        account_dict = account.to_dict()
+        account_dict['total_capital'] = round(float(total_capital or 0), 2)
+        account_dicts.append(account_dict)
+    return account_dicts
+
 @accounts_bp.route('', methods=['GET'])
 @jwt_required()
 def get_accounts():
     user_id = get_user_id()
-    accounts = Account.query.filter_by(user_id=user_id).all()
-    
-    # Add total_capital to each account (including realized P&L)
-    account_dicts = []
-    for account in accounts:
-        account_dict = account.to_dict()
-        # Calculate total capital (initial balance + deposits + realized P&L)
-        total = float(account.initial_balance) if account.initial_balance else 0
-        
-        # Add deposits
-        for deposit in account.deposits:
-            total += float(deposit.amount) if deposit.amount else 0
-        
-        # Subtract withdrawals
-        for withdrawal in account.withdrawals:
-            total -= float(withdrawal.amount) if withdrawal.amount else 0
-        
-        # Add realized P&L from closed trades
-        realized_pnl = 0
-        for trade in account.trades:
-            if trade.status in ['Closed', 'Assigned', 'Expired']:
-                realized_pnl += trade.calculate_realized_pnl()
-        
-        total += realized_pnl
-        account_dict['total_capital'] = round(total, 2)
-        account_dicts.append(account_dict)
-    
-    return jsonify(account_dicts), 200
+    # Totals for all accounts come back in a single query (see account_capital_query)
+    return jsonify(get_accounts_with_capital(user_id)), 200
 
 @accounts_bp.route('', methods=['POST'])
 @jwt_required()
@@ -106,31 +90,15 @@ def create_account():
 @jwt_required()
 def get_account(account_id):
     user_id = get_user_id()
-    account = Account.query.filter_by(id=account_id, user_id=user_id).first()
+    # Same single query as the list, so both report the same total_capital
+    row = account_capital_query().filter(Account.id == account_id, Account.user_id == user_id).first()
     
-    if not account:
+    if not row:
         return jsonify({'error': 'Account not found'}), 404
     
+    account, total_capital = row
     account_dict = account.to_dict()
-    # Calculate total capital (initial balance + deposits - withdrawals + realized P&L)
-    total = float(account.initial_balance) if account.initial_balance else 0
-    
-    # Add deposits
-    for deposit in account.deposits:
-        total += float(deposit.amount) if deposit.amount else 0
-    
-    # Subtract withdrawals
-    for withdrawal in account.withdrawals:
-        total -= float(withdrawal.amount) if withdrawal.amount else 0
-    
-    # Add realized P&L from closed trades
-    realized_pnl = 0
-    for trade in account.trades:
-        if trade.status in ['Closed', 'Assigned', 'Expired']:
-            realized_pnl += trade.calculate_realized_pnl()
-    
-    total += realized_pnl
-    account_dict['total_capital'] = round(total, 2)
+    account_dict['total_capital'] = round(float(total_capital or 0), 2)
     
     return jsonify(account_dict), 200
 
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, current_app, url_for
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from models import db, User
+from utils.metrics import record_email
 from datetime import datetime, timedelta
 import secrets
 import string
@@ -66,9 +67,12 @@ def send_password_reset_email(user, token):
                 mail = current_app.extensions.get('mail')
                 if mail:
                     mail.send(msg)
+                    record_email('password_reset', 'sent')
+                else:
+                    record_email('password_reset', 'not_configured')
             except Exception as e:
                 # Silently fail - email sending is not critical
-                pass
+                record_email('password_reset', 'failed')
         
         email_thread = threading.Thread(target=send_email_async)
         email_thread.daemon = True
@@ -127,9 +131,12 @@ def send_verification_email(user, token):
                 mail = current_app.extensions.get('mail')
                 if mail:
                     mail.send(msg)
+                    record_email('verification', 'sent')
+                else:
+                    record_email('verification', 'not_configured')
             except Exception as e:
                 # Silently fail - email sending is not critical for registration
-                pass
+                record_email('verification', 'failed')
         
         email_thread = threading.Thread(target=send_email_async)
         email_thread.daemon = True
@@ -1,14 +1,24 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Trade, Account, Deposit, Withdrawal
+from models import db, Trade, Account, MonthlyPnl, StockPosition
+from utils.equity_snapshots import load_snapshot_rows, SNAPSHOT_FIELDS
+from utils.wheel_cycles import get_wheel_cycles
+from utils.mark_to_market import mark_open_positions, open_option_legs_query, unrealized_pnl_by_trade
+from utils.option_pricing import DEFAULT_VOLATILITY, DEFAULT_RISK_FREE_RATE
+from utils.stress_test import run_stress_test, DEFAULT_SHOCKS, MAX_SCENARIOS
+from utils.monte_carlo import cached_simulation, DEFAULT_PATHS, MAX_PATHS
+from utils.capital_utils import get_total_capital_by_account, get_capital_at_date_by_account
+from utils.metrics import record_cache_lookup, record_finnhub_call
+from utils.read_replica import read_from_replica
 from datetime import datetime, timedelta, date
 from collections import defaultdict
+from sqlalchemy.orm import selectinload
 import requests
 import time
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
-def calculate_wheel_pnl(trades):
+def calculate_wheel_pnl(trades, marks=None):
     """
     Calculate PNL for wheel strategy trades using the Trade model's calculate_realized_pnl method.
     This properly handles the full wheel cycle:
@@ -17,7 +27,12 @@ def calculate_wheel_pnl(trades):
     - CSP assigned → stock position created
     - Covered calls on assigned shares → closed early or expired
     - Covered calls assigned → shares called away (premium + stock appreciation)
+    
+    marks: optional dict of trade id -> marked-to-market unrealized P&L (see
+    utils.mark_to_market.unrealized_pnl_by_trade); open trades without a mark fall
+    back to their opening premium.
     """
+    marks = marks or {}
     realized_pnl = 0
     unrealized_pnl = 0
     
@@ -30,8 +45,11 @@ def calculate_wheel_pnl(trades):
             # Realized P&L for closed/assigned/called away trades
             realized_pnl += trade_realized
         else:
-            # Unrealized P&L for open trades
-            # For open positions, use the premium (will be realized when closed)
+            # Unrealized P&L for open trades: the mark if we have one, else the premium
+            # (will be realized when closed)
+            if trade.id in marks:
+                unrealized_pnl += marks[trade.id]
+                continue
             net_premium = float(trade.premium) if trade.premium else 0
             unrealized_pnl += net_premium
     
@@ -54,22 +72,7 @@ def get_total_capital_at_date(account_id, user_id, target_date):
     if not account:
         return 0
     
-    # Start with initial balance
-    total = float(account.initial_balance) if account.initial_balance else 0
-    
-    # Add deposits up to target_date
-    deposits = Deposit.query.filter_by(account_id=account_id).filter(Deposit.deposit_date <= target_date).all()
-    for deposit in deposits:
-        total += float(deposit.amount) if deposit.amount else 0
-    
-    # Subtract withdrawals up to target_date
-    withdrawals = Withdrawal.query.filter_by(account_id=account_id).filter(Withdrawal.withdrawal_date <= target_date).all()
-    for withdrawal in withdrawals:
-        total -= float(withdrawal.amount) if withdrawal.amount else 0
-    
-    # Add realized P&L from closed trades up to target_date
-    # Get all trades for this account
-    trades = Trade.query.filter_by(account_id=account_id).all()
+    trades = Trade.query.options(*Trade.pnl_loader_options()).filter_by(account_id=account_id).all()
     
     # Filter out closing trades (two-entry approach) - only include opening trades for P&L calculation
     filtered_trades = [
@@ -77,27 +80,7 @@ def get_total_capital_at_date(account_id, user_id, target_date):
         if not (trade.trade_action in ['Bought to Close', 'Sold to Close'] and trade.parent_trade_id)
     ]
     
-    # Calculate realized P&L from closed trades up to target_date
-    realized_pnl = 0
-    for trade in filtered_trades:
-        # Only count realized P&L from closed/assigned/called away/expired trades
-        if trade.status in ['Closed', 'Assigned', 'Called Away', 'Expired']:
-            # Determine the date when P&L was realized
-            pnl_date = None
-            if trade.close_date:
-                pnl_date = trade.close_date
-            elif trade.status in ['Closed', 'Assigned', 'Called Away', 'Expired'] and trade.trade_date:
-                pnl_date = trade.trade_date
-            
-            # Only include P&L if it was realized on or before target_date
-            if pnl_date and pnl_date <= target_date:
-                trade_realized = trade.calculate_realized_pnl()
-                realized_pnl += trade_realized
-    
-    # Add realized P&L to total capital (these profits are now working in the account)
-    total += realized_pnl
-    
-    return total
+    return get_capital_at_date_by_account([account_id], target_date, filtered_trades)[account_id]
 
 def get_total_capital(account_id, user_id):
     """
@@ -112,6 +95,7 @@ def get_total_capital(account_id, user_id):
 
 @dashboard_bp.route('/positions', methods=['GET'])
 @jwt_required()
+@read_from_replica
 def get_positions():
     user_id = get_jwt_identity()
     account_id = request.args.get('account_id', type=int)
@@ -124,7 +108,7 @@ def get_positions():
     if not account_ids:
         return jsonify({'open': [], 'closed': []}), 200
     
-    query = Trade.query.filter(Trade.account_id.in_(account_ids))
+    query = Trade.query.options(*Trade.pnl_loader_options()).filter(Trade.account_id.in_(account_ids))
     
     if account_id and account_id in account_ids:
         query = query.filter_by(account_id=account_id)
@@ -152,6 +136,7 @@ def get_positions():
 
 @dashboard_bp.route('/pnl', methods=['GET'])
 @jwt_required()
+@read_from_replica
 def get_pnl():
     user_id = get_jwt_identity()
     account_id = request.args.get('account_id', type=int)
@@ -193,7 +178,7 @@ def get_pnl():
         date_filter = capital_start_date
     # For 'all', date_filter and capital_start_date remain None
     
-    query = Trade.query.filter(Trade.account_id.in_(account_ids))
+    query = Trade.query.options(*Trade.pnl_loader_options()).filter(Trade.account_id.in_(account_ids))
     
     if account_id and account_id in account_ids:
         query = query.filter_by(account_id=account_id)
@@ -211,6 +196,8 @@ def get_pnl():
         if not (trade.trade_action in ['Bought to Close', 'Sold to Close'] and trade.parent_trade_id)
     ]
     
+    opening_trades = filtered_trades  # Capital at the period start counts all of them
+    
     # For period-based calculations, filter by when P&L was realized (not when trade was opened)
     # This matches the logic used in monthly returns
     if date_filter:
@@ -248,14 +235,15 @@ def get_pnl():
         
         filtered_trades = period_filtered_trades
     
-    # Calculate PNL using improved wheel strategy logic
+    # Calculate PNL using improved wheel strategy logic, open trades at their marks
     realized_pnl = 0
     unrealized_pnl = 0
+    marks = _open_trade_marks(filtered_trades)
     
     # Group trades by account and symbol
     for acc_id in accounts_to_calc:
         acc_trades = [t for t in filtered_trades if t.account_id == acc_id]
-        acc_realized, acc_unrealized = calculate_wheel_pnl(acc_trades)
+        acc_realized, acc_unrealized = calculate_wheel_pnl(acc_trades, marks)
         realized_pnl += acc_realized
         unrealized_pnl += acc_unrealized
     
@@ -264,13 +252,11 @@ def get_pnl():
     # For 'all', use current total capital
     total_capital = 0
     if capital_start_date:
-        # Use historical capital at start of period
-        for acc_id in accounts_to_calc:
-            total_capital += get_total_capital_at_date(acc_id, user_id, capital_start_date)
+        # Use historical capital at start of period (one query for every account)
+        total_capital = sum(get_capital_at_date_by_account(accounts_to_calc, capital_start_date, opening_trades).values())
     else:
-        # Use current total capital for 'all' period
-        for acc_id in accounts_to_calc:
-            total_capital += get_total_capital(acc_id, user_id)
+        # Use current total capital for 'all' period (one query for every account)
+        total_capital = sum(get_total_capital_by_account(accounts_to_calc).values())
     
     total_pnl = realized_pnl + unrealized_pnl
     rate_of_return = (total_pnl / total_capital * 100) if total_capital > 0 else 0
@@ -286,6 +272,7 @@ def get_pnl():
 
 @dashboard_bp.route('/summary', methods=['GET'])
 @jwt_required()
+@read_from_replica
 def get_summary():
     user_id = get_jwt_identity()
     account_id = request.args.get('account_id', type=int)
@@ -302,7 +289,7 @@ def get_summary():
             'closed_positions': 0
         }), 200
     
-    query = Trade.query.filter(Trade.account_id.in_(account_ids))
+    query = Trade.query.options(*Trade.pnl_loader_options()).filter(Trade.account_id.in_(account_ids))
     
     if account_id and account_id in account_ids:
         query = query.filter_by(account_id=account_id)
@@ -315,12 +302,13 @@ def get_summary():
         if not (trade.trade_action in ['Bought to Close', 'Sold to Close'] and trade.parent_trade_id)
     ]
     
-    # Get PNL for different periods
-    week_pnl = get_pnl_data(user_id, account_id, 'week', account_ids)
-    month_pnl = get_pnl_data(user_id, account_id, 'month', account_ids)
-    year_pnl = get_pnl_data(user_id, account_id, 'year', account_ids)
-    ytd_pnl = get_pnl_data(user_id, account_id, 'ytd', account_ids)
-    all_pnl = get_pnl_data(user_id, account_id, 'all', account_ids)
+    # Get PNL for different periods (open trades valued once, at their marks)
+    marks = _open_trade_marks(filtered_trades)
+    week_pnl = get_pnl_data(user_id, account_id, 'week', account_ids, all_trades, marks)
+    month_pnl = get_pnl_data(user_id, account_id, 'month', account_ids, all_trades, marks)
+    year_pnl = get_pnl_data(user_id, account_id, 'year', account_ids, all_trades, marks)
+    ytd_pnl = get_pnl_data(user_id, account_id, 'ytd', account_ids, all_trades, marks)
+    all_pnl = get_pnl_data(user_id, account_id, 'all', account_ids, all_trades, marks)
     
     return jsonify({
         'total_accounts': len(accounts),
@@ -336,8 +324,13 @@ def get_summary():
         }
     }), 200
 
-def get_pnl_data(user_id, account_id, period, account_ids):
-    """Helper function to get PNL data for a period"""
+def get_pnl_data(user_id, account_id, period, account_ids, trades=None, marks=None):
+    """
+    Helper function to get PNL data for a period.
+    trades: the user's trades (filtered to account_id if given), loaded with
+    Trade.pnl_loader_options(), when the caller already has them.
+    marks: the open trades' marks (see _open_trade_marks), likewise.
+    """
     now = datetime.now().date()
     date_filter = None
     capital_start_date = None  # Date to calculate capital at start of period
@@ -357,13 +350,14 @@ def get_pnl_data(user_id, account_id, period, account_ids):
         date_filter = capital_start_date
     # For 'all', date_filter and capital_start_date remain None
     
-    query = Trade.query.filter(Trade.account_id.in_(account_ids))
-    
-    if account_id and account_id in account_ids:
-        query = query.filter_by(account_id=account_id)
-    
-    # Don't filter by trade_date here - we'll filter by P&L realization date instead
-    trades = query.all()
+    if trades is None:
+        query = Trade.query.options(*Trade.pnl_loader_options()).filter(Trade.account_id.in_(account_ids))
+        
+        if account_id and account_id in account_ids:
+            query = query.filter_by(account_id=account_id)
+        
+        # Don't filter by trade_date here - we'll filter by P&L realization date instead
+        trades = query.all()
     
     # Filter out closing trades (two-entry approach) - only include opening trades for P&L calculation
     # Closing trades' P&L is already included in their parent trade's P&L calculation
@@ -372,6 +366,8 @@ def get_pnl_data(user_id, account_id, period, account_ids):
         if not (trade.trade_action in ['Bought to Close', 'Sold to Close'] and trade.parent_trade_id)
     ]
     
+    opening_trades = filtered_trades  # Capital at the period start counts all of them
+    
     # For period-based calculations, filter by when P&L was realized (not when trade was opened)
     # This matches the logic used in monthly returns
     if date_filter:
@@ -397,8 +393,10 @@ def get_pnl_data(user_id, account_id, period, account_ids):
         
         filtered_trades = period_filtered_trades
     
-    # Use improved wheel PNL calculation
-    realized, unrealized = calculate_wheel_pnl(filtered_trades)
+    # Use improved wheel PNL calculation, open trades at their marks
+    if marks is None:
+        marks = _open_trade_marks(filtered_trades)
+    realized, unrealized = calculate_wheel_pnl(filtered_trades, marks)
     
     accounts_to_calc = [account_id] if account_id and account_id in account_ids else account_ids
     
@@ -406,11 +404,11 @@ def get_pnl_data(user_id, account_id, period, account_ids):
     # For period-based calculations, use capital at start of period
     # For 'all', use current total capital
     if capital_start_date:
-        # Use historical capital at start of period
-        total_capital = sum([get_total_capital_at_date(acc_id, user_id, capital_start_date) for acc_id in accounts_to_calc])
+        # Use historical capital at start of period (one query for every account)
+        total_capital = sum(get_capital_at_date_by_account(accounts_to_calc, capital_start_date, opening_trades).values())
     else:
-        # Use current total capital for 'all' period
-        total_capital = sum([get_total_capital(acc_id, user_id) for acc_id in accounts_to_calc])
+        # Use current total capital for 'all' period (one query for every account)
+        total_capital = sum(get_total_capital_by_account(accounts_to_calc).values())
     
     total = realized + unrealized
     ror = (total / total_capital * 100) if total_capital > 0 else 0
@@ -424,6 +422,7 @@ def get_pnl_data(user_id, account_id, period, account_ids):
 
 @dashboard_bp.route('/monthly-returns', methods=['GET'])
 @jwt_required()
+@read_from_replica
 def get_monthly_returns():
     """
     Get monthly returns breakdown with YTD summary.
@@ -447,66 +446,59 @@ def get_monthly_returns():
             }
         }), 200
     
-    query = Trade.query.filter(Trade.account_id.in_(account_ids))
-    
     if account_id and account_id in account_ids:
-        query = query.filter_by(account_id=account_id)
         accounts_to_calc = [account_id]
     else:
         accounts_to_calc = account_ids
     
-    # Get all trades (we'll filter by close_date in Python for better control)
-    all_trades = query.all()
-    
-    # Filter out closing trades (two-entry approach) - only include opening trades for P&L calculation
-    # Closing trades' P&L is already included in their parent trade's P&L calculation
-    filtered_trades = [
-        trade for trade in all_trades 
-        if not (trade.trade_action in ['Bought to Close', 'Sold to Close'] and trade.parent_trade_id)
-    ]
-    
     # Calculate total capital for return percentage calculation
-    total_capital = sum([get_total_capital(acc_id, user_id) for acc_id in accounts_to_calc])
-    
-    # Group realized P&L by year-month based on close_date
-    # For trades without close_date but with status 'Closed', use trade_date
-    monthly_pnl = defaultdict(float)
-    monthly_trades = defaultdict(list)
+    total_capital = sum(get_total_capital_by_account(accounts_to_calc).values())
     
     today = date.today()
     current_year = today.year
     current_month = today.month
     
-    # Calculate date threshold for last N months
+    # Calculate month threshold for last N months
     threshold_date = today - timedelta(days=months_back * 30)  # Approximate
+    threshold_index = threshold_date.year * 12 + threshold_date.month
     
-    for trade in filtered_trades:
-        # Determine the date to use for monthly grouping
-        # Use close_date if available, otherwise use trade_date for closed trades
-        pnl_date = None
-        if trade.close_date:
-            pnl_date = trade.close_date
-        elif trade.status in ['Closed', 'Assigned', 'Called Away', 'Expired'] and trade.trade_date:
-            pnl_date = trade.trade_date
-        
-        if not pnl_date:
-            continue  # Skip trades without a date
-        
-        # Only include trades within the requested time range
-        if pnl_date < threshold_date:
-            continue
+    # Realized P&L is pre-aggregated per account and month (by close_date, or trade_date for
+    # trades closed without one) in the monthly_pnl rollup, so this reads one row per
+    # account-month instead of recomputing every trade's P&L
+    rollup_rows = MonthlyPnl.query.filter(MonthlyPnl.account_id.in_(accounts_to_calc)).all()
+    
+    monthly_pnl = defaultdict(float)
+    monthly_trade_counts = defaultdict(int)
+    ytd_pnl = 0
+    ytd_trade_count = 0
+    current_month_accounts = []
+    
+    for row in rollup_rows:
+        row_pnl = float(row.realized_pnl) if row.realized_pnl else 0
         
-        # Calculate realized P&L for this trade
-        realized_pnl = trade.calculate_realized_pnl()
+        # Only include months within the requested time range
+        if row.year * 12 + row.month >= threshold_index:
+            monthly_pnl[(row.year, row.month)] += row_pnl
+            monthly_trade_counts[(row.year, row.month)] += row.trade_count
         
-        if realized_pnl != 0:  # Only include trades with realized P&L
-            year_month = (pnl_date.year, pnl_date.month)
-            monthly_pnl[year_month] += realized_pnl
-            monthly_trades[year_month].append({
-                'id': trade.id,
-                'symbol': trade.symbol,
-                'pnl': realized_pnl
-            })
+        # YTD (Year-to-Date): January 1 of current year to today
+        if row.year == current_year and row.month < current_month:
+            ytd_pnl += row_pnl
+            ytd_trade_count += row.trade_count
+        elif (row.year, row.month) == (current_year, current_month):
+            current_month_accounts.append(row.account_id)
+    
+    # The current month's rows also hold closes dated later this month, so YTD
+    # sums that month from its trades up to today instead
+    if current_month_accounts:
+        month_trades = MonthlyPnl.bucket_trades_query(
+            db.session, current_month_accounts, current_year, current_month, through=today
+        ).options(*Trade.pnl_loader_options())
+        for trade in month_trades:
+            trade_pnl = trade.calculate_realized_pnl()
+            if trade_pnl != 0:
+                ytd_pnl += trade_pnl
+                ytd_trade_count += 1
     
     # Convert to sorted list format with year-month labels
     monthly_returns = []
@@ -522,29 +514,9 @@ def get_monthly_returns():
             'year_month': f"{month_name} {year}",
             'total_return': round(month_pnl, 2),
             'return_percentage': round(return_pct, 2),
-            'trade_count': len(monthly_trades[(year, month)])
+            'trade_count': monthly_trade_counts[(year, month)]
         })
     
-    # Calculate YTD (Year-to-Date) return
-    # Sum all returns from January 1 of current year to today
-    ytd_pnl = 0
-    ytd_trades = []
-    year_start = date(current_year, 1, 1)
-    
-    # Use filtered_trades (already filtered above) to avoid double-counting closing trades
-    for trade in filtered_trades:
-        pnl_date = None
-        if trade.close_date:
-            pnl_date = trade.close_date
-        elif trade.status in ['Closed', 'Assigned', 'Called Away', 'Expired'] and trade.trade_date:
-            pnl_date = trade.trade_date
-        
-        if pnl_date and year_start <= pnl_date <= today:
-            realized_pnl = trade.calculate_realized_pnl()
-            if realized_pnl != 0:
-                ytd_pnl += realized_pnl
-                ytd_trades.append(trade.id)
-    
     ytd_return_pct = (ytd_pnl / total_capital * 100) if total_capital > 0 else 0
     
     return jsonify({
@@ -553,13 +525,437 @@ def get_monthly_returns():
             'total_return': round(ytd_pnl, 2),
             'return_percentage': round(ytd_return_pct, 2),
             'year': current_year,
-            'trade_count': len(ytd_trades)
+            'trade_count': ytd_trade_count
         },
         'total_capital': round(total_capital, 2)
     }), 200
 
+@dashboard_bp.route('/equity-curve', methods=['GET'])
+@jwt_required()
+@read_from_replica
+def get_equity_curve():
+    """
+    Get daily account value series for charting.
+    Served from account_snapshots (recorded by scripts/record_equity_snapshots.py);
+    days not recorded yet are computed on the fly without being stored.
+    
+    Query params: account_id, period ('month', 'year', 'ytd', 'last_year', 'all'; default 'year'),
+    or start_date / end_date (YYYY-MM-DD) to override the period.
+    """
+    user_id = get_jwt_identity()
+    account_id = request.args.get('account_id', type=int)
+    period = request.args.get('period', 'year')
+    
+    # Get user's account IDs
+    accounts = Account.query.filter_by(user_id=user_id).all()
+    account_ids = [acc.id for acc in accounts]
+    
+    if not account_ids:
+        return jsonify({'series': []}), 200
+    
+    if account_id and account_id in account_ids:
+        accounts_to_calc = [account_id]
+    else:
+        accounts_to_calc = account_ids
+    
+    today = date.today()
+    start_date = None
+    end_date = today
+    if period == 'month':
+        start_date = today - timedelta(days=30)
+    elif period == 'year':
+        start_date = today - timedelta(days=365)
+    elif period == 'ytd':
+        start_date = date(today.year, 1, 1)
+    elif period == 'last_year':
+        start_date = date(today.year - 1, 1, 1)
+        end_date = date(today.year - 1, 12, 31)
+    # For 'all', start_date remains None
+    
+    try:
+        if request.args.get('start_date'):
+            start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date()
+        if request.args.get('end_date'):
+            end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'start_date and end_date must be YYYY-MM-DD'}), 400
+    
+    # Sum accounts per day when showing all accounts
+    series = {}
+    for row in sorted(load_snapshot_rows(accounts_to_calc, start_date, end_date), key=lambda row: row['snapshot_date']):
+        point = series.setdefault(row['snapshot_date'], {
+            'date': row['snapshot_date'].isoformat(),
+            'total_capital': 0,
+            'realized_pnl': 0,
+            'open_premium': 0,
+            'capital_at_risk': 0
+        })
+        for field in SNAPSHOT_FIELDS:
+            point[field] += row[field]
+    
+    points = []
+    for point in series.values():
+        for field in SNAPSHOT_FIELDS:
+            point[field] = round(point[field], 2)
+        points.append(point)
+    
+    return jsonify({'series': points}), 200
+
+def get_expiration_calendar_groups(account_ids, start_date, end_date, group_by='day', today=None):
+    """
+    Open option positions expiring in [start_date, end_date], bucketed by expiration day
+    or by week (Monday start). Reads only the window through ix_trades_open_expiration.
+    
+    Returns a list of groups sorted by date, each with contracts, premium at stake,
+    capital at risk and the positions in it.
+    """
+    today = today or date.today()
+    
+    # One range scan over (account_id, status, expiration_date); closing legs are
+    # batch loaded so remaining quantities don't query per trade
+    open_trades = Trade.query.options(selectinload(Trade.child_trades)).filter(
+        Trade.account_id.in_(account_ids),
+        Trade.status == 'Open',
+        Trade.expiration_date >= start_date,
+        Trade.expiration_date <= end_date,
+        Trade.trade_action.in_(['Sold to Open', 'Bought to Open'])
+    ).order_by(Trade.expiration_date, Trade.symbol).all()
+    
+    groups = {}
+    for trade in open_trades:
+        remaining_qty = trade.get_remaining_open_quantity()
+        if remaining_qty <= 0:
+            continue  # Skip fully closed positions
+        
+        if group_by == 'week':
+            bucket_start = trade.expiration_date - timedelta(days=trade.expiration_date.weekday())
+            bucket_end = bucket_start + timedelta(days=6)
+        else:
+            bucket_start = bucket_end = trade.expiration_date
+        
+        group = groups.get(bucket_start)
+        if group is None:
+            group = groups[bucket_start] = {
+                'expiration_date': bucket_start.isoformat(),
+                'period_end': bucket_end.isoformat(),
+                'days_until_expiration': (bucket_start - today).days,
+                'positions_count': 0,
+                'contracts': 0,
+                'premium_at_stake': 0,
+                'capital_at_risk': 0,
+                'positions': []
+            }
+        
+        quantity = trade.contract_quantity or 1
+        premium = (float(trade.premium) if trade.premium else 0) / quantity * remaining_qty
+        capital_at_risk = float(trade.strike_price) * remaining_qty * 100 if trade.strike_price else 0
+        
+        # Spot price from the quote cache only; the calendar never waits on Finnhub
+        spot_price = 0
+        is_itm = False
+        cached_quote = _get_cached_market_data(trade.symbol)
+        if cached_quote and trade.strike_price:
+            spot_price = float(cached_quote.get('current_price') or 0)
+            strike = float(trade.strike_price)
+            if spot_price > 0:
+                if trade.trade_type == 'CSP':
+                    is_itm = spot_price < strike
+                else:
+                    is_itm = spot_price > strike
+        
+        group['positions_count'] += 1
+        group['contracts'] += remaining_qty
+        group['premium_at_stake'] += premium
+        group['capital_at_risk'] += capital_at_risk
+        group['positions'].append({
+            'id': trade.id,
+            'account_id': trade.account_id,
+            'symbol': trade.symbol,
+            'trade_type': trade.trade_type,
+            'trade_action': trade.trade_action,
+            'strike_price': float(trade.strike_price) if trade.strike_price else None,
+            'expiration_date': trade.expiration_date.isoformat(),
+            'contract_quantity': remaining_qty,
+            'premium': round(premium, 2),
+            'spot_price': spot_price,
+            'is_itm': is_itm
+        })
+    
+    result = []
+    for bucket_start in sorted(groups):
+        group = groups[bucket_start]
+        group['premium_at_stake'] = round(group['premium_at_stake'], 2)
+        group['capital_at_risk'] = round(group['capital_at_risk'], 2)
+        result.append(group)
+    return result
+
+@dashboard_bp.route('/expiration-calendar', methods=['GET'])
+@jwt_required()
+@read_from_replica
+def get_expiration_calendar():
+    """
+    Get open positions grouped by expiration for the calendar view.
+    
+    Query params: account_id, days_ahead (default 90) or start_date / end_date (YYYY-MM-DD),
+    group_by ('day' or 'week', default 'day').
+    """
+    user_id = get_jwt_identity()
+    account_id = request.args.get('account_id', type=int)
+    days_ahead = request.args.get('days_ahead', type=int, default=90)
+    group_by = request.args.get('group_by', 'day').lower()
+    
+    if group_by not in ['day', 'week']:
+        return jsonify({'error': "group_by must be 'day' or 'week'"}), 400
+    
+    today = date.today()
+    try:
+        start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() if request.args.get('start_date') else today
+        end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() if request.args.get('end_date') else start_date + timedelta(days=days_ahead)
+    except ValueError:
+        return jsonify({'error': 'start_date and end_date must be YYYY-MM-DD'}), 400
+    
+    # Get user's account IDs
+    accounts = Account.query.filter_by(user_id=user_id).all()
+    account_ids = [acc.id for acc in accounts]
+    
+    if not account_ids:
+        return jsonify([]), 200
+    
+    if account_id and account_id in account_ids:
+        account_ids = [account_id]
+    
+    return jsonify(get_expiration_calendar_groups(account_ids, start_date, end_date, group_by, today)), 200
+
+@dashboard_bp.route('/wheel-cycles', methods=['GET'])
+@jwt_required()
+@read_from_replica
+def get_wheel_cycles_endpoint():
+    """
+    Get wheel cycles (CSP -> assignment -> covered calls -> called away) with per-cycle
+    premium, stock gain, fees, duration and annualized return.
+    
+    Query params: account_id, symbol, status ('all', 'complete', 'open'; default 'all').
+    """
+    user_id = get_jwt_identity()
+    account_id = request.args.get('account_id', type=int)
+    symbol = request.args.get('symbol')
+    status = request.args.get('status', 'all').lower()
+    
+    # Get user's account IDs
+    accounts = Account.query.filter_by(user_id=user_id).all()
+    account_ids = [acc.id for acc in accounts]
+    
+    if not account_ids:
+        return jsonify({'cycles': [], 'summary': {'cycle_count': 0}}), 200
+    
+    if account_id and account_id in account_ids:
+        account_ids = [account_id]
+    
+    cycles = get_wheel_cycles(account_ids)
+    
+    if symbol:
+        cycles = [cycle for cycle in cycles if cycle['symbol'] == symbol.upper()]
+    if status == 'complete':
+        cycles = [cycle for cycle in cycles if cycle['is_complete']]
+    elif status == 'open':
+        cycles = [cycle for cycle in cycles if not cycle['is_complete']]
+    
+    complete = [cycle for cycle in cycles if cycle['is_complete']]
+    annualized = [cycle['annualized_return_pct'] for cycle in complete if cycle['annualized_return_pct'] is not None]
+    summary = {
+        'cycle_count': len(cycles),
+        'complete_count': len(complete),
+        'total_net_pnl': round(sum(cycle['net_pnl'] for cycle in cycles), 2),
+        'avg_duration_days': round(sum(cycle['duration_days'] for cycle in complete) / len(complete), 1) if complete else 0,
+        'avg_annualized_return_pct': round(sum(annualized) / len(annualized), 2) if annualized else None
+    }
+    
+    return jsonify({'cycles': cycles, 'summary': summary}), 200
+
+@dashboard_bp.route('/mark-to-market', methods=['GET'])
+@jwt_required()
+@read_from_replica
+def get_mark_to_market():
+    """
+    Value open CSP, covered call and LEAPS legs at theoretical (Black-Scholes) prices
+    from the underlying quotes, with unrealized P&L and Greeks per position, per
+    symbol and in total.
+    
+    Query params: account_id, volatility (annualized, e.g. 0.35; default 0.30),
+    rate (risk-free rate; default 0.045).
+    """
+    user_id = get_jwt_identity()
+    account_id = request.args.get('account_id', type=int)
+    volatility = request.args.get('volatility', DEFAULT_VOLATILITY, type=float)
+    rate = request.args.get('rate', DEFAULT_RISK_FREE_RATE, type=float)
+    
+    if volatility <= 0 or volatility > 5:
+        return jsonify({'error': 'volatility must be between 0 and 5 (annualized, e.g. 0.30)'}), 400
+    
+    # Get user's account IDs
+    accounts = Account.query.filter_by(user_id=user_id).all()
+    account_ids = [acc.id for acc in accounts]
+    
+    if account_id and account_id in account_ids:
+        account_ids = [account_id]
+    
+    open_trades = open_option_legs_query(account_ids).all() if account_ids else []
+    prices = _get_underlying_prices(set(trade.symbol for trade in open_trades))
+    
+    result = mark_open_positions(open_trades, prices, volatility=volatility, rate=rate)
+    result['volatility'] = volatility
+    result['rate'] = rate
+    return jsonify(result), 200
+
+@dashboard_bp.route('/stress-test', methods=['POST'])
+@jwt_required()
+def stress_test():
+    """
+    Stress the open book under underlying price shocks.
+    
+    Request body (all optional):
+    {
+        "shocks": [-20, -10, 0],             # Percent moves, one scenario each (default -20..+10)
+        "symbol_shocks": {"TSLA": [-40, -20, 0]},  # Per-symbol moves, one per scenario
+        "account_id": 1,
+        "volatility": 0.30,
+        "rate": 0.045
+    }
+    
+    Each scenario reports option, stock and total P&L versus today, the shares that
+    would be assigned (and the cash that takes, compared with total capital) and the
+    shares that would be called away.
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    shocks = data.get('shocks', DEFAULT_SHOCKS)
+    symbol_shocks = data.get('symbol_shocks') or {}
+    account_id = data.get('account_id')
+    
+    try:
+        shocks = [float(shock) for shock in shocks]
+        symbol_shocks = {symbol.upper(): [float(shock) for shock in values] for symbol, values in symbol_shocks.items()}
+        volatility = float(data.get('volatility', DEFAULT_VOLATILITY))
+        rate = float(data.get('rate', DEFAULT_RISK_FREE_RATE))
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({'error': 'shocks, symbol_shocks, volatility and rate must be numbers'}), 400
+    
+    if not shocks or len(shocks) > MAX_SCENARIOS:
+        return jsonify({'error': f'Provide between 1 and {MAX_SCENARIOS} shocks'}), 400
+    if any(len(values) != len(shocks) for values in symbol_shocks.values()):
+        return jsonify({'error': 'Each symbol_shocks list must have one value per scenario in shocks'}), 400
+    if any(shock <= -100 for shock in shocks) or any(shock <= -100 for values in symbol_shocks.values() for shock in values):
+        return jsonify({'error': 'Shocks must be greater than -100%'}), 400
+    if volatility <= 0 or volatility > 5:
+        return jsonify({'error': 'volatility must be between 0 and 5 (annualized, e.g. 0.30)'}), 400
+    
+    # Get user's account IDs
+    accounts = Account.query.filter_by(user_id=user_id).all()
+    account_ids = [acc.id for acc in accounts]
+    
+    if account_id and account_id in account_ids:
+        account_ids = [account_id]
+    
+    if account_ids:
+        open_trades = open_option_legs_query(account_ids).all()
+        lots = StockPosition.query.filter(
+            StockPosition.account_id.in_(account_ids),
+            StockPosition.status == 'Open'
+        ).all()
+    else:
+        open_trades, lots = [], []
+    prices = _get_underlying_prices(set(t.symbol for t in open_trades) | set(lot.symbol for lot in lots))
+    
+    scenarios, unpriced = run_stress_test(open_trades, lots, prices, shocks, symbol_shocks,
+                                          volatility=volatility, rate=rate)
+    
+    # Assignment cash against working capital (same definition as get_total_capital, one query)
+    total_capital = sum(get_total_capital_by_account(account_ids).values()) if account_ids else 0
+    for scenario in scenarios:
+        cash_required = scenario['assignment_cash_required']
+        scenario['cash_shortfall'] = round(max(cash_required - total_capital, 0), 2)
+        scenario['cash_required_pct_of_capital'] = round(cash_required / total_capital * 100, 2) if total_capital > 0 else None
+    
+    return jsonify({
+        'total_capital': round(total_capital, 2),
+        'volatility': volatility,
+        'rate': rate,
+        'scenarios': scenarios,
+        'unpriced_trade_ids': unpriced
+    }), 200
+
+@dashboard_bp.route('/probability-of-profit', methods=['GET'])
+@jwt_required()
+@read_from_replica
+def get_probability_of_profit():
+    """
+    Monte Carlo probability of profit for open option legs and the whole book.
+    
+    Query params (all optional):
+        account_id: limit to one account
+        volatility: annualized volatility (default: current VIX, else 0.30)
+        symbol_volatility: per-symbol overrides, e.g. AAPL:0.45,TSLA:0.70
+        paths: number of simulated paths (default 20000)
+    
+    Each leg reports the probability it expires profitable, its expected P&L and (for
+    short legs) the probability of assignment; the book reports its probability of
+    profit, expected P&L and P&L percentiles at expiration.
+    """
+    user_id = get_jwt_identity()
+    account_id = request.args.get('account_id', type=int)
+    
+    try:
+        # Parsed by hand: type=float would turn an unparseable value into None (the default)
+        volatility = request.args.get('volatility')
+        volatility = float(volatility) if volatility is not None else None
+        paths = int(request.args.get('paths', DEFAULT_PATHS))
+        symbol_volatility = {}
+        for item in request.args.get('symbol_volatility', '').split(','):
+            if item.strip():
+                symbol, value = item.split(':')
+                symbol_volatility[symbol.strip().upper()] = float(value)
+    except ValueError:
+        return jsonify({'error': 'volatility must be a number, paths an integer and symbol_volatility look like AAPL:0.45,TSLA:0.70'}), 400
+    
+    if paths < 100 or paths > MAX_PATHS:
+        return jsonify({'error': f'paths must be between 100 and {MAX_PATHS}'}), 400
+    volatilities = list(symbol_volatility.values()) + ([volatility] if volatility is not None else [])
+    # Written so NaN fails too
+    if not all(0 < value <= 5 for value in volatilities):
+        return jsonify({'error': 'volatility must be between 0 and 5 (annualized, e.g. 0.30)'}), 400
+    
+    # Volatility: explicit request value, then the VIX, then the pricing default
+    volatility_source = 'request'
+    if volatility is None:
+        volatility = _get_vix_volatility()
+        volatility_source = 'vix'
+    if volatility is None:
+        volatility = DEFAULT_VOLATILITY
+        volatility_source = 'default'
+    
+    # Get user's account IDs
+    accounts = Account.query.filter_by(user_id=user_id).all()
+    account_ids = [acc.id for acc in accounts]
+    
+    if account_id and account_id in account_ids:
+        account_ids = [account_id]
+    
+    open_trades = open_option_legs_query(account_ids).all() if account_ids else []
+    prices = _get_underlying_prices(set(t.symbol for t in open_trades))
+    
+    result = cached_simulation(open_trades, prices, volatility, symbol_volatility, paths=paths,
+                               max_workers=current_app.config.get('MONTE_CARLO_WORKERS', 1))
+    
+    return jsonify({
+        'volatility': volatility,
+        'volatility_source': volatility_source,
+        'symbol_volatility': symbol_volatility,
+        **result
+    }), 200
+
 @dashboard_bp.route('/open-positions-allocation', methods=['GET'])
 @jwt_required()
+@read_from_replica
 def get_open_positions_allocation():
     """
     Get open positions with capital allocation percentages for pie chart.
@@ -579,7 +975,7 @@ def get_open_positions_allocation():
             'total_capital': 0
         }), 200
     
-    query = Trade.query.filter(Trade.account_id.in_(account_ids))
+    query = Trade.query.options(*Trade.pnl_loader_options()).filter(Trade.account_id.in_(account_ids))
     
     if account_id and account_id in account_ids:
         query = query.filter_by(account_id=account_id)
@@ -594,7 +990,7 @@ def get_open_positions_allocation():
     ).all()
     
     # Calculate total capital for percentage calculation
-    total_capital = sum([get_total_capital(acc_id, user_id) for acc_id in accounts_to_calc])
+    total_capital = sum(get_total_capital_by_account(accounts_to_calc).values())
     
     # Group by symbol and calculate capital at risk
     symbol_allocation = defaultdict(lambda: {
@@ -623,7 +1019,7 @@ def get_open_positions_allocation():
         
         # For assigned positions (Covered Calls), use assignment_price if available
         if trade.trade_type == 'Covered Call' and trade.parent_trade_id:
-            parent = Trade.query.get(trade.parent_trade_id)
+            parent = trade.parent_trade
             if parent and parent.trade_type == 'Assignment' and parent.assignment_price:
                 capital_at_risk = float(parent.assignment_price) * remaining_qty * 100
         
@@ -674,6 +1070,18 @@ _company_logo_cache = {}
 _logo_cache_timestamps = {}
 LOGO_CACHE_TTL = 86400  # 24 hours
 
+FINNHUB_BASE_URL = 'https://finnhub.io/api/v1'
+
+# Finnhub quote endpoint doesn't support index symbols directly
+# Using ETF symbols and converting to index values
+# Mapping: display symbol -> (API symbol, conversion_factor)
+INDEX_SYMBOL_MAPPING = {
+    'DIA': ('DIA', 100.0),        # DIA ETF × 100 = DJIA index
+    'SPY': ('SPY', 10.0),         # SPY ETF × 10 = S&P 500 index
+    'QQQ': ('QQQ', 37.7),         # QQQ ETF × 37.7 = NASDAQ index
+    'VIX': ('VIXY', 0.56)         # VIXY ETF price × 0.56 ≈ VIX index (VIXY doesn't track 1:1)
+}
+
 def _get_cached_market_data(symbol, cache_ttl=300):
     """Get market data from cache if available and not expired"""
     cache_key = symbol
@@ -681,8 +1089,10 @@ def _get_cached_market_data(symbol, cache_ttl=300):
     
     if cache_key in _market_data_cache:
         if now - _cache_timestamps.get(cache_key, 0) < cache_ttl:
+            record_cache_lookup('quote', True)
             return _market_data_cache[cache_key]
     
+    record_cache_lookup('quote', False)
     return None
 
 def _set_cached_market_data(symbol, data):
@@ -697,11 +1107,14 @@ def _fetch_quote_from_finnhub(symbol):
     if not api_key:
         return None
     
+    started = time.perf_counter()
+    outcome = 'exception'
     try:
         # URL encode the symbol in case it has special characters
         from urllib.parse import quote
         encoded_symbol = quote(symbol, safe='')
-        url = f'https://finnhub.io/api/v1/quote?symbol={encoded_symbol}&token={api_key}'
+        base_url = current_app.config.get('FINNHUB_BASE_URL', FINNHUB_BASE_URL)
+        url = f'{base_url}/quote?symbol={encoded_symbol}&token={api_key}'
         
         response = requests.get(url, timeout=5)
         
@@ -710,6 +1123,7 @@ def _fetch_quote_from_finnhub(symbol):
             
             # Check if we got valid data (not error response)
             if 'c' in data and data['c'] is not None:
+                outcome = 'ok'
                 return {
                     'current_price': data.get('c', 0),
                     'previous_close': data.get('pc', 0),
@@ -720,11 +1134,51 @@ def _fetch_quote_from_finnhub(symbol):
                     'open': data.get('o', 0),
                     'timestamp': data.get('t', 0)
                 }
+            outcome = 'empty'
+        else:
+            outcome = 'http_error'
     except Exception as e:
         print(f"Error fetching quote for {symbol}: {str(e)}")
+    finally:
+        record_finnhub_call('quote', outcome, time.perf_counter() - started)
     
     return None
 
+def _get_underlying_prices(symbols, fetch_missing=True):
+    """
+    Current price per symbol from the quote cache, fetching (and caching) misses from
+    Finnhub unless fetch_missing is False. Symbols without a price are left out.
+    """
+    prices = {}
+    for symbol in symbols:
+        quote_data = _get_cached_market_data(symbol)
+        if not quote_data and fetch_missing:
+            quote_data = _fetch_quote_from_finnhub(symbol)
+            if quote_data:
+                _set_cached_market_data(symbol, quote_data)
+        if quote_data and quote_data.get('current_price'):
+            prices[symbol] = float(quote_data['current_price'])
+    return prices
+
+def _open_trade_marks(trades):
+    """
+    Marked unrealized P&L per trade id for the open trades among trades, priced from
+    cached quotes only (never waits on Finnhub); see calculate_wheel_pnl.
+    """
+    open_trades = [trade for trade in trades if trade.status == 'Open']
+    return unrealized_pnl_by_trade(open_trades, _get_underlying_prices(set(t.symbol for t in open_trades), fetch_missing=False))
+
+def _get_vix_volatility():
+    """
+    Annualized volatility implied by the VIX (same VIXY conversion as the market-data
+    indices, e.g. VIX 18.5 -> 0.185), or None if there is no quote.
+    """
+    fetch_symbol, conversion_factor = INDEX_SYMBOL_MAPPING['VIX']
+    price = _get_underlying_prices([fetch_symbol]).get(fetch_symbol)
+    if not price:
+        return None
+    return round(price * conversion_factor / 100, 4)
+
 @dashboard_bp.route('/market-data', methods=['GET'])
 @jwt_required()
 def get_market_data():
@@ -739,17 +1193,7 @@ def get_market_data():
     include_indices = request.args.get('include_indices', 'true').lower() == 'true'
     
     # Default market indices (ordered: DJIA, S&P 500, NASDAQ, VIX)
-    # Finnhub quote endpoint doesn't support index symbols directly
-    # Using ETF symbols and converting to index values
-    # Mapping: display symbol -> (API symbol, conversion_factor)
-    index_symbol_mapping = {
-        'DIA': ('DIA', 100.0),        # DIA ETF × 100 = DJIA index
-        'SPY': ('SPY', 10.0),         # SPY ETF × 10 = S&P 500 index
-        'QQQ': ('QQQ', 37.7),         # QQQ ETF × 37.7 = NASDAQ index
-        'VIX': ('VIXY', 0.56)         # VIXY ETF price × 0.56 ≈ VIX index (VIXY doesn't track 1:1)
-    }
-    
-    market_indices = list(index_symbol_mapping.keys()) if include_indices else []
+    market_indices = list(INDEX_SYMBOL_MAPPING.keys()) if include_indices else []
     
     # Parse symbols
     symbols = []
@@ -773,8 +1217,8 @@ def get_market_data():
         
         # Determine the actual symbol to fetch from API and conversion factor
         # For indices, use the mapped API symbol; otherwise use symbol as-is
-        if symbol in index_symbol_mapping:
-            fetch_symbol, conversion_factor = index_symbol_mapping[symbol]
+        if symbol in INDEX_SYMBOL_MAPPING:
+            fetch_symbol, conversion_factor = INDEX_SYMBOL_MAPPING[symbol]
         else:
             fetch_symbol = symbol
             conversion_factor = 1.0
@@ -815,6 +1259,7 @@ def get_market_data():
 
 @dashboard_bp.route('/market-data/positions', methods=['GET'])
 @jwt_required()
+@read_from_replica
 def get_positions_market_data():
     """
     Get market data for all symbols with open positions.
@@ -869,7 +1314,9 @@ def _get_cached_logo(symbol):
     if cache_key in _company_logo_cache:
         timestamp = _logo_cache_timestamps.get(cache_key, 0)
         if time.time() - timestamp < LOGO_CACHE_TTL:
+            record_cache_lookup('logo', True)
             return _company_logo_cache[cache_key]
+    record_cache_lookup('logo', False)
     return None
 
 def _set_cached_logo(symbol, logo_url):
@@ -884,10 +1331,13 @@ def _fetch_company_logo_from_finnhub(symbol):
     if not api_key:
         return None
     
+    started = time.perf_counter()
+    outcome = 'exception'
     try:
         from urllib.parse import quote
         encoded_symbol = quote(symbol, safe='')
-        url = f'https://finnhub.io/api/v1/stock/profile2?symbol={encoded_symbol}&token={api_key}'
+        base_url = current_app.config.get('FINNHUB_BASE_URL', FINNHUB_BASE_URL)
+        url = f'{base_url}/stock/profile2?symbol={encoded_symbol}&token={api_key}'
         
         response = requests.get(url, timeout=5)
         
@@ -896,9 +1346,15 @@ def _fetch_company_logo_from_finnhub(symbol):
             
             # Check if we got valid data with logo
             if data and 'logo' in data and data['logo']:
+                outcome = 'ok'
                 return data['logo']
+            outcome = 'empty'
+        else:
+            outcome = 'http_error'
     except Exception as e:
         print(f"Error fetching logo for {symbol}: {str(e)}")
+    finally:
+        record_finnhub_call('profile', outcome, time.perf_counter() - started)
     
     return None
 
@@ -938,6 +1394,7 @@ def get_company_logos():
 
 @dashboard_bp.route('/ticker-performance', methods=['GET'])
 @jwt_required()
+@read_from_replica
 def get_ticker_performance():
     """
     Get ticker-level performance metrics grouped by symbol.
@@ -954,7 +1411,7 @@ def get_ticker_performance():
     if not account_ids:
         return jsonify([]), 200
     
-    query = Trade.query.filter(Trade.account_id.in_(account_ids))
+    query = Trade.query.options(*Trade.pnl_loader_options()).filter(Trade.account_id.in_(account_ids))
     
     if account_id and account_id in account_ids:
         query = query.filter_by(account_id=account_id)
@@ -1044,6 +1501,9 @@ def get_ticker_performance():
         'total_contracts': 0
     })
     
+    # Theoretical values for open option legs
+    marks = _open_trade_marks(filtered_trades)
+    
     # Calculate total portfolio P&L for % of profit calculation
     total_portfolio_pnl = 0.0
     
@@ -1083,7 +1543,8 @@ def get_ticker_performance():
                 else:
                     proportional_premium = net_premium
                 
-                ticker['unrealized_pnl'] += proportional_premium
+                # Marked to market when the underlying quote is cached, else the premium
+                ticker['unrealized_pnl'] += marks.get(trade.id, proportional_premium)
                 ticker['open_premium'] += proportional_premium
                 ticker['open_contracts'] += remaining_open
         
@@ -1131,6 +1592,7 @@ def get_ticker_performance():
 
 @dashboard_bp.route('/strategy-performance', methods=['GET'])
 @jwt_required()
+@read_from_replica
 def get_strategy_performance():
     """
     Get strategy-level performance metrics grouped by trade_type.
@@ -1147,7 +1609,7 @@ def get_strategy_performance():
     if not account_ids:
         return jsonify([]), 200
     
-    query = Trade.query.filter(Trade.account_id.in_(account_ids))
+    query = Trade.query.options(*Trade.pnl_loader_options()).filter(Trade.account_id.in_(account_ids))
     
     if account_id and account_id in account_ids:
         query = query.filter_by(account_id=account_id)
@@ -1237,6 +1699,9 @@ def get_strategy_performance():
         'total_contracts': 0
     })
     
+    # Theoretical values for open option legs
+    marks = _open_trade_marks(filtered_trades)
+    
     # Calculate total portfolio P&L for % of profit calculation
     total_portfolio_pnl = 0.0
     
@@ -1276,7 +1741,8 @@ def get_strategy_performance():
                 else:
                     proportional_premium = net_premium
                 
-                strategy_info['unrealized_pnl'] += proportional_premium
+                # Marked to market when the underlying quote is cached, else the premium
+                strategy_info['unrealized_pnl'] += marks.get(trade.id, proportional_premium)
                 strategy_info['open_premium'] += proportional_premium
                 strategy_info['open_contracts'] += remaining_open
         
@@ -35,7 +35,10 @@ def get_stock_positions():
     
     positions = query.order_by(StockPosition.acquired_date.desc()).all()
     
-    return jsonify([pos.to_dict(include_available_shares=True) for pos in positions]), 200
+    # Shares committed to open covered calls for all positions in one grouped query
+    committed = StockPosition.committed_shares_by_position([pos.id for pos in positions])
+    
+    return jsonify([pos.to_dict(include_available_shares=True, committed_shares=committed.get(pos.id, 0)) for pos in positions]), 200
 
 @stock_positions_bp.route('/<int:position_id>', methods=['GET'])
 @jwt_required()
@@ -205,12 +208,15 @@ def get_available_positions():
     
     positions = query.order_by(StockPosition.acquired_date).all()
     
+    # Shares committed to open covered calls for all positions in one grouped query
+    committed = StockPosition.committed_shares_by_position([pos.id for pos in positions])
+    
     # Filter to only positions with available shares and include availability info
     available_positions = []
     for pos in positions:
-        available_shares = pos.get_available_shares()
-        if available_shares > 0:
-            pos_dict = pos.to_dict(include_available_shares=True)
+        committed_shares = committed.get(pos.id, 0)
+        if pos.get_available_shares(committed_shares) > 0:
+            pos_dict = pos.to_dict(include_available_shares=True, committed_shares=committed_shares)
             available_positions.append(pos_dict)
     
     return jsonify(available_positions), 200
@@ -1,13 +1,29 @@
 from flask import Blueprint, request, jsonify, current_app, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Trade, Account, StockPosition
+from models import db, Trade, Account, StockPosition, Deposit, Withdrawal
 from datetime import datetime
-import pandas as pd
+from sqlalchemy import select
 import io
-from utils.import_utils import parse_trade_file
+import tempfile
+from utils.import_utils import parse_trade_files_parallel, find_imported_fingerprints
+from utils.trade_chain import build_chain_tree
+from utils.statement_timeout import long_statement_timeout
+from utils.read_replica import read_from_replica
+from utils.export_utils import (
+    write_streaming_workbook,
+    TRADE_EXPORT_COLUMNS,
+    DEPOSIT_EXPORT_COLUMNS,
+    WITHDRAWAL_EXPORT_COLUMNS,
+    STOCK_POSITION_EXPORT_COLUMNS
+)
 
 trades_bp = Blueprint('trades', __name__)
 
+# Rows fetched per database round trip while streaming an export
+EXPORT_BATCH_SIZE = 1000
+# Finished export files larger than this are spooled to a temp file instead of memory
+EXPORT_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
 def get_user_id():
     """Helper to get user ID from JWT token, converting string to int"""
     user_id_str = get_jwt_identity()
@@ -60,6 +76,7 @@ def calculate_premium(trade_price, trade_action, contract_quantity, fees):
 
 @trades_bp.route('', methods=['GET'])
 @jwt_required()
+@read_from_replica
 def get_trades():
     user_id = get_user_id()
     account_id = request.args.get('account_id', type=int)
@@ -72,7 +89,7 @@ def get_trades():
     if not account_ids:
         return jsonify([]), 200
     
-    query = Trade.query.filter(Trade.account_id.in_(account_ids))
+    query = Trade.query.options(*Trade.pnl_loader_options()).filter(Trade.account_id.in_(account_ids))
     
     if account_id and account_id in account_ids:
         query = query.filter_by(account_id=account_id)
@@ -80,44 +97,9 @@ def get_trades():
     if status and status != 'All':
         query = query.filter_by(status=status)
     
+    # Statuses are settled when trades are written (see Trade.corrected_status), so
+    # this read-only view (possibly on the replica) never writes
     trades = query.order_by(Trade.trade_date.desc()).all()
-    # Auto-update status for all trades and include realized P&L
-    # BUT: Don't override status for trades that were explicitly set during creation/update
-    # Only auto-update if status seems incorrect (e.g., expired trades)
-    for trade in trades:
-        # Only auto-update if the trade appears to need status correction
-        # Don't override status that was explicitly set during partial close handling
-        if trade.trade_action in ['Sold to Open', 'Bought to Open']:
-            # For opening trades, check if status should be updated based on child trades
-            # BUT: If trade is explicitly "Open" and has remaining quantity, don't override
-            remaining_qty = trade.get_remaining_open_quantity()
-            if trade.status == 'Open' and remaining_qty > 0:
-                # Trade is explicitly Open with remaining quantity - don't override
-                continue
-            
-            # Don't override special statuses (Called Away, Assigned) that were explicitly set
-            if trade.status in ['Called Away', 'Assigned']:
-                continue
-            
-            # Don't override manually set 'Closed' status (e.g., for expired worthless trades)
-            # If user manually set status to 'Closed', respect that choice
-            if trade.status == 'Closed' and not trade.close_date:
-                # This is likely a manually marked expired worthless trade - don't override
-                continue
-            
-            # IMPORTANT: For historical data entry, if status is 'Open' and expiration_date is in the past
-            # but no close_date is set, respect the explicit 'Open' status
-            # This allows users to enter past trades that haven't been closed yet
-            from datetime import date
-            today = date.today()
-            if trade.status == 'Open' and trade.expiration_date and trade.expiration_date < today and not trade.close_date:
-                # This is likely a historical entry - respect the explicit status
-                continue
-            
-            new_status = trade.auto_determine_status()
-            if new_status != trade.status:
-                trade.status = new_status
-    db.session.commit()
     
     # Filter out closing trades (two-entry approach) - only show opening trades
     # Closing trades are only for partial closes tracking and shouldn't appear in main list
@@ -801,7 +783,12 @@ def delete_trade(trade_id):
 @trades_bp.route('/<int:trade_id>/chain', methods=['GET'])
 @jwt_required()
 def get_trade_chain(trade_id):
-    """Get the full trade chain (parent, current, children)"""
+    """
+    Get the trade chain.
+    Default: parent, current and direct children.
+    ?full=true: the whole connected wheel (rolls, assignment, stock position,
+    covered calls, called away) as a tree, fetched with one recursive query.
+    """
     user_id = get_user_id()
     trade = Trade.query.get(trade_id)
     
@@ -813,165 +800,267 @@ def get_trade_chain(trade_id):
     if not account:
         return jsonify({'error': 'Unauthorized'}), 403
     
+    if request.args.get('full', 'false').lower() == 'true':
+        return jsonify(build_chain_tree(trade.id)), 200
+    
     chain = trade.get_trade_chain()
     return jsonify(chain), 200
 
+def _price_key(value):
+    """Normalize a price (Decimal, float or None) for equality comparisons"""
+    return round(float(value), 2) if value is not None else None
+
+def import_parsed_trades(trades, account_id):
+    """
+    Insert parsed import rows into an account and link closing/assignment rows to their parents.
+    
+    Rows already imported into the account (same import_fingerprint) are skipped, so
+    re-uploading an overlapping statement only processes the new rows. Repeated
+    fingerprints within trades (overlapping files in one upload) are imported once.
+    The caller commits.
+    
+    Returns:
+        Tuple of (imported trades, number of skipped rows)
+    """
+    # Re-uploaded or overlapping statements: skip rows already imported into this
+    # account (matched by content fingerprint) and only process the new ones
+    known_fingerprints = find_imported_fingerprints(account_id, [trade.import_fingerprint for trade in trades])
+    # Overlapping files uploaded together carry the same rows too: the first copy wins
+    new_indexes = []
+    batch_fingerprints = set()
+    for idx, trade in enumerate(trades):
+        if trade.import_fingerprint in known_fingerprints or trade.import_fingerprint in batch_fingerprints:
+            continue
+        batch_fingerprints.add(trade.import_fingerprint)
+        new_indexes.append(idx)
+    new_trades = [trades[idx] for idx in new_indexes]
+    skipped_count = len(trades) - len(new_trades)
+    
+    if not new_trades:
+        return new_trades, skipped_count
+    
+    # IMPORTANT: parent_trade_id in the file refers to old database IDs
+    # We need to import in order and create a mapping from old IDs to new IDs
+    # Strategy: Import in two passes
+    # 1. First pass: Import all trades without parent relationships, store old_id -> new_id mapping
+    # 2. Second pass: Update parent_trade_id references using the mapping
+    
+    # Store original parent_trade_id from file (before we lose it)
+    old_parent_ids = {}
+    for idx, trade in enumerate(trades):
+        old_parent_ids[idx] = trade.parent_trade_id
+    
+    # Candidate parents for matching, by file row. New rows use the trade being imported;
+    # already-imported opening rows use their existing database trade so a new closing row
+    # can still link to a parent from an earlier statement. Only load the existing trades
+    # that could actually be a parent of one of the new rows.
+    parent_candidates = {idx: trade for idx, trade in zip(new_indexes, new_trades)}
+    needed_symbols = set(trade.symbol for idx, trade in zip(new_indexes, new_trades) if old_parent_ids.get(idx) is not None)
+    known_parent_ids = {
+        idx: known_fingerprints[trade.import_fingerprint]
+        for idx, trade in enumerate(trades)
+        if trade.import_fingerprint in known_fingerprints
+        and trade.symbol in needed_symbols
+        and trade.trade_action in ['Sold to Open', 'Bought to Open']
+    }
+    if known_parent_ids:
+        existing_parents = {t.id: t for t in Trade.query.filter(Trade.id.in_(set(known_parent_ids.values()))).all()}
+        for idx, trade_id in known_parent_ids.items():
+            if trade_id in existing_parents:
+                parent_candidates[idx] = existing_parents[trade_id]
+    
+    # Post-process trades to ensure data integrity
+    # Note: parent_trade_id will be cleared temporarily and restored after import
+    for trade in new_trades:
+        # Clear parent_trade_id temporarily (we'll set it after all trades are imported)
+        trade.parent_trade_id = None
+        
+        # Only recalculate premium if it's missing or zero AND trade_price/trade_action are provided
+        # This preserves the original premium value from export
+        if trade.trade_type != 'Assignment':
+            if (not trade.premium or trade.premium == 0) and trade.trade_price and trade.trade_action:
+                # Recalculate premium only if premium is missing/zero
+                trade.premium = calculate_premium(trade.trade_price, trade.trade_action, trade.contract_quantity, trade.fees)
+    
+    # Bulk insert trades (without parent relationships first)
+    db.session.add_all(new_trades)
+    db.session.flush()  # Get new IDs without committing
+    
+    # Now match parent trades and update parent_trade_id
+    # Since exported parent_trade_id refers to old DB IDs, we need to match by characteristics
+    # Strategy: Match parent by symbol, trade_type, strike_price
+    # For closing trades, parent date should be <= child date (opening happens before/on closing date)
+    for idx, trade in zip(new_indexes, new_trades):
+        original_parent_id = old_parent_ids.get(idx)
+        
+        if original_parent_id is not None:
+            # Find the parent trade by matching characteristics
+            parent_trade = None
+            for parent_idx, potential_parent in sorted(parent_candidates.items()):
+                if parent_idx == idx:
+                    continue  # Skip self
+                
+                # Match by key characteristics: symbol, trade_type, strike_price
+                # For closing trades, we DON'T match on exact trade_date because closing date is different from opening date
+                # Parent should be an opening trade (Sold to Open or Bought to Open)
+                # Parent's trade_date should be BEFORE or EQUAL to child's trade_date (closing can't happen before opening)
+                symbol_match = potential_parent.symbol == trade.symbol
+                type_match = potential_parent.trade_type == trade.trade_type
+                # Existing trades hold Decimal strikes, parsed rows hold floats
+                strike_match = _price_key(potential_parent.strike_price) == _price_key(trade.strike_price)
+                is_opening = potential_parent.trade_action in ['Sold to Open', 'Bought to Open']
+                # For closing trades, parent date should be <= child date (opening happens before/on closing date)
+                # For assignment trades, we can be more flexible
+                if trade.trade_action in ['Bought to Close', 'Sold to Close']:
+                    date_valid = potential_parent.trade_date <= trade.trade_date
+                else:
+                    # For other trade types (like Assignment), match on exact date
+                    date_valid = potential_parent.trade_date == trade.trade_date
+                
+                if (symbol_match and type_match and strike_match and date_valid and is_opening):
+                    # This looks like the parent
+                    parent_trade = potential_parent
+                    break
+            
+            if parent_trade:
+                trade.parent_trade_id = parent_trade.id
+                # Mark as modified to ensure SQLAlchemy tracks the change
+                from sqlalchemy.orm.attributes import flag_modified
+                flag_modified(trade, 'parent_trade_id')
+    
+    # Now update open_date and other parent-dependent fields AFTER parent relationships are set
+    for trade in new_trades:
+        # Handle single-entry closes (new format: has close_date and close_premium/close_method, no parent_trade_id)
+        if trade.close_date and (trade.close_premium is not None or trade.close_method) and not trade.parent_trade_id:
+            # Single-entry close: ensure open_date is set (should be trade_date if not provided)
+            if not trade.open_date:
+                trade.open_date = trade.trade_date
+            # Ensure status is set correctly based on close_method
+            if trade.close_method == 'expired':
+                trade.status = 'Expired'
+            elif trade.close_method == 'assigned':
+                trade.status = 'Assigned'
+            elif trade.close_method == 'called_away':
+                trade.status = 'Called Away'
+            elif trade.close_method in ['buy_to_close', 'sell_to_close', 'exercise']:
+                trade.status = 'Closed'
+            elif not trade.status or trade.status == 'Open':
+                # Default to Closed if status not set
+                trade.status = 'Closed'
+        
+        # Handle two-entry closes (old format: has parent_trade_id)
+        elif trade.parent_trade_id and trade.trade_action in ['Bought to Close', 'Sold to Close']:
+            parent = Trade.query.get(trade.parent_trade_id)
+            if parent:
+                if not trade.open_date:
+                    trade.open_date = parent.trade_date
+                # Ensure close_date is set if not provided
+                if not trade.close_date:
+                    trade.close_date = trade.trade_date
+                # Set closing trade status to Closed
+                trade.status = 'Closed'
+                # Re-derive the parent's stored open count with this leg linked, then
+                # update its status if it's fully closed
+                db.session.expire(parent, ['child_trades'])
+                remaining_qty = parent.refresh_remaining_open_quantity()
+                if remaining_qty == 0:
+                    # Parent is fully closed, update its status
+                    if parent.status == 'Open':
+                        parent.status = 'Closed'
+                    if not parent.close_date:
+                        parent.close_date = trade.trade_date
+                    if not parent.open_date:
+                        parent.open_date = parent.trade_date
+        
+        # For Assignment trades, ensure status is 'Assigned'
+        if trade.trade_type == 'Assignment':
+            trade.status = 'Assigned'
+            # Set parent's close_date if parent is a CSP
+            if trade.parent_trade_id:
+                parent = Trade.query.get(trade.parent_trade_id)
+                if parent and parent.trade_type == 'CSP':
+                    parent.status = 'Assigned'
+                    parent.close_date = trade.trade_date
+                    if not parent.open_date:
+                        parent.open_date = parent.trade_date
+    
+    return new_trades, skipped_count
+
 @trades_bp.route('/import', methods=['POST'])
+@long_statement_timeout
 @jwt_required()
 def import_trades():
+    """
+    Import trades from one or more CSV/Excel files.
+    
+    Send a single 'file' or several 'files'. account_id is either one value for all
+    files or one value per file, in the same order. Files are parsed in parallel
+    worker processes and imported in upload order in a single transaction.
+    """
     user_id = get_user_id()
     
-    if 'file' not in request.files:
+    files = request.files.getlist('files') or request.files.getlist('file')
+    if not files:
         return jsonify({'error': 'No file provided'}), 400
     
-    file = request.files['file']
-    account_id = request.form.get('account_id', type=int)
+    try:
+        account_ids = [int(value) for value in request.form.getlist('account_id')]
+    except ValueError:
+        return jsonify({'error': 'account_id must be an integer'}), 400
     
-    if not account_id:
+    if not account_ids:
         return jsonify({'error': 'account_id is required'}), 400
-    
-    # Verify account belongs to user
-    account = Account.query.filter_by(id=account_id, user_id=user_id).first()
-    if not account:
+    if len(account_ids) == 1:
+        account_ids = account_ids * len(files)
+    elif len(account_ids) != len(files):
+        return jsonify({'error': 'Provide one account_id, or one account_id per file'}), 400
+    
+    # Verify accounts belong to user
+    owned_count = Account.query.filter(Account.id.in_(set(account_ids)), Account.user_id == user_id).count()
+    if owned_count != len(set(account_ids)):
         return jsonify({'error': 'Account not found'}), 404
     
     try:
-        trades = parse_trade_file(file, account_id)
-        
-        # IMPORTANT: parent_trade_id in the file refers to old database IDs
-        # We need to import in order and create a mapping from old IDs to new IDs
-        # Strategy: Import in two passes
-        # 1. First pass: Import all trades without parent relationships, store old_id -> new_id mapping
-        # 2. Second pass: Update parent_trade_id references using the mapping
-        
-        # Store original parent_trade_id from file (before we lose it)
-        old_parent_ids = {}
-        for idx, trade in enumerate(trades):
-            old_parent_ids[idx] = trade.parent_trade_id
-        
-        # Post-process trades to ensure data integrity
-        # Note: parent_trade_id will be cleared temporarily and restored after import
-        for idx, trade in enumerate(trades):
-            # Clear parent_trade_id temporarily (we'll set it after all trades are imported)
-            trade.parent_trade_id = None
-            
-            # Only recalculate premium if it's missing or zero AND trade_price/trade_action are provided
-            # This preserves the original premium value from export
-            if trade.trade_type != 'Assignment':
-                if (not trade.premium or trade.premium == 0) and trade.trade_price and trade.trade_action:
-                    # Recalculate premium only if premium is missing/zero
-                    trade.premium = calculate_premium(trade.trade_price, trade.trade_action, trade.contract_quantity, trade.fees)
+        # Parsing (pandas) is the CPU-bound part, so it runs in worker processes.
+        # Database work stays in this request on the main process.
+        uploads = [(file.filename, file.read()) for file in files]
+        parsed_files = parse_trade_files_parallel(uploads, current_app.config.get('IMPORT_PARSE_WORKERS', 1))
         
-        # Bulk insert trades (without parent relationships first)
-        db.session.add_all(trades)
-        db.session.flush()  # Get new IDs without committing
-        
-        # Build mapping: row_index -> new_trade_id
-        id_mapping = {}
-        for idx, trade in enumerate(trades):
-            id_mapping[idx] = trade.id
-        
-        # Now match parent trades and update parent_trade_id
-        # Since exported parent_trade_id refers to old DB IDs, we need to match by characteristics
-        # Strategy: Match parent by symbol, trade_type, strike_price
-        # For closing trades, parent date should be <= child date (opening happens before/on closing date)
-        for idx, trade in enumerate(trades):
-            original_parent_id = old_parent_ids.get(idx)
-            
-            if original_parent_id is not None:
-                # Find the parent trade by matching characteristics
-                parent_trade = None
-                for parent_idx, potential_parent in enumerate(trades):
-                    if parent_idx == idx:
-                        continue  # Skip self
-                    
-                    # Match by key characteristics: symbol, trade_type, strike_price
-                    # For closing trades, we DON'T match on exact trade_date because closing date is different from opening date
-                    # Parent should be an opening trade (Sold to Open or Bought to Open)
-                    # Parent's trade_date should be BEFORE or EQUAL to child's trade_date (closing can't happen before opening)
-                    symbol_match = potential_parent.symbol == trade.symbol
-                    type_match = potential_parent.trade_type == trade.trade_type
-                    strike_match = potential_parent.strike_price == trade.strike_price
-                    is_opening = potential_parent.trade_action in ['Sold to Open', 'Bought to Open']
-                    # For closing trades, parent date should be <= child date (opening happens before/on closing date)
-                    # For assignment trades, we can be more flexible
-                    if trade.trade_action in ['Bought to Close', 'Sold to Close']:
-                        date_valid = potential_parent.trade_date <= trade.trade_date
-                    else:
-                        # For other trade types (like Assignment), match on exact date
-                        date_valid = potential_parent.trade_date == trade.trade_date
-                    
-                    if (symbol_match and type_match and strike_match and date_valid and is_opening):
-                        # This looks like the parent
-                        parent_trade = potential_parent
-                        break
-                
-                if parent_trade:
-                    trade.parent_trade_id = parent_trade.id
-                    # Mark as modified to ensure SQLAlchemy tracks the change
-                    from sqlalchemy.orm.attributes import flag_modified
-                    flag_modified(trade, 'parent_trade_id')
+        # Group rows per account, keeping upload order so earlier files win on overlap
+        account_trades = {}
+        for account_id, records in zip(account_ids, parsed_files):
+            account_trades.setdefault(account_id, []).extend(
+                Trade(account_id=account_id, **record) for record in records
+            )
         
-        # Now update open_date and other parent-dependent fields AFTER parent relationships are set
-        for trade in trades:
-            # Handle single-entry closes (new format: has close_date and close_premium/close_method, no parent_trade_id)
-            if trade.close_date and (trade.close_premium is not None or trade.close_method) and not trade.parent_trade_id:
-                # Single-entry close: ensure open_date is set (should be trade_date if not provided)
-                if not trade.open_date:
-                    trade.open_date = trade.trade_date
-                # Ensure status is set correctly based on close_method
-                if trade.close_method == 'expired':
-                    trade.status = 'Expired'
-                elif trade.close_method == 'assigned':
-                    trade.status = 'Assigned'
-                elif trade.close_method == 'called_away':
-                    trade.status = 'Called Away'
-                elif trade.close_method in ['buy_to_close', 'sell_to_close', 'exercise']:
-                    trade.status = 'Closed'
-                elif not trade.status or trade.status == 'Open':
-                    # Default to Closed if status not set
-                    trade.status = 'Closed'
-            
-            # Handle two-entry closes (old format: has parent_trade_id)
-            elif trade.parent_trade_id and trade.trade_action in ['Bought to Close', 'Sold to Close']:
-                parent = Trade.query.get(trade.parent_trade_id)
-                if parent:
-                    if not trade.open_date:
-                        trade.open_date = parent.trade_date
-                    # Ensure close_date is set if not provided
-                    if not trade.close_date:
-                        trade.close_date = trade.trade_date
-                    # Set closing trade status to Closed
-                    trade.status = 'Closed'
-                    # Update parent trade status if it's fully closed
-                    remaining_qty = parent.get_remaining_open_quantity()
-                    if remaining_qty == 0:
-                        # Parent is fully closed, update its status
-                        if parent.status == 'Open':
-                            parent.status = 'Closed'
-                        if not parent.close_date:
-                            parent.close_date = trade.trade_date
-                        if not parent.open_date:
-                            parent.open_date = parent.trade_date
-            
-            # For Assignment trades, ensure status is 'Assigned'
-            if trade.trade_type == 'Assignment':
-                trade.status = 'Assigned'
-                # Set parent's close_date if parent is a CSP
-                if trade.parent_trade_id:
-                    parent = Trade.query.get(trade.parent_trade_id)
-                    if parent and parent.trade_type == 'CSP':
-                        parent.status = 'Assigned'
-                        parent.close_date = trade.trade_date
-                        if not parent.open_date:
-                            parent.open_date = parent.trade_date
+        new_trades = []
+        skipped_count = 0
+        for account_id, trades in account_trades.items():
+            imported, skipped = import_parsed_trades(trades, account_id)
+            new_trades.extend(imported)
+            skipped_count += skipped
         
         # Commit all changes
         db.session.commit()
         
+        if not new_trades:
+            return jsonify({
+                'message': f'No new trades to import ({skipped_count} already imported)',
+                'count': 0,
+                'skipped': skipped_count,
+                'files': len(files)
+            }), 200
+        
+        message = f'Successfully imported {len(new_trades)} trades'
+        if len(files) > 1:
+            message += f' from {len(files)} files'
+        if skipped_count:
+            message += f' ({skipped_count} already imported, skipped)'
         return jsonify({
-            'message': f'Successfully imported {len(trades)} trades',
-            'count': len(trades)
+            'message': message,
+            'count': len(new_trades),
+            'skipped': skipped_count,
+            'files': len(files)
         }), 201
     except Exception as e:
         db.session.rollback()
@@ -981,6 +1070,9 @@ def import_trades():
 @jwt_required()
 def export_template():
     """Export a template CSV/Excel file with example data showing required format"""
+    # pandas is imported on first use so it stays out of worker start-up (see tests/test_import_budget.py)
+    import pandas as pd
+
     format_type = request.args.get('format', 'csv').lower()
     
     # Create comprehensive template data showing various trade scenarios
@@ -1262,10 +1354,32 @@ def export_template():
             download_name='trades_template.csv'
         )
 
+def _stream_export_rows(model, columns, account_ids, order_by):
+    """
+    Yield export rows for the given accounts directly from the database cursor.
+    Only the exported columns are selected (no ORM objects), and rows are fetched
+    in batches of EXPORT_BATCH_SIZE (server-side cursor on PostgreSQL).
+    """
+    statement = (
+        select(*[getattr(model, column) for column in columns])
+        .where(model.account_id.in_(account_ids))
+        .order_by(order_by)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    for row in db.session.execute(statement):
+        yield tuple(row)
+
 @trades_bp.route('/export', methods=['GET'])
+@long_statement_timeout
 @jwt_required()
+@read_from_replica
 def export_trades():
-    """Export all user's trades to CSV/Excel file"""
+    """
+    Export all user's trades to CSV/Excel file.
+    
+    Excel exports are streamed row by row and can include extra sheets with
+    include_deposits=true, include_withdrawals=true and include_stock_positions=true.
+    """
     user_id = get_user_id()
     format_type = request.args.get('format', 'csv').lower()
     account_id = request.args.get('account_id', type=int)
@@ -1282,6 +1396,59 @@ def export_trades():
     
     if account_id and account_id in account_ids:
         query = query.filter_by(account_id=account_id)
+        export_account_ids = [account_id]
+    else:
+        export_account_ids = account_ids
+    
+    if format_type == 'excel' or format_type == 'xlsx':
+        # Optional extra sheets (e.g. ?include_deposits=true)
+        include_deposits = request.args.get('include_deposits', 'false').lower() == 'true'
+        include_withdrawals = request.args.get('include_withdrawals', 'false').lower() == 'true'
+        include_stock_positions = request.args.get('include_stock_positions', 'false').lower() == 'true'
+        
+        if not db.session.query(query.exists()).scalar():
+            return jsonify({'error': 'No trades found to export'}), 404
+        
+        # Stream rows from the database straight into a write-only workbook
+        # so large accounts never materialize the full trade list in memory
+        sheets = [(
+            'Trades',
+            TRADE_EXPORT_COLUMNS,
+            _stream_export_rows(Trade, TRADE_EXPORT_COLUMNS, export_account_ids, Trade.trade_date.desc())
+        )]
+        if include_deposits:
+            sheets.append((
+                'Deposits',
+                DEPOSIT_EXPORT_COLUMNS,
+                _stream_export_rows(Deposit, DEPOSIT_EXPORT_COLUMNS, export_account_ids, Deposit.deposit_date.desc())
+            ))
+        if include_withdrawals:
+            sheets.append((
+                'Withdrawals',
+                WITHDRAWAL_EXPORT_COLUMNS,
+                _stream_export_rows(Withdrawal, WITHDRAWAL_EXPORT_COLUMNS, export_account_ids, Withdrawal.withdrawal_date.desc())
+            ))
+        if include_stock_positions:
+            sheets.append((
+                'Stock Positions',
+                STOCK_POSITION_EXPORT_COLUMNS,
+                _stream_export_rows(StockPosition, STOCK_POSITION_EXPORT_COLUMNS, export_account_ids, StockPosition.acquired_date.desc())
+            ))
+        
+        # Create Excel file
+        try:
+            # Spill to disk past a few MB so the finished file isn't held in memory either
+            output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+            write_streaming_workbook(output, sheets)
+            output.seek(0)
+            return send_file(
+                output,
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                as_attachment=True,
+                download_name=f'trades_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+            )
+        except Exception as e:
+            return jsonify({'error': f'Failed to create Excel file: {str(e)}'}), 500
     
     trades = query.order_by(Trade.trade_date.desc()).all()
     
@@ -1338,41 +1505,26 @@ def export_trades():
         export_data['close_method'].append(trade.close_method if trade.close_method else None)
         export_data['notes'].append(trade.notes if trade.notes else '')
     
+    import pandas as pd
     try:
         df = pd.DataFrame(export_data)
     except Exception as e:
         return jsonify({'error': f'Failed to create export data: {str(e)}'}), 500
     
-    if format_type == 'excel' or format_type == 'xlsx':
-        # Create Excel file
-        try:
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Trades')
-            output.seek(0)
-            return send_file(
-                output,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                as_attachment=True,
-                download_name=f'trades_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-            )
-        except Exception as e:
-            return jsonify({'error': f'Failed to create Excel file: {str(e)}'}), 500
-    else:
-        # Create CSV file
-        try:
-            output = io.StringIO()
-            df.to_csv(output, index=False)
-            output.seek(0)
-            csv_bytes = output.getvalue().encode('utf-8')
-            return send_file(
-                io.BytesIO(csv_bytes),
-                mimetype='text/csv',
-                as_attachment=True,
-                download_name=f'trades_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-            )
-        except Exception as e:
-            return jsonify({'error': f'Failed to create CSV file: {str(e)}'}), 500
+    # Create CSV file
+    try:
+        output = io.StringIO()
+        df.to_csv(output, index=False)
+        output.seek(0)
+        csv_bytes = output.getvalue().encode('utf-8')
+        return send_file(
+            io.BytesIO(csv_bytes),
+            mimetype='text/csv',
+            as_attachment=True,
+            download_name=f'trades_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        )
+    except Exception as e:
+        return jsonify({'error': f'Failed to create CSV file: {str(e)}'}), 500
 
 @trades_bp.route('/<int:trade_id>/close', methods=['POST'])
 @jwt_required()
@@ -1451,6 +1603,16 @@ def close_trade(trade_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _reserve_open_contracts(trade, contract_quantity):
+    """
+    Take contract_quantity off the trade's stored open count before closing them.
+    Returns an error response if another request closed them first, else None.
+    """
+    if not trade.reserve_open_quantity(contract_quantity):
+        db.session.rollback()
+        return jsonify({'error': 'Those contracts were just closed by another request. Refresh and try again.'}), 409
+    return None
+
 def handle_buy_to_close(trade, data):
     """Handle Buy to Close for CSP or Covered Call"""
     if trade.trade_action not in ['Sold to Open']:
@@ -1484,6 +1646,11 @@ def handle_buy_to_close(trade, data):
     # Calculate premium (negative for buying)
     premium = calculate_premium(trade_price, 'Bought to Close', contract_quantity, fees)
     
+    # Atomically reserve the contracts being closed
+    conflict = _reserve_open_contracts(trade, contract_quantity)
+    if conflict:
+        return conflict
+    
     # Check if this is a full close or partial close
     total_closed = remaining_qty - contract_quantity
     is_full_close = total_closed <= 0
@@ -1564,6 +1731,11 @@ def handle_sell_to_close(trade, data):
     # Calculate premium (positive for selling)
     premium = calculate_premium(trade_price, 'Sold to Close', contract_quantity, fees)
     
+    # Atomically reserve the contracts being closed
+    conflict = _reserve_open_contracts(trade, contract_quantity)
+    if conflict:
+        return conflict
+    
     # Check if this is a full close or partial close
     total_closed = remaining_qty - contract_quantity
     is_full_close = total_closed <= 0
@@ -1635,6 +1807,11 @@ def handle_expired(trade, data):
         '%Y-%m-%d'
     ).date()
     
+    # Atomically reserve the contracts being closed
+    conflict = _reserve_open_contracts(trade, contract_quantity)
+    if conflict:
+        return conflict
+    
     # Check if this is a full close or partial close
     total_closed = remaining_qty - contract_quantity
     is_full_close = total_closed <= 0
@@ -1724,6 +1901,11 @@ def handle_assigned(trade, data):
     
     # Handle CSP assignment (creates stock position)
     if trade.trade_type == 'CSP':
+        # Atomically reserve the contracts being closed
+        conflict = _reserve_open_contracts(trade, contract_quantity)
+        if conflict:
+            return conflict
+        
         # Create assignment trade
         assignment_trade = Trade(
             account_id=trade.account_id,
@@ -1743,6 +1925,8 @@ def handle_assigned(trade, data):
         )
         
         db.session.add(assignment_trade)
+        # The stock position below links back to the assignment by id
+        db.session.flush()
         
         # Update parent CSP
         total_assigned = remaining_qty - contract_quantity
@@ -1828,6 +2012,11 @@ def handle_called_away(trade, data):
     if shares_called_away > stock_position.shares:
         return jsonify({'error': f'Insufficient shares in stock position. Need {shares_called_away} shares, but only {stock_position.shares} available.'}), 400
     
+    # Atomically reserve the contracts being closed
+    conflict = _reserve_open_contracts(trade, contract_quantity)
+    if conflict:
+        return conflict
+    
     # Update parent Covered Call
     total_called_away = remaining_qty - contract_quantity
     is_full_call_away = total_called_away <= 0
@@ -1924,6 +2113,11 @@ def handle_exercise(trade, data):
     if not exercise_price:
         return jsonify({'error': 'Strike price is required for exercise'}), 400
     
+    # Atomically reserve the contracts being closed
+    conflict = _reserve_open_contracts(trade, contract_quantity)
+    if conflict:
+        return conflict
+    
     # Update LEAPS trade to closed (exercised)
     total_exercised = remaining_qty - contract_quantity
     is_full_exercise = total_exercised <= 0
@@ -1938,10 +2132,37 @@ def handle_exercise(trade, data):
         trade.close_method = 'exercise'
         if data.get('notes'):
             trade.notes = (trade.notes or '') + f'\n{data["notes"]}'
+        response_trade, status_code = trade, 200
     else:
-        # PARTIAL EXERCISE: Keep remaining open
+        # PARTIAL EXERCISE: Create closing trade so the exercised contracts stay closed
+        # when remaining_open_quantity is re-derived from the children
+        closing_trade = Trade(
+            account_id=trade.account_id,
+            symbol=trade.symbol,
+            trade_type=trade.trade_type,
+            position_type='Close',
+            strike_price=trade.strike_price,
+            expiration_date=trade.expiration_date,
+            contract_quantity=contract_quantity,
+            trade_price=None,  # No option price for exercise
+            trade_action=trade.trade_action,  # Keep same action as parent (e.g., 'Bought to Open')
+            premium=0,  # No premium for exercise
+            fees=0,
+            trade_date=exercise_date,
+            open_date=trade.trade_date,
+            close_date=exercise_date,
+            close_price=exercise_price,
+            status='Closed',
+            parent_trade_id=trade.id,
+            close_method='exercise',
+            notes=data.get('notes')
+        )
+        db.session.add(closing_trade)
+        
+        # Update parent trade status (keep open for partial exercise)
         trade.status = 'Open'
         trade.close_date = None
+        response_trade, status_code = closing_trade, 201
     
     if not trade.open_date:
         trade.open_date = trade.trade_date
@@ -1963,9 +2184,6 @@ def handle_exercise(trade, data):
         )
         db.session.add(stock_position)
     
-    if data.get('notes'):
-        trade.notes = (trade.notes or '') + f'\n{data["notes"]}'
-    
     db.session.commit()
-    return jsonify(trade.to_dict(include_realized_pnl=True)), 200
+    return jsonify(response_trade.to_dict(include_realized_pnl=True)), status_code
 
@@ -5,43 +5,36 @@ import pytest
 import os
 import sys
 from datetime import datetime, date
-from flask import Flask
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import app, db
+from app import create_app, db
 from models import User, Account, Trade, StockPosition
 
 @pytest.fixture(scope='function')
-def test_app():
+def test_app(tmp_path):
     """Create a test Flask application"""
-    # Use in-memory SQLite database for testing
-    # Create a fresh app instance to avoid config conflicts
-    test_app = Flask(__name__)
-    test_app.config['TESTING'] = True
-    # Use unique database URI for each test to avoid conflicts
-    import uuid
-    test_app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///:memory:{uuid.uuid4().hex[:8]}'
-    test_app.config['JWT_SECRET_KEY'] = 'test-secret-key'
-    test_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    test_app.config['FINNHUB_API_KEY'] = 'test-key'
-    
-    # Initialize extensions
-    from flask_cors import CORS
-    from flask_jwt_extended import JWTManager
-    db.init_app(test_app)
-    jwt = JWTManager(test_app)
-    CORS(test_app)
+    # Each test gets its own SQLite file, with the same pool and pragmas as production
+    test_app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "test.db"}',
+        'JWT_SECRET_KEY': 'test-secret-key',
+        'FINNHUB_API_KEY': 'test-key',
+        'IMPORT_PARSE_WORKERS': 1,
+        'MONTE_CARLO_WORKERS': 1
+    })
     
     with test_app.app_context():
-        db.create_all()
+        # Primary only: the replica bind (tests/test_read_replica.py) has no tables of its own
+        db.create_all(bind_key=None)
         yield test_app
         db.session.remove()
-        db.drop_all()
-        db.session.close()
+        # No drop_all: with foreign keys enforced SQLite can't order the trades <-> stock_positions
+        # cycle, and tmp_path removes the file anyway
+        db.engine.dispose()
 
 @pytest.fixture(scope='function')
 def test_client(test_app):
@@ -97,3 +90,168 @@ def auth_headers(test_app, test_user):
     with test_app.app_context():
         token = create_access_token(identity=test_user.id)
         return {'Authorization': f'Bearer {token}'}
+
+@pytest.fixture(scope='function')
+def open_leg(test_app):
+    """
+    Factory for an open option leg, traded 2025-01-06 and expiring 2025-02-21 unless overridden:
+
+        csp = open_leg(account_id, 'AAPL', 'CSP', 'Sold to Open', 150.00, 300.00, quantity=2)
+    """
+    def make(account_id, symbol, trade_type, trade_action, strike, premium, quantity=1,
+             expiration=date(2025, 2, 21), **kwargs):
+        trade = Trade(
+            account_id=account_id,
+            symbol=symbol,
+            trade_type=trade_type,
+            position_type='Open',
+            strike_price=strike,
+            expiration_date=expiration,
+            contract_quantity=quantity,
+            trade_action=trade_action,
+            premium=premium,
+            fees=0,
+            trade_date=kwargs.pop('trade_date', date(2025, 1, 6)),
+            status='Open',
+            **kwargs
+        )
+        db.session.add(trade)
+        db.session.commit()
+        return trade
+    return make
+
+@pytest.fixture(scope='function')
+def open_csp(test_app):
+    """
+    Factory for an open AAPL 150 CSP expiring 2025-06-20, committed:
+
+        csp = open_csp(account_id, date(2025, 1, 6), premium=400.00, quantity=2)
+    """
+    def make(account_id, trade_date, premium=200.00, quantity=1):
+        trade = Trade(
+            account_id=account_id,
+            symbol='AAPL',
+            trade_type='CSP',
+            position_type='Open',
+            strike_price=150.00,
+            expiration_date=date(2025, 6, 20),
+            contract_quantity=quantity,
+            trade_price=premium / (100 * quantity),
+            trade_action='Sold to Open',
+            premium=premium,
+            fees=0,
+            trade_date=trade_date,
+            status='Open'
+        )
+        db.session.add(trade)
+        db.session.commit()
+        return trade
+    return make
+
+@pytest.fixture(scope='function')
+def add_trade(test_app):
+    """
+    Factory for a trade flushed (not committed) with the given links; symbol AAPL, strike 150,
+    one contract and no premium unless overridden:
+
+        call = add_trade(account_id, 'Covered Call', 'Sold to Open', date(2025, 2, 24), stock_position_id=lot.id)
+    """
+    def make(account_id, trade_type, trade_action, trade_date, **kwargs):
+        trade = Trade(
+            account_id=account_id,
+            symbol=kwargs.pop('symbol', 'AAPL'),
+            trade_type=trade_type,
+            position_type=kwargs.pop('position_type', 'Open'),
+            strike_price=kwargs.pop('strike_price', 150.00),
+            contract_quantity=kwargs.pop('contract_quantity', 1),
+            trade_action=trade_action,
+            premium=kwargs.pop('premium', 0),
+            fees=0,
+            trade_date=trade_date,
+            status=kwargs.pop('status', 'Open'),
+            **kwargs
+        )
+        db.session.add(trade)
+        db.session.flush()
+        return trade
+    return make
+
+@pytest.fixture(scope='function')
+def wheel(add_trade):
+    """
+    Factory for a whole AAPL wheel: CSP -> assignment (15.00 fee) -> 100 shares at 147 ->
+    call bought back -> call called away at 152.50. Returns (csp, assignment, lot, calls, buy_back).
+    """
+    def make(account_id, lot_status='Called Away', final_call_status='Called Away'):
+        csp = add_trade(account_id, 'CSP', 'Sold to Open', date(2025, 1, 6), premium=300.00, status='Assigned',
+                        close_date=date(2025, 2, 21))
+        assignment = add_trade(account_id, 'Assignment', None, date(2025, 2, 21), position_type='Assignment',
+                               parent_trade_id=csp.id, assignment_price=150.00, assignment_fee=15.00,
+                               status='Assigned')
+        lot = StockPosition(account_id=account_id, symbol='AAPL', shares=100, cost_basis_per_share=147.00,
+                            acquired_date=date(2025, 2, 21), status=lot_status, source_trade_id=assignment.id)
+        db.session.add(lot)
+        db.session.flush()
+        rolled_call = add_trade(account_id, 'Covered Call', 'Sold to Open', date(2025, 2, 24), strike_price=155.00,
+                                premium=150.00, status='Closed', stock_position_id=lot.id, shares_used=100,
+                                close_date=date(2025, 3, 10))
+        buy_back = add_trade(account_id, 'Covered Call', 'Bought to Close', date(2025, 3, 10), position_type='Close',
+                             strike_price=155.00, premium=-40.00, status='Closed', parent_trade_id=rolled_call.id)
+        final_call = add_trade(account_id, 'Covered Call', 'Sold to Open', date(2025, 3, 10), strike_price=152.50,
+                               premium=110.00, status=final_call_status, stock_position_id=lot.id, shares_used=100,
+                               close_date=date(2025, 4, 17) if final_call_status != 'Open' else None)
+        db.session.commit()
+        return csp, assignment, lot, [rolled_call, final_call], buy_back
+    return make
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+class QueryBudget:
+    """
+    Count the SQL statements run on an engine inside a with block and fail if there
+    were more than the budget, listing every statement (an N+1 shows up as the same
+    statement repeated with different parameters).
+    """
+
+    def __init__(self, engine, budget, label=None):
+        self.engine = engine
+        self.budget = budget
+        self.label = label
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((' '.join(statement.split()), parameters))
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+        if exc_type is None and self.count > self.budget:
+            raise QueryBudgetExceeded(self.report())
+        return False
+
+    def report(self):
+        lines = [f'{self.label or "Block"} ran {self.count} queries (budget {self.budget}):']
+        for i, (statement, parameters) in enumerate(self.statements, 1):
+            lines.append(f'  {i}. {statement}  {parameters!r:.120}')
+        return '\n'.join(lines)
+
+@pytest.fixture(scope='function')
+def query_budget(test_app):
+    """
+    Assert a block stays within a SQL query budget:
+
+        with query_budget(8, 'GET /api/dashboard/ticker-performance'):
+            client.get('/api/dashboard/ticker-performance', headers=headers)
+    """
+    def budget(max_queries, label=None):
+        with test_app.app_context():
+            return QueryBudget(db.engine, max_queries, label)
+    return budget
@@ -0,0 +1,113 @@
+"""
+Tests for the set-based total_capital in the accounts list
+"""
+import pytest
+from datetime import date
+from sqlalchemy import event
+from models import db, Account, Deposit, Withdrawal, Trade, StockPosition
+from routes.accounts import get_accounts_with_capital
+from routes.dashboard import get_total_capital, get_total_capital_at_date
+from routes.trades import handle_buy_to_close, handle_expired, handle_called_away
+from utils.capital_utils import get_capital_at_date_by_account
+
+class TestAccountsTotalCapital:
+    """Test total capital for all accounts is computed in one query"""
+
+    def test_total_capital_matches_dashboard(self, test_app, test_account, open_csp):
+        """Test the aggregate query agrees with the per-account dashboard calculation"""
+        with test_app.app_context():
+            user_id = test_account.user_id
+            second = Account(user_id=user_id, name='IRA', initial_balance=2500.00)
+            empty = Account(user_id=user_id, name='Empty', initial_balance=0)
+            db.session.add_all([second, empty])
+            db.session.commit()
+
+            db.session.add(Deposit(account_id=test_account.id, amount=5000.00, deposit_date=date(2025, 1, 2)))
+            db.session.add(Deposit(account_id=test_account.id, amount=250.00, deposit_date=date(2025, 2, 2)))
+            db.session.add(Withdrawal(account_id=second.id, amount=500.00, withdrawal_date=date(2025, 3, 3)))
+            db.session.commit()
+            handle_buy_to_close(open_csp(test_account.id, date(2025, 1, 6)), {'trade_price': '0.50', 'close_date': '2025-01-20'})
+            handle_expired(open_csp(second.id, date(2025, 2, 3), premium=300.00), {'close_date': '2025-03-21'})
+            open_csp(second.id, date(2025, 4, 1))
+
+            totals = {account['id']: account['total_capital'] for account in get_accounts_with_capital(user_id)}
+
+            assert totals == {test_account.id: 15400.0, second.id: 2300.0, empty.id: 0.0}
+            for account_id, total in totals.items():
+                assert total == round(get_total_capital(account_id, user_id), 2)
+
+    def test_single_query_for_any_number_of_accounts(self, test_app, test_account, open_csp):
+        """Test listing accounts runs one SQL statement regardless of accounts, deposits or trades"""
+        with test_app.app_context():
+            user_id = test_account.user_id
+            for i in range(5):
+                account = Account(user_id=user_id, name=f'Account {i}', initial_balance=1000)
+                db.session.add(account)
+                db.session.commit()
+                db.session.add(Deposit(account_id=account.id, amount=100, deposit_date=date(2025, 1, 2)))
+                db.session.commit()
+                for day in (6, 13):
+                    handle_expired(open_csp(account.id, date(2025, 1, day)), {'close_date': '2025-02-21'})
+            db.session.expunge_all()
+
+            statements = []
+            def count(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                accounts = get_accounts_with_capital(user_id)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+
+            assert len(accounts) == 6
+            assert len(statements) == 1
+            assert accounts[1]['total_capital'] == 1500.0
+
+    def test_capital_at_date_for_all_accounts(self, test_app, test_account, open_csp):
+        """Test the grouped capital-at-date agrees with the per-account calculation, to the day"""
+        with test_app.app_context():
+            user_id = test_account.user_id
+            second = Account(user_id=user_id, name='IRA', initial_balance=2500.00)
+            db.session.add(second)
+            db.session.commit()
+
+            db.session.add(Deposit(account_id=test_account.id, amount=250.00, deposit_date=date(2025, 2, 2)))
+            db.session.add(Withdrawal(account_id=second.id, amount=500.00, withdrawal_date=date(2025, 3, 3)))
+            db.session.commit()
+            handle_buy_to_close(open_csp(test_account.id, date(2025, 1, 6)), {'trade_price': '0.50', 'close_date': '2025-01-20'})
+            handle_expired(open_csp(second.id, date(2025, 2, 3), premium=300.00), {'close_date': '2025-03-21'})
+            trades = Trade.query.options(*Trade.pnl_loader_options()).filter(Trade.parent_trade_id.is_(None)).all()
+
+            for as_of in (date(2025, 1, 19), date(2025, 2, 1), date(2025, 2, 2), date(2025, 3, 20), date(2025, 3, 21)):
+                capital = get_capital_at_date_by_account([test_account.id, second.id], as_of, trades)
+                assert capital == {
+                    account_id: get_total_capital_at_date(account_id, user_id, as_of)
+                    for account_id in (test_account.id, second.id)
+                }
+            assert capital == {test_account.id: 10400.0, second.id: 2300.0}
+
+    def test_detail_and_list_agree(self, test_app, test_client, test_account, auth_headers, open_csp):
+        """Test GET /api/accounts/<id> reports the list's total_capital with two-entry closes and a call-away"""
+        with test_app.app_context():
+            account_id = test_account.id
+            csp = open_csp(account_id, date(2025, 1, 6), premium=600.00, quantity=3)
+            handle_buy_to_close(csp, {'trade_price': '0.50', 'contract_quantity': 1, 'close_date': '2025-01-20'})
+
+            lot = StockPosition(account_id=account_id, symbol='AAPL', shares=100, cost_basis_per_share=150.00,
+                                acquired_date=date(2025, 2, 1), status='Open')
+            db.session.add(lot)
+            db.session.commit()
+            call = Trade(account_id=account_id, symbol='AAPL', trade_type='Covered Call', position_type='Open',
+                         strike_price=160.00, expiration_date=date(2025, 3, 21), contract_quantity=1,
+                         trade_price=2.00, trade_action='Sold to Open', premium=200.00, fees=0,
+                         trade_date=date(2025, 2, 3), status='Open', stock_position_id=lot.id, shares_used=100)
+            db.session.add(call)
+            db.session.commit()
+            handle_called_away(call, {'close_date': '2025-03-21', 'assignment_fee': 5})
+
+            listed = {account['id']: account['total_capital']
+                      for account in test_client.get('/api/accounts', headers=auth_headers).get_json()}
+            detail = test_client.get(f'/api/accounts/{account_id}', headers=auth_headers).get_json()
+
+            assert detail['total_capital'] == listed[account_id]
+            assert detail['total_capital'] == round(get_total_capital(account_id, test_account.user_id), 2)
@@ -0,0 +1,43 @@
+"""
+Tests for create_app: importing the app does no I/O and each call builds an independent app
+"""
+import os
+import subprocess
+import sys
+from sqlalchemy import inspect
+from app import create_app, initialize_database
+from models import db
+from utils.migrations import get_schema_version, LATEST_VERSION
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestAppFactory:
+    """Test the app factory defers database, thread and print side effects"""
+
+    def test_import_has_no_side_effects(self, tmp_path):
+        """Test importing app prints nothing, starts no thread and never opens the database"""
+        database = tmp_path / 'import.db'
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', FLASK_ENV='production')
+        result = subprocess.run([sys.executable, '-c', 'import threading, app; print(threading.active_count())'],
+                                cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=60)
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout == '1\n'
+        assert not database.exists()
+
+    def test_apps_are_independent(self, tmp_path):
+        """Test two apps keep their own config and database, and only initialize_database migrates"""
+        first = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "first.db"}', 'METRICS_TOKEN': 'first'})
+        second = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "second.db"}'})
+
+        assert first.config['METRICS_TOKEN'] == 'first'
+        assert second.config['METRICS_TOKEN'] != 'first'
+        assert '/api/trades' in {rule.rule for rule in second.url_map.iter_rules()}
+        assert not (tmp_path / 'first.db').exists()
+
+        initialize_database(first)
+        with first.app_context():
+            assert get_schema_version() == LATEST_VERSION
+        with second.app_context():
+            assert get_schema_version() == 0
+            assert 'trades' not in inspect(db.engine).get_table_names()
@@ -37,6 +37,7 @@ class TestDashboardFiltering:
                 open_date=date(2025, 1, 1)
             )
             db.session.add(opening)
+            db.session.flush()
             
             # Create a closing trade (should be filtered)
             closing = Trade(
@@ -55,7 +56,7 @@ class TestDashboardFiltering:
                 open_date=date(2025, 1, 10),
                 close_date=date(2025, 1, 20),
                 status='Closed',
-                parent_trade_id=999  # Some parent ID
+                parent_trade_id=opening.id  # Must reference a real trade (foreign keys are enforced)
             )
             db.session.add(closing)
             db.session.commit()
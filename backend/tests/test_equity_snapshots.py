@@ -0,0 +1,153 @@
+"""
+Tests for daily account snapshots behind the equity curve
+"""
+import pytest
+from datetime import date, timedelta
+from models import db, Trade, Deposit, Withdrawal, AccountSnapshot
+from routes.dashboard import get_total_capital_at_date
+from routes.trades import handle_buy_to_close, handle_expired
+from utils.equity_snapshots import sweep_account_snapshots, record_today_snapshot, ensure_snapshots
+
+def _open_trade(account_id, trade_date, symbol='AAPL', strike=150.00, premium=200.00, quantity=1):
+    trade = Trade(
+        account_id=account_id,
+        symbol=symbol,
+        trade_type='CSP',
+        position_type='Open',
+        strike_price=strike,
+        expiration_date=trade_date + timedelta(days=45),
+        contract_quantity=quantity,
+        trade_price=premium / (100 * quantity),
+        trade_action='Sold to Open',
+        premium=premium,
+        fees=0,
+        trade_date=trade_date,
+        status='Open'
+    )
+    db.session.add(trade)
+    db.session.commit()
+    return trade
+
+def _seed_history(account_id):
+    """Deposit, a CSP closed early, a CSP that expired and one still open"""
+    db.session.add(Deposit(account_id=account_id, amount=5000.00, deposit_date=date(2025, 1, 2)))
+    db.session.add(Withdrawal(account_id=account_id, amount=1000.00, withdrawal_date=date(2025, 3, 3)))
+    db.session.commit()
+
+    closed = _open_trade(account_id, date(2025, 1, 6))
+    handle_buy_to_close(closed, {'trade_price': '0.50', 'close_date': '2025-01-20'})
+    expired = _open_trade(account_id, date(2025, 2, 3), symbol='MSFT', strike=300.00, premium=300.00)
+    handle_expired(expired, {'close_date': '2025-03-21'})
+    _open_trade(account_id, date(2025, 4, 1), symbol='AMD', strike=100.00, premium=150.00, quantity=2)
+
+class TestEquitySnapshots:
+    """Test the chronological sweep and the incremental daily snapshot"""
+
+    def test_sweep_tracks_capital_and_exposure(self, test_app, test_account):
+        """Test each day reflects cash flows, realized P&L and open positions"""
+        with test_app.app_context():
+            account_id = test_account.id
+            _seed_history(account_id)
+
+            rows = sweep_account_snapshots(test_account, end_date=date(2025, 4, 30))
+            by_date = {row['snapshot_date']: row for row in rows}
+            assert rows[0]['snapshot_date'] == date(2025, 1, 2)
+
+            # AAPL CSP open: 150 strike x 100 at risk
+            assert by_date[date(2025, 1, 10)]['capital_at_risk'] == 15000.0
+            assert by_date[date(2025, 1, 10)]['open_premium'] == 200.0
+            assert by_date[date(2025, 1, 10)]['total_capital'] == 15000.0
+            # Bought back for 50 on the 20th
+            assert by_date[date(2025, 1, 20)]['capital_at_risk'] == 0
+            assert by_date[date(2025, 1, 20)]['realized_pnl'] == 150.0
+            # MSFT expires on the 21st, after the withdrawal on the 3rd
+            assert by_date[date(2025, 3, 20)]['total_capital'] == 14150.0
+            assert by_date[date(2025, 3, 21)]['total_capital'] == 14450.0
+            # Two AMD contracts still open
+            assert by_date[date(2025, 4, 30)]['capital_at_risk'] == 20000.0
+            assert by_date[date(2025, 4, 30)]['open_premium'] == 150.0
+
+    def test_sweep_matches_capital_at_date(self, test_app, test_account):
+        """Test the sweep agrees with the per-date calculation it replaces"""
+        with test_app.app_context():
+            account_id = test_account.id
+            _seed_history(account_id)
+
+            rows = sweep_account_snapshots(test_account, end_date=date(2025, 4, 30))
+            for row in rows[::7]:
+                expected = get_total_capital_at_date(account_id, test_account.user_id, row['snapshot_date'])
+                assert row['total_capital'] == round(expected, 2)
+
+    def test_today_snapshot_matches_sweep(self, test_app, test_account):
+        """Test the aggregate-based daily snapshot equals the swept value for the same day"""
+        with test_app.app_context():
+            account_id = test_account.id
+            _seed_history(account_id)
+            today = date.today()
+
+            swept = sweep_account_snapshots(test_account, start_date=today, end_date=today)[0]
+            snapshot = record_today_snapshot(test_account, today)
+            db.session.commit()
+
+            for field in ('total_capital', 'realized_pnl', 'open_premium', 'capital_at_risk'):
+                assert float(getattr(snapshot, field)) == swept[field]
+
+    def test_ensure_snapshots_backfills_then_appends(self, test_app, test_account):
+        """Test first use backfills history and later calls only add the missing days"""
+        with test_app.app_context():
+            account_id = test_account.id
+            _seed_history(account_id)
+            today = date(2025, 5, 31)
+
+            ensure_snapshots([account_id], today=date(2025, 5, 1))
+            db.session.commit()
+            assert AccountSnapshot.query.filter_by(account_id=account_id).count() == (date(2025, 5, 1) - date(2025, 1, 2)).days + 1
+
+            ensure_snapshots([account_id], today=today)
+            db.session.commit()
+            snapshots = AccountSnapshot.query.filter_by(account_id=account_id).order_by(AccountSnapshot.snapshot_date).all()
+            assert len(snapshots) == (today - date(2025, 1, 2)).days + 1
+            assert snapshots[-1].snapshot_date == today
+            assert float(snapshots[-2].capital_at_risk) == 20000.0
+
+    def test_earlier_changes_invalidate_later_snapshots(self, test_app, test_account):
+        """Test editing a past cash flow or trade deletes the snapshots from that date on"""
+        with test_app.app_context():
+            account_id = test_account.id
+            _seed_history(account_id)
+            ensure_snapshots([account_id], today=date(2025, 5, 31))
+            db.session.commit()
+
+            def last_snapshot():
+                return db.session.query(db.func.max(AccountSnapshot.snapshot_date)).filter_by(account_id=account_id).scalar()
+
+            trade = Trade.query.filter_by(account_id=account_id, symbol='AMD').one()
+            trade.premium = 250.00
+            db.session.commit()
+            # Trade changes count from the first of their month, like the monthly P&L rollup
+            assert last_snapshot() == date(2025, 3, 31)
+
+            withdrawal = Withdrawal.query.filter_by(account_id=account_id).one()
+            withdrawal.amount = 500.00
+            db.session.commit()
+            assert last_snapshot() == date(2025, 3, 2)
+
+    def test_equity_curve_reads_without_writing(self, test_app, test_client, test_account, auth_headers):
+        """Test the endpoint sweeps unrecorded days in memory and leaves account_snapshots alone"""
+        with test_app.app_context():
+            account_id = test_account.id
+            _seed_history(account_id)
+            ensure_snapshots([account_id], today=date(2025, 5, 31))
+            db.session.commit()
+            db.session.add(Deposit(account_id=account_id, amount=1000.00, deposit_date=date(2025, 4, 15)))
+            db.session.commit()
+            stored = AccountSnapshot.query.filter_by(account_id=account_id).count()
+
+            response = test_client.get('/api/dashboard/equity-curve?start_date=2025-04-10&end_date=2025-04-20',
+                                       headers=auth_headers)
+            assert response.status_code == 200
+            series = {point['date']: point for point in response.get_json()['series']}
+            assert series['2025-04-10']['total_capital'] == 14450.0  # Recorded
+            assert series['2025-04-15']['total_capital'] == 15450.0  # Swept after the new deposit
+            assert series['2025-04-20']['capital_at_risk'] == 20000.0
+            assert AccountSnapshot.query.filter_by(account_id=account_id).count() == stored
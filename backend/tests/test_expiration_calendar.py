@@ -0,0 +1,103 @@
+"""
+Tests for the expiration calendar endpoint helper
+"""
+import pytest
+from datetime import date
+from sqlalchemy import event, text
+from models import db, Trade
+from routes.dashboard import get_expiration_calendar_groups
+
+def _open(account_id, symbol, expiration_date, strike=100.00, quantity=1, premium=100.00, status='Open', trade_type='CSP'):
+    trade = Trade(
+        account_id=account_id,
+        symbol=symbol,
+        trade_type=trade_type,
+        position_type='Open',
+        strike_price=strike,
+        expiration_date=expiration_date,
+        contract_quantity=quantity,
+        trade_price=premium / (100 * quantity),
+        trade_action='Sold to Open',
+        premium=premium,
+        fees=0,
+        trade_date=date(2025, 1, 2),
+        status=status
+    )
+    db.session.add(trade)
+    db.session.flush()
+    return trade
+
+class TestExpirationCalendar:
+    """Test open positions are bucketed by expiration"""
+
+    def _seed(self, account_id):
+        _open(account_id, 'AAPL', date(2025, 3, 17))
+        _open(account_id, 'MSFT', date(2025, 3, 21), strike=300.00, premium=450.00)
+        # 3 contracts with 1 bought back: 2 left at stake
+        partial = _open(account_id, 'AMD', date(2025, 3, 21), quantity=3, premium=300.00)
+        db.session.add(Trade(
+            account_id=account_id,
+            symbol='AMD',
+            trade_type='CSP',
+            position_type='Close',
+            strike_price=100.00,
+            contract_quantity=1,
+            trade_action='Bought to Close',
+            premium=-20.00,
+            trade_date=date(2025, 2, 3),
+            status='Closed',
+            parent_trade_id=partial.id
+        ))
+        _open(account_id, 'TSLA', date(2025, 3, 28), status='Closed')
+        _open(account_id, 'NVDA', date(2025, 5, 16))
+        db.session.commit()
+
+    def test_groups_by_day(self, test_app, test_account):
+        """Test each expiration day gets contracts, premium and capital totals"""
+        with test_app.app_context():
+            self._seed(test_account.id)
+
+            groups = get_expiration_calendar_groups([test_account.id], date(2025, 3, 1), date(2025, 3, 31), today=date(2025, 3, 14))
+
+            assert [g['expiration_date'] for g in groups] == ['2025-03-17', '2025-03-21']
+            friday = groups[1]
+            assert friday['days_until_expiration'] == 7
+            assert friday['positions_count'] == 2
+            assert friday['contracts'] == 3
+            assert friday['premium_at_stake'] == 650.0
+            assert friday['capital_at_risk'] == 50000.0
+            assert [p['symbol'] for p in friday['positions']] == ['AMD', 'MSFT']
+
+    def test_groups_by_week(self, test_app, test_account):
+        """Test week buckets start on Monday"""
+        with test_app.app_context():
+            self._seed(test_account.id)
+
+            groups = get_expiration_calendar_groups([test_account.id], date(2025, 3, 1), date(2025, 5, 31), group_by='week')
+
+            assert [(g['expiration_date'], g['period_end'], g['positions_count']) for g in groups] == [
+                ('2025-03-17', '2025-03-23', 3),
+                ('2025-05-12', '2025-05-18', 1),
+            ]
+
+    def test_month_view_is_an_index_range_scan(self, test_app, test_account):
+        """Test the window is read through the open-expiration index with a fixed number of queries"""
+        with test_app.app_context():
+            self._seed(test_account.id)
+
+            plan = db.session.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM trades WHERE account_id IN (:a) AND status = 'Open' "
+                "AND expiration_date >= '2025-03-01' AND expiration_date <= '2025-03-31'"
+            ), {'a': test_account.id}).fetchall()
+            assert any('ix_trades_open_expiration' in row[-1] for row in plan)
+
+            statements = []
+            def count(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                get_expiration_calendar_groups([test_account.id], date(2025, 3, 1), date(2025, 3, 31))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+            # Window query + one batched load of closing legs
+            assert len(statements) == 2
@@ -0,0 +1,102 @@
+"""
+Tests for the streaming Excel export
+"""
+import io
+import pytest
+from datetime import date
+from openpyxl import load_workbook
+from models import db, Account, Trade, Deposit, StockPosition
+from routes.trades import _stream_export_rows
+from utils.export_utils import (
+    write_streaming_workbook,
+    TRADE_EXPORT_COLUMNS,
+    DEPOSIT_EXPORT_COLUMNS,
+    STOCK_POSITION_EXPORT_COLUMNS
+)
+
+class TestStreamingExport:
+    """Test the write-only workbook export"""
+
+    def test_streaming_export_writes_all_sheets(self, test_app, test_account):
+        """Test trades, deposits and stock positions are streamed into separate sheets"""
+        with test_app.app_context():
+            account_id = test_account.id
+
+            for day in range(1, 6):
+                db.session.add(Trade(
+                    account_id=account_id,
+                    symbol='AAPL',
+                    trade_type='CSP',
+                    position_type='Open',
+                    strike_price=150.00,
+                    expiration_date=date(2025, 2, 21),
+                    contract_quantity=1,
+                    trade_price=2.00,
+                    trade_action='Sold to Open',
+                    premium=200.00,
+                    fees=0,
+                    trade_date=date(2025, 1, day),
+                    status='Open'
+                ))
+            db.session.add(Deposit(account_id=account_id, amount=5000.00, deposit_date=date(2025, 1, 2)))
+            db.session.add(StockPosition(
+                account_id=account_id,
+                symbol='AAPL',
+                shares=100,
+                cost_basis_per_share=150.00,
+                acquired_date=date(2025, 1, 3),
+                status='Open'
+            ))
+            db.session.commit()
+
+            output = io.BytesIO()
+            row_counts = write_streaming_workbook(output, [
+                ('Trades', TRADE_EXPORT_COLUMNS,
+                 _stream_export_rows(Trade, TRADE_EXPORT_COLUMNS, [account_id], Trade.trade_date.desc())),
+                ('Deposits', DEPOSIT_EXPORT_COLUMNS,
+                 _stream_export_rows(Deposit, DEPOSIT_EXPORT_COLUMNS, [account_id], Deposit.deposit_date.desc())),
+                ('Stock Positions', STOCK_POSITION_EXPORT_COLUMNS,
+                 _stream_export_rows(StockPosition, STOCK_POSITION_EXPORT_COLUMNS, [account_id], StockPosition.acquired_date.desc())),
+            ])
+
+            assert row_counts == {'Trades': 5, 'Deposits': 1, 'Stock Positions': 1}
+
+            output.seek(0)
+            workbook = load_workbook(output, read_only=True)
+            assert workbook.sheetnames == ['Trades', 'Deposits', 'Stock Positions']
+
+            trade_rows = list(workbook['Trades'].iter_rows(values_only=True))
+            assert list(trade_rows[0]) == TRADE_EXPORT_COLUMNS
+            first = dict(zip(TRADE_EXPORT_COLUMNS, trade_rows[1]))
+            # Newest trade first, dates exported as YYYY-MM-DD strings like the CSV export
+            assert first['trade_date'] == '2025-01-05'
+            assert first['strike_price'] == 150.0
+            assert first['premium'] == 200.0
+
+            deposit_rows = list(workbook['Deposits'].iter_rows(values_only=True))
+            assert dict(zip(DEPOSIT_EXPORT_COLUMNS, deposit_rows[1]))['amount'] == 5000.0
+
+    def test_streaming_export_only_includes_requested_accounts(self, test_app, test_account):
+        """Test rows from other accounts are not exported"""
+        with test_app.app_context():
+            account_id = test_account.id
+            other_account = Account(user_id=test_account.user_id, name='Other Account')
+            db.session.add(other_account)
+            db.session.flush()
+
+            db.session.add(Trade(
+                account_id=other_account.id,
+                symbol='MSFT',
+                trade_type='CSP',
+                position_type='Open',
+                strike_price=300.00,
+                contract_quantity=1,
+                trade_action='Sold to Open',
+                premium=100.00,
+                trade_date=date(2025, 1, 1),
+                status='Open'
+            ))
+            db.session.commit()
+
+            rows = list(_stream_export_rows(Trade, TRADE_EXPORT_COLUMNS, [account_id], Trade.trade_date.desc()))
+            assert rows == []
@@ -0,0 +1,33 @@
+"""
+Start-up budget: importing the app (what every worker does on a cold start) stays cheap
+"""
+import os
+from utils.import_time import measure_import, LAZY_IMPORTS
+
+# `import app` loaded ~750 modules in ~650 ms on a 1-CPU runner; pandas and openpyxl at
+# module load added ~530 modules and ~450 ms. The module count is deterministic; the
+# time (best of RUNS fresh interpreters) is noisy on shared machines, so its budget only
+# catches gross regressions. Both can be overridden from the environment.
+IMPORT_MODULE_BUDGET = int(os.getenv('IMPORT_MODULE_BUDGET', 900))
+IMPORT_BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', 1200))
+RUNS = 5
+
+class TestImportBudget:
+    """Test the app import graph leaves heavy dependencies to the paths that use them"""
+
+    def test_app_import_within_budget(self):
+        """Test import app loads no lazy dependency and finishes within the budget"""
+        runs = [measure_import('app') for _ in range(RUNS)]
+
+        loaded = sorted(name for name in runs[0]['modules'] if name.split('.')[0] in LAZY_IMPORTS)
+        assert not loaded, f'import app loaded {loaded}; import them inside the functions that use them'
+        assert len(runs[0]['modules']) <= IMPORT_MODULE_BUDGET, (
+            f"import app loaded {len(runs[0]['modules'])} modules (budget {IMPORT_MODULE_BUDGET})"
+        )
+
+        fastest = min(run['total_ms'] for run in runs)
+        slowest = sorted(runs[0]['modules'].items(), key=lambda item: -item[1]['self_ms'])[:10]
+        assert fastest <= IMPORT_BUDGET_MS, (
+            f'import app took {fastest:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms); slowest modules (self ms): '
+            + ', '.join(f'{name} {timing["self_ms"]:.1f}' for name, timing in slowest)
+        )
@@ -0,0 +1,131 @@
+"""
+Tests for idempotent re-import of statements via row fingerprints, and multi-file imports
+"""
+import io
+import pytest
+from werkzeug.datastructures import FileStorage
+from models import db, Trade
+from routes.trades import import_parsed_trades
+import utils.import_utils as import_utils
+import utils.process_pool as process_pool
+from utils.import_utils import parse_trade_file, parse_trade_files_parallel
+
+HEADER = 'symbol,trade_type,position_type,strike_price,expiration_date,contract_quantity,trade_price,trade_action,premium,fees,trade_date,status,parent_trade_id\n'
+JANUARY = 'AAPL,CSP,Open,150,2025-02-21,2,2.00,Sold to Open,400,0,2025-01-06,Open,\n'
+FEBRUARY = 'MSFT,CSP,Open,300,2025-03-21,1,3.00,Sold to Open,300,0,2025-02-03,Open,\n'
+# Closes the January AAPL CSP (parent_trade_id refers to the exporting database)
+MARCH = 'AAPL,CSP,Close,150,2025-02-21,2,0.50,Bought to Close,-100,0,2025-03-03,Closed,1\n'
+
+def _csv_file(*rows):
+    content = HEADER + ''.join(rows)
+    return FileStorage(stream=io.BytesIO(content.encode('utf-8')), filename='statement.csv')
+
+def _import(account_id, *rows):
+    trades = parse_trade_file(_csv_file(*rows), account_id)
+    imported, skipped = import_parsed_trades(trades, account_id)
+    db.session.commit()
+    return imported, skipped
+
+class TestImportDedup:
+    """Test that re-importing overlapping statements only inserts new rows"""
+
+    def test_fingerprint_is_stable(self, test_app, test_account):
+        """Test the same row parses to the same fingerprint every time"""
+        with test_app.app_context():
+            first = parse_trade_file(_csv_file(JANUARY), test_account.id)
+            second = parse_trade_file(_csv_file(FEBRUARY, JANUARY), test_account.id)
+            assert first[0].import_fingerprint == second[1].import_fingerprint
+            assert first[0].import_fingerprint != second[0].import_fingerprint
+
+    def test_reimport_skips_known_rows(self, test_app, test_account):
+        """Test an overlapping statement only imports the rows not seen before"""
+        with test_app.app_context():
+            account_id = test_account.id
+
+            imported, skipped = _import(account_id, JANUARY, FEBRUARY)
+            assert (len(imported), skipped) == (2, 0)
+
+            imported, skipped = _import(account_id, JANUARY, FEBRUARY, MARCH)
+            assert (len(imported), skipped) == (1, 2)
+            assert Trade.query.filter_by(account_id=account_id).count() == 3
+
+            # Importing the same file again is a no-op
+            imported, skipped = _import(account_id, JANUARY, FEBRUARY, MARCH)
+            assert (len(imported), skipped) == (0, 3)
+            assert Trade.query.filter_by(account_id=account_id).count() == 3
+
+    def test_new_closing_row_links_to_previously_imported_parent(self, test_app, test_account):
+        """Test a closing row in a later statement finds its parent from an earlier import"""
+        with test_app.app_context():
+            account_id = test_account.id
+
+            _import(account_id, JANUARY)
+            imported, _ = _import(account_id, JANUARY, MARCH)
+
+            parent = Trade.query.filter_by(account_id=account_id, trade_action='Sold to Open').one()
+            closing = imported[0]
+            assert closing.parent_trade_id == parent.id
+            assert parent.status == 'Closed'
+
+    def test_identical_rows_in_one_file_are_both_kept(self, test_app, test_account):
+        """Test two genuinely identical trades are imported once each and skipped on re-import"""
+        with test_app.app_context():
+            account_id = test_account.id
+
+            imported, skipped = _import(account_id, JANUARY, JANUARY)
+            assert (len(imported), skipped) == (2, 0)
+
+            imported, skipped = _import(account_id, JANUARY, JANUARY)
+            assert (len(imported), skipped) == (0, 2)
+
+class TestMultiFileImport:
+    """Test parsing several statements at once"""
+
+    def test_parallel_parse_keeps_upload_order(self, monkeypatch):
+        """Test worker-process parsing returns files in upload order, reusing one pool across imports until shutdown"""
+        monkeypatch.setattr(import_utils, 'PARALLEL_PARSE_MIN_BYTES', 0)
+        uploads = [
+            ('jan.csv', (HEADER + JANUARY).encode('utf-8')),
+            ('feb.csv', (HEADER + FEBRUARY).encode('utf-8')),
+            ('mar.csv', (HEADER + MARCH).encode('utf-8')),
+        ]
+        parsed = parse_trade_files_parallel(uploads, max_workers=2)
+        assert [records[0]['trade_date'].month for records in parsed] == [1, 2, 3]
+        pool = process_pool._pools[2]
+        assert parse_trade_files_parallel(uploads[:2], max_workers=2) == parsed[:2]
+        assert process_pool._pools[2] is pool
+        # Same rows and fingerprints as parsing inline
+        assert parsed == parse_trade_files_parallel(uploads, max_workers=1)
+        process_pool.shutdown_pools()
+        assert process_pool._pools == {}
+
+    def test_small_uploads_parse_inline(self, monkeypatch):
+        """Test uploads under PARALLEL_PARSE_MIN_BYTES never start the pool"""
+        monkeypatch.setattr(process_pool, '_pools', {})
+        parsed = parse_trade_files_parallel([
+            ('jan.csv', (HEADER + JANUARY).encode('utf-8')),
+            ('feb.csv', (HEADER + FEBRUARY).encode('utf-8')),
+        ], max_workers=4)
+        assert [records[0]['trade_date'].month for records in parsed] == [1, 2]
+        assert process_pool._pools == {}
+
+    def test_parse_error_names_the_file(self):
+        """Test a bad file in a batch is reported by name"""
+        with pytest.raises(ValueError, match='notes.txt'):
+            parse_trade_files_parallel([('notes.txt', b'hello')], max_workers=1)
+
+    def test_overlapping_files_in_one_upload_import_once(self, test_app, test_account):
+        """Test rows repeated across files uploaded together are only imported once"""
+        with test_app.app_context():
+            account_id = test_account.id
+            parsed = parse_trade_files_parallel([
+                ('q1.csv', (HEADER + JANUARY + FEBRUARY).encode('utf-8')),
+                ('q2.csv', (HEADER + FEBRUARY + MARCH).encode('utf-8')),
+            ], max_workers=1)
+            trades = [Trade(account_id=account_id, **record) for records in parsed for record in records]
+
+            imported, skipped = import_parsed_trades(trades, account_id)
+            db.session.commit()
+
+            assert (len(imported), skipped) == (3, 1)
+            assert Trade.query.filter_by(account_id=account_id).count() == 3
@@ -0,0 +1,101 @@
+"""
+Tests for Black-Scholes pricing and marking open option positions to market
+"""
+import pytest
+from datetime import date
+from models import db
+from routes.dashboard import calculate_wheel_pnl, _set_cached_market_data
+from utils.option_pricing import black_scholes
+from utils.mark_to_market import mark_open_positions, open_option_legs_query, unrealized_pnl_by_trade
+
+TODAY = date(2025, 1, 6)
+
+# Expiration of the legs opened below unless a test says otherwise
+EXPIRATION = date(2025, 7, 7)
+
+class TestBlackScholes:
+    """Test the vectorized pricer against known values"""
+
+    def test_textbook_values(self):
+        """Test S=K=100, T=1, vol 20%, r 5% (call 10.45, put 5.57)"""
+        result = black_scholes([100, 100], [100, 100], [1, 1], 0.2, 0.05, [True, False])
+        assert result['price'][0] == pytest.approx(10.4506, abs=1e-3)
+        assert result['price'][1] == pytest.approx(5.5735, abs=1e-3)
+        assert result['delta'][0] == pytest.approx(0.6368, abs=1e-3)
+        assert result['delta'][1] == pytest.approx(-0.3632, abs=1e-3)
+
+    def test_expired_options_are_worth_intrinsic(self):
+        """Test options at or past expiration are valued at intrinsic value"""
+        result = black_scholes([90, 110, 90], [100, 100, 100], [0, 0, -0.1], 0.3, 0.05, [False, True, True])
+        assert list(result['price']) == [10.0, 10.0, 0.0]
+        assert list(result['delta']) == [-1.0, 1.0, 0.0]
+
+class TestMarkToMarket:
+    """Test unrealized P&L and Greeks for open legs"""
+
+    def test_short_and_long_legs(self, test_app, test_account, open_leg):
+        """Test a short put gains as it decays and a long call carries positive delta"""
+        with test_app.app_context():
+            account_id = test_account.id
+            csp = open_leg(account_id, 'AAPL', 'CSP', 'Sold to Open', 150.00, 600.00, quantity=2, expiration=EXPIRATION)
+            leaps = open_leg(account_id, 'MSFT', 'LEAPS', 'Bought to Open', 300.00, -4000.00, expiration=EXPIRATION)
+            open_leg(account_id, 'TSLA', 'CSP', 'Sold to Open', 200.00, 500.00, expiration=EXPIRATION)  # No quote
+
+            trades = open_option_legs_query([account_id]).all()
+            result = mark_open_positions(trades, {'AAPL': 200.00, 'MSFT': 320.00}, volatility=0.3, rate=0.045, today=TODAY)
+
+            positions = {p['trade_id']: p for p in result['positions']}
+            put = positions[csp.id]
+            # Far out of the money: worth little, so most of the premium is unrealized profit
+            assert put['market_value'] < 0
+            assert 0 < put['unrealized_pnl'] < 600.00
+            assert put['unrealized_pnl'] == pytest.approx(600.00 + put['market_value'], abs=0.01)
+            assert put['delta'] > 0  # Short put is long the underlying
+            assert put['theta'] > 0  # and earns time decay
+
+            call = positions[leaps.id]
+            assert call['market_value'] > 0
+            assert 0 < call['delta'] <= 100
+
+            assert result['unpriced_trade_ids'] == [trades[2].id]
+            assert [s['symbol'] for s in result['by_symbol']] == ['AAPL', 'MSFT']
+            assert result['totals']['unrealized_pnl'] == pytest.approx(put['unrealized_pnl'] + call['unrealized_pnl'], abs=0.01)
+
+    def test_partial_close_marks_remaining_contracts(self, test_app, test_account, open_leg):
+        """Test only contracts still open are valued"""
+        with test_app.app_context():
+            trade = open_leg(test_account.id, 'AAPL', 'CSP', 'Sold to Open', 150.00, 900.00, quantity=3, expiration=EXPIRATION)
+            trade.remaining_open_quantity = 1
+            db.session.commit()
+
+            position = mark_open_positions([trade], {'AAPL': 150.00}, today=TODAY)['positions'][0]
+
+            assert position['contracts'] == 1
+            assert position['open_premium'] == 300.00
+
+    def test_wheel_pnl_uses_marks(self, test_app, test_account, open_leg):
+        """Test calculate_wheel_pnl prefers the mark over the opening premium"""
+        with test_app.app_context():
+            trade = open_leg(test_account.id, 'AAPL', 'CSP', 'Sold to Open', 150.00, 300.00, expiration=EXPIRATION)
+            marks = unrealized_pnl_by_trade([trade], {'AAPL': 140.00}, today=TODAY)
+
+            _, unrealized = calculate_wheel_pnl([trade], marks)
+
+            assert unrealized == marks[trade.id]
+            assert unrealized < 300.00
+            assert calculate_wheel_pnl([trade]) == (0, 300.00)
+
+    def test_pnl_endpoint_uses_marks(self, test_app, test_client, test_account, auth_headers, open_leg):
+        """Test /pnl and /summary value open trades at their marks from the cached quotes"""
+        with test_app.app_context():
+            trade = open_leg(test_account.id, 'MTMX', 'CSP', 'Sold to Open', 150.00, 300.00, expiration=date(2030, 1, 17))
+            _set_cached_market_data('MTMX', {'current_price': 140.00})
+            mark = round(unrealized_pnl_by_trade([trade], {'MTMX': 140.00})[trade.id], 2)
+            assert mark < 300.00
+
+            pnl = test_client.get('/api/dashboard/pnl', headers=auth_headers).get_json()
+            assert pnl['unrealized_pnl'] == mark
+            pnl = test_client.get('/api/dashboard/pnl?period=month', headers=auth_headers).get_json()
+            assert pnl['unrealized_pnl'] == mark
+            summary = test_client.get('/api/dashboard/summary', headers=auth_headers).get_json()
+            assert summary['pnl']['all']['unrealized_pnl'] == mark
@@ -0,0 +1,48 @@
+"""
+Tests for the Prometheus metrics registry and the protected /api/metrics endpoint
+"""
+from prometheus_client import REGISTRY
+from app import app
+from routes.dashboard import _get_cached_market_data, _set_cached_market_data
+from utils.metrics import record_finnhub_call
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+class TestMetrics:
+    """Test request histograms, cache counters and endpoint protection"""
+
+    def test_requests_and_cache_lookups_are_counted(self):
+        """Test a request lands in its route's histogram and quote cache lookups count hits and misses"""
+        labels = {'method': 'GET', 'route': '/api/health', 'status': '200'}
+        requests_before = _sample('http_request_duration_seconds_count', **labels)
+        hits_before = _sample('cache_requests_total', cache='quote', result='hit')
+        misses_before = _sample('cache_requests_total', cache='quote', result='miss')
+
+        app.test_client().get('/api/health')
+        with app.app_context():
+            _get_cached_market_data('METRICS-TEST')
+            _set_cached_market_data('METRICS-TEST', {'current_price': 1.0})
+            _get_cached_market_data('METRICS-TEST')
+
+        assert _sample('http_request_duration_seconds_count', **labels) == requests_before + 1
+        assert _sample('cache_requests_total', cache='quote', result='hit') == hits_before + 1
+        assert _sample('cache_requests_total', cache='quote', result='miss') == misses_before + 1
+
+    def test_endpoint_requires_token(self, monkeypatch):
+        """Test /api/metrics is off without a token, rejects a wrong one and serves text format"""
+        client = app.test_client()
+        monkeypatch.setitem(app.config, 'METRICS_TOKEN', '')
+        assert client.get('/api/metrics').status_code == 404
+
+        monkeypatch.setitem(app.config, 'METRICS_TOKEN', 'scrape-secret')
+        assert client.get('/api/metrics').status_code == 401
+        assert client.get('/api/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+        record_finnhub_call('quote', 'ok', 0.12)
+        response = client.get('/api/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain')
+        body = response.get_data(as_text=True)
+        assert 'finnhub_requests_total{endpoint="quote",outcome="ok"}' in body
+        assert 'http_request_duration_seconds_bucket' in body
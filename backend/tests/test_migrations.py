@@ -0,0 +1,74 @@
+"""
+Tests for the versioned schema migrations run at boot
+"""
+from datetime import date
+from sqlalchemy import inspect, text
+from models import db, Trade, MonthlyPnl
+from routes.trades import handle_buy_to_close
+from utils import migrations
+from utils.migrations import run_migrations, get_schema_version, LATEST_VERSION
+from tests.conftest import QueryBudget
+
+class TestMigrations:
+    """Test migrations upgrade a legacy database once, then boot with one version check"""
+
+    def test_upgrades_legacy_database_then_noop(self, test_app, test_account):
+        """Test an unversioned database gets missing columns and backfills, and a current one costs one query"""
+        with test_app.app_context():
+            trade = Trade(account_id=test_account.id, symbol='AAPL', trade_type='CSP', position_type='Open', trade_action='Sold to Open',
+                          strike_price=150, expiration_date=date(2025, 2, 21), contract_quantity=2, trade_price=1.5,
+                          premium=300, trade_date=date(2025, 1, 6), status='Closed', close_date=date(2025, 1, 20),
+                          close_price=0.5, close_premium=-100, close_method='buy_to_close')
+            db.session.add(trade)
+            db.session.commit()
+            # A database from before these columns existed, with no rollup rows and no schema_version
+            with db.engine.connect() as conn:
+                conn.execute(text('ALTER TABLE trades DROP COLUMN remaining_open_quantity'))
+                conn.execute(text('ALTER TABLE users DROP COLUMN verification_token_expires'))
+                conn.execute(text('DELETE FROM monthly_pnl'))
+                conn.commit()
+            db.session.expire_all()
+            assert get_schema_version() == 0
+
+            assert run_migrations() == list(range(1, LATEST_VERSION + 1))
+
+            assert 'remaining_open_quantity' in [col['name'] for col in inspect(db.engine).get_columns('trades')]
+            assert 'verification_token_expires' in [col['name'] for col in inspect(db.engine).get_columns('users')]
+            assert db.session.get(Trade, trade.id).remaining_open_quantity == 0
+            assert MonthlyPnl.query.filter_by(account_id=test_account.id, year=2025, month=1).one().realized_pnl == 200
+            assert get_schema_version() == LATEST_VERSION
+
+            with QueryBudget(db.engine, 1, 'boot on a current schema'):
+                assert run_migrations() == []
+
+    def test_applies_only_pending_steps(self, test_app, monkeypatch):
+        """Test a new step runs once, after the ones already recorded"""
+        with test_app.app_context():
+            run_migrations()
+            calls = []
+            monkeypatch.setattr(migrations, 'MIGRATIONS', migrations.MIGRATIONS + [(LATEST_VERSION + 1, 'new step', lambda: calls.append(1))])
+            monkeypatch.setattr(migrations, 'LATEST_VERSION', LATEST_VERSION + 1)
+
+            assert run_migrations() == [LATEST_VERSION + 1]
+            assert run_migrations() == []
+            assert calls == [1]
+            assert get_schema_version() == LATEST_VERSION + 1
+
+    def test_settles_stale_open_statuses(self, test_app, test_account, open_csp):
+        """Test the status step closes an open trade whose children already closed every contract"""
+        with test_app.app_context():
+            run_migrations()
+            trade = open_csp(test_account.id, date(2025, 1, 6))
+            handle_buy_to_close(trade, {'trade_price': '0.50', 'close_date': '2025-01-20'})
+            trade_id = trade.id
+            # Stored before statuses were settled at commit
+            with db.engine.connect() as conn:
+                conn.execute(text("UPDATE trades SET status = 'Open' WHERE id = :id"), {'id': trade_id})
+                conn.execute(text('DELETE FROM schema_version WHERE version = 9'))
+                conn.commit()
+            db.session.expire_all()
+            assert db.session.get(Trade, trade_id).status == 'Open'
+
+            assert run_migrations() == [9]
+
+            assert db.session.get(Trade, trade_id).status == 'Closed'
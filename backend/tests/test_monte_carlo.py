@@ -0,0 +1,69 @@
+"""
+Tests for the Monte Carlo probability-of-profit engine
+"""
+import pytest
+from datetime import date
+from models import Trade
+import utils.monte_carlo as monte_carlo
+from utils.monte_carlo import simulate_positions, cached_simulation
+
+TODAY = date(2025, 1, 6)
+
+class TestMonteCarlo:
+    """Test probability of profit, assignment probability and the book distribution"""
+
+    def test_far_otm_put_is_likely_profitable(self, test_app, test_account, open_leg):
+        """Test a deep out-of-the-money short put rarely gets assigned and a near-the-money one often does"""
+        with test_app.app_context():
+            far = open_leg(test_account.id, 'AAPL', 'CSP', 'Sold to Open', 70.00, 50.00)
+            near = open_leg(test_account.id, 'AAPL', 'CSP', 'Sold to Open', 100.00, 400.00)
+
+            result = simulate_positions([far, near], {'AAPL': 100.00}, 0.30, paths=20000, seed=7, today=TODAY)
+
+            positions = {p['trade_id']: p for p in result['positions']}
+            assert positions[far.id]['probability_of_profit'] > 0.95
+            assert positions[far.id]['assignment_probability'] < 0.05
+            assert 0.3 < positions[near.id]['assignment_probability'] < 0.7
+            assert positions[near.id]['probability_of_profit'] > positions[near.id]['assignment_probability']
+            percentiles = result['book']['percentiles']
+            assert percentiles['p5'] <= percentiles['p50'] <= percentiles['p95'] == pytest.approx(450.00)
+
+    def test_seeded_runs_repeat_and_pool_matches_inline(self, test_app, test_account, monkeypatch, open_leg):
+        """Test a seed gives the same answer whether batches run inline or on the process pool"""
+        with test_app.app_context():
+            open_leg(test_account.id, 'AAPL', 'CSP', 'Sold to Open', 95.00, 200.00)
+            open_leg(test_account.id, 'MSFT', 'LEAPS', 'Bought to Open', 300.00, -3000.00, expiration=date(2026, 1, 16))
+            trades = Trade.query.all()
+            prices = {'AAPL': 100.00, 'MSFT': 310.00}
+
+            monkeypatch.setattr(monte_carlo, 'BATCH_CELLS', 2000)
+            inline = simulate_positions(trades, prices, 0.30, paths=5000, seed=11, today=TODAY)
+            assert simulate_positions(trades, prices, 0.30, paths=5000, seed=11, today=TODAY) == inline
+
+            monkeypatch.setattr(monte_carlo, 'PARALLEL_MIN_CELLS', 0)
+            pooled = simulate_positions(trades, prices, 0.30, paths=5000, seed=11, max_workers=2, today=TODAY)
+            assert pooled == inline
+            assert inline['positions'][1]['assignment_probability'] is None  # Long leg
+
+    def test_cache_and_empty_book(self, test_app, test_account, open_leg):
+        """Test a repeat request is served from the cache and an empty book is handled"""
+        with test_app.app_context():
+            trade = open_leg(test_account.id, 'AAPL', 'CSP', 'Sold to Open', 95.00, 200.00)
+
+            first = cached_simulation([trade], {'AAPL': 100.00}, 0.30, paths=1000)
+            assert cached_simulation([trade], {'AAPL': 100.00}, 0.30, paths=1000) is first
+            assert cached_simulation([trade], {'AAPL': 101.00}, 0.30, paths=1000) is not first
+
+            empty = simulate_positions([], {}, 0.30, paths=1000)
+            assert empty['positions'] == []
+            assert empty['book']['probability_of_profit'] is None
+
+    def test_endpoint_rejects_bad_volatility(self, test_app, test_client, test_account, auth_headers):
+        """Test volatility that is zero, negative, out of range or not a number is a 400, not the default"""
+        with test_app.app_context():
+            for value in ('0', '-0.2', '6', 'abc', 'nan'):
+                response = test_client.get(f'/api/dashboard/probability-of-profit?volatility={value}', headers=auth_headers)
+                assert response.status_code == 400, value
+
+            response = test_client.get('/api/dashboard/probability-of-profit?volatility=0.25', headers=auth_headers)
+            assert response.status_code == 200
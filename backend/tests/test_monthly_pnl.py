@@ -0,0 +1,127 @@
+"""
+Tests for the incrementally maintained monthly_pnl rollup
+"""
+import pytest
+from datetime import date
+from models import db, Trade, MonthlyPnl
+import routes.dashboard as dashboard
+from routes.trades import handle_buy_to_close, handle_expired
+
+def _rollup(account_id):
+    rows = MonthlyPnl.query.filter_by(account_id=account_id).all()
+    return {(row.year, row.month): (float(row.realized_pnl), row.trade_count) for row in rows}
+
+class TestMonthlyPnlRollup:
+    """Test trade writes keep the monthly rollup in sync"""
+
+    def test_open_trades_have_no_rollup_rows(self, test_app, test_account, open_csp):
+        """Test unrealized trades don't create month rows"""
+        with test_app.app_context():
+            open_csp(test_account.id, date(2025, 1, 6))
+            assert _rollup(test_account.id) == {}
+
+    def test_close_handlers_update_rollup(self, test_app, test_account, open_csp):
+        """Test full closes and expirations land in the month they were closed"""
+        with test_app.app_context():
+            account_id = test_account.id
+            first = open_csp(account_id, date(2025, 1, 6))
+            second = open_csp(account_id, date(2025, 1, 13), premium=300.00)
+
+            handle_buy_to_close(first, {'trade_price': '0.50', 'close_date': '2025-01-20'})
+            assert _rollup(account_id) == {(2025, 1): (150.0, 1)}
+
+            handle_expired(second, {'close_date': '2025-02-21'})
+            assert _rollup(account_id) == {(2025, 1): (150.0, 1), (2025, 2): (300.0, 1)}
+
+    def test_partial_close_child_refreshes_parent_month(self, test_app, test_account, open_csp):
+        """Test a closing leg written later updates the month of its (closed) parent"""
+        with test_app.app_context():
+            account_id = test_account.id
+            parent = open_csp(account_id, date(2025, 1, 6), premium=400.00, quantity=2)
+            parent.status = 'Closed'
+            parent.close_date = date(2025, 3, 3)
+            db.session.commit()
+            # Closing leg not recorded yet: nothing realized
+            assert _rollup(account_id) == {}
+
+            db.session.add(Trade(
+                account_id=account_id,
+                symbol='AAPL',
+                trade_type='CSP',
+                position_type='Close',
+                strike_price=150.00,
+                contract_quantity=2,
+                trade_action='Bought to Close',
+                premium=-100.00,
+                fees=0,
+                trade_date=date(2025, 3, 3),
+                close_date=date(2025, 3, 3),
+                status='Closed',
+                parent_trade_id=parent.id
+            ))
+            db.session.commit()
+            assert _rollup(account_id) == {(2025, 3): (300.0, 1)}
+
+    def test_moving_and_deleting_trades(self, test_app, test_account, open_csp):
+        """Test edits move P&L between months and deletes remove it"""
+        with test_app.app_context():
+            account_id = test_account.id
+            trade = open_csp(account_id, date(2025, 1, 6))
+            handle_expired(trade, {'close_date': '2025-02-21'})
+
+            trade.close_date = date(2025, 4, 17)
+            db.session.commit()
+            assert _rollup(account_id) == {(2025, 4): (200.0, 1)}
+
+            db.session.delete(trade)
+            db.session.commit()
+            assert _rollup(account_id) == {}
+
+    def test_rollback_discards_pending_changes(self, test_app, test_account, open_csp):
+        """Test a rolled back write doesn't leave the rollup out of date for the next commit"""
+        with test_app.app_context():
+            account_id = test_account.id
+            trade = open_csp(account_id, date(2025, 1, 6))
+            trade.status = 'Expired'
+            trade.close_date = date(2025, 2, 21)
+            db.session.flush()
+            db.session.rollback()
+
+            open_csp(account_id, date(2025, 1, 7))
+            assert _rollup(account_id) == {}
+
+    def test_rebuild_matches_incremental_rollup(self, test_app, test_account, open_csp):
+        """Test a full rebuild reproduces the incrementally maintained rows"""
+        with test_app.app_context():
+            account_id = test_account.id
+            for day, close_day in ((6, '2025-01-20'), (13, '2025-02-03'), (20, '2025-02-10')):
+                trade = open_csp(account_id, date(2025, 1, day))
+                handle_buy_to_close(trade, {'trade_price': '0.25', 'close_date': close_day})
+            incremental = _rollup(account_id)
+
+            MonthlyPnl.query.delete()
+            db.session.commit()
+            assert MonthlyPnl.rebuild(db.session) == 2
+            db.session.commit()
+
+            assert _rollup(account_id) == incremental == {(2025, 1): (175.0, 1), (2025, 2): (350.0, 2)}
+
+    def test_ytd_stops_at_today(self, test_app, test_client, test_account, auth_headers, open_csp, monkeypatch):
+        """Test YTD on /api/dashboard/monthly-returns leaves out closes dated later in the current month"""
+        class Today(date):
+            @classmethod
+            def today(cls):
+                return cls(2025, 3, 15)
+        monkeypatch.setattr(dashboard, 'date', Today)
+        with test_app.app_context():
+            account_id = test_account.id
+            handle_expired(open_csp(account_id, date(2025, 2, 3), premium=300.00), {'close_date': '2025-02-21'})
+            handle_buy_to_close(open_csp(account_id, date(2025, 3, 3)), {'trade_price': '0.25', 'close_date': '2025-03-10'})
+            handle_buy_to_close(open_csp(account_id, date(2025, 3, 3)), {'trade_price': '0.50', 'close_date': '2025-03-25'})
+
+        response = test_client.get('/api/dashboard/monthly-returns', headers=auth_headers)
+
+        data = response.get_json()
+        assert (data['ytd']['total_return'], data['ytd']['trade_count']) == (475.00, 2)
+        months = {(row['year'], row['month']): row['total_return'] for row in data['monthly_returns']}
+        assert months == {(2025, 2): 300.00, (2025, 3): 325.00}
@@ -0,0 +1,71 @@
+"""
+Query budgets: the SQL an endpoint issues must not grow with the number of trades
+"""
+import pytest
+from flask_jwt_extended import create_access_token
+from models import db, Account
+from routes.dashboard import _set_cached_market_data
+from utils.equity_snapshots import ensure_snapshots
+from utils.synthetic_data import generate_wheel_data, SYMBOL_PRICES
+from tests.conftest import QueryBudgetExceeded
+
+TRADES = 1000
+
+# Most queries allowed per call for TRADES trades in one account. Eager loads select
+# 500 ids per IN list, so a few of these grow by one query per ~500 trades. Each
+# includes the JWT user lookup every authenticated request makes.
+BUDGETS = {
+    '/api/dashboard/ticker-performance': 8,
+    '/api/dashboard/strategy-performance': 8,
+    '/api/dashboard/pnl': 9,
+    '/api/dashboard/positions': 4,
+    '/api/dashboard/open-positions-allocation': 5,
+    '/api/dashboard/monthly-returns': 7,  # + the current month's trades up to today and their eager loads
+    '/api/dashboard/equity-curve': 4,
+    '/api/dashboard/summary': 13,
+    '/api/trades': 8,
+    '/api/accounts/{account_id}': 2
+}
+
+@pytest.fixture(scope='function')
+def wheel_account(test_app):
+    """One synthetic account with TRADES wheel trades, and auth headers for its owner"""
+    with test_app.app_context():
+        data = generate_wheel_data(trades_per_account=TRADES, seed=43)
+        user_id = data['user_ids'][0]
+        account_id = data['account_ids'][user_id][0]
+        token = create_access_token(identity=str(user_id))
+        # What the daily snapshot job (scripts/record_equity_snapshots.py) leaves behind
+        ensure_snapshots([account_id])
+        db.session.commit()
+    for symbol, price in SYMBOL_PRICES.items():
+        _set_cached_market_data(symbol, {'current_price': price, 'previous_close': price, 'change': 0,
+                                         'change_percent': 0, 'high': price, 'low': price, 'open': price, 'timestamp': 0})
+    return account_id, {'Authorization': f'Bearer {token}'}
+
+class TestQueryBudgets:
+    """Test endpoints stay within their SQL query budgets"""
+
+    def test_endpoints_within_budget(self, test_client, wheel_account, query_budget):
+        """Test each endpoint's steady-state query count for 1,000 trades"""
+        account_id, headers = wheel_account
+        for endpoint, budget in BUDGETS.items():
+            url = endpoint.format(account_id=account_id)
+            # Budget the steady state, after the first call has warmed the caches
+            assert test_client.get(url, headers=headers).status_code == 200
+            with query_budget(budget, f'GET {url}'):
+                response = test_client.get(url, headers=headers)
+            assert response.status_code == 200
+
+    def test_exceeded_budget_lists_statements(self, test_app, test_account, query_budget):
+        """Test a block over budget fails with every statement it ran"""
+        with test_app.app_context():
+            with pytest.raises(QueryBudgetExceeded) as excinfo:
+                with query_budget(1, 'per-account lookups') as budget:
+                    for _ in range(3):
+                        Account.query.filter_by(id=test_account.id).count()
+
+            assert budget.count == 3
+            message = str(excinfo.value)
+            assert 'per-account lookups ran 3 queries (budget 1)' in message
+            assert message.count('SELECT count(*)') == 3
@@ -0,0 +1,117 @@
+"""
+Tests for read-replica routing: read-only routes read the replica, writes and recent writers stay on the primary
+"""
+import sqlite3
+from datetime import date, datetime, timedelta
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from models import db, User, Account, Trade
+from utils.read_replica import REPLICA_BIND, _use_replica
+
+def _trade(account_id, symbol):
+    return Trade(account_id=account_id, symbol=symbol, trade_type='CSP', position_type='Open',
+                 trade_action='Sold to Open', strike_price=100.00, expiration_date=date(2030, 1, 17),
+                 contract_quantity=1, trade_price=1.00, premium=100.00, fees=0, trade_date=date(2025, 1, 2),
+                 status='Open', open_date=date(2025, 1, 2))
+
+def _symbols(response):
+    assert response.status_code == 200
+    return sorted(trade['symbol'] for trade in response.get_json())
+
+@pytest.fixture
+def replica_app(tmp_path):
+    """
+    App whose replica is a copy of the primary taken after seeding (user, account and an
+    AAPL trade); anything written afterwards is only on the primary, like replication lag.
+    Yields (app, headers, account_id).
+    """
+    primary, replica = tmp_path / 'primary.db', tmp_path / 'replica.db'
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{primary}',
+        'DATABASE_REPLICA_URL': f'sqlite:///{replica}',
+        'JWT_SECRET_KEY': 'test-secret-key',
+        'FINNHUB_API_KEY': ''
+    })
+    with app.app_context():
+        db.create_all(bind_key=None)
+        user = User(email='replica@example.com', first_name='Replica', last_name='User',
+                    password_hash='hashed_password', email_verified=True)
+        db.session.add(user)
+        db.session.flush()
+        account = Account(user_id=user.id, name='Replica Account', initial_balance=10000.00)
+        db.session.add(account)
+        db.session.flush()
+        db.session.add(_trade(account.id, 'AAPL'))
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+        account_id = account.id
+        db.session.remove()
+
+        source, target = sqlite3.connect(primary), sqlite3.connect(replica)
+        source.backup(target)
+        source.close()
+        target.close()
+
+        db.session.add(_trade(account_id, 'MSFT'))  # Not replicated yet
+        db.session.commit()
+        db.session.remove()
+
+    yield app, headers, account_id
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+class TestReadReplica:
+    """Test which engine each kind of request reads from"""
+
+    def test_read_only_routes_use_replica(self, replica_app):
+        """Test the trade list and dashboard read the replica while other routes read the primary"""
+        app, headers, _ = replica_app
+        client = app.test_client()
+
+        assert _symbols(client.get('/api/trades', headers=headers)) == ['AAPL']
+        positions = client.get('/api/dashboard/positions', headers=headers).get_json()
+        assert [trade['symbol'] for trade in positions['open']] == ['AAPL']
+        # /api/trades/<id> is not marked read-only
+        with app.app_context():
+            msft_id = Trade.query.filter_by(symbol='MSFT').one().id
+        assert client.get(f'/api/trades/{msft_id}', headers=headers).status_code == 200
+
+    def test_user_reads_own_writes(self, replica_app):
+        """Test a write keeps the writer on the primary for DB_READ_YOUR_WRITES_SECONDS, then back to the replica"""
+        app, headers, account_id = replica_app
+        client = app.test_client()
+
+        response = client.post('/api/trades', headers=headers, json={
+            'account_id': account_id, 'symbol': 'TSLA', 'trade_type': 'CSP', 'trade_action': 'Sold to Open',
+            'strike_price': 200.00, 'expiration_date': '2030-01-17', 'contract_quantity': 1,
+            'trade_price': 3.00, 'fees': 0, 'trade_date': '2025-01-03', 'status': 'Open'
+        })
+        assert response.status_code == 201
+        assert _symbols(client.get('/api/trades', headers=headers)) == ['AAPL', 'MSFT', 'TSLA']
+
+        with app.app_context():
+            user = User.query.one()
+            assert datetime.utcnow() - user.last_write_at < timedelta(seconds=5)
+            user.last_write_at = datetime.utcnow() - timedelta(seconds=app.config['DB_READ_YOUR_WRITES_SECONDS'] + 1)
+            db.session.commit()
+        assert _symbols(client.get('/api/trades', headers=headers)) == ['AAPL']
+
+    def test_writes_go_to_primary(self, replica_app):
+        """Test a routed session writes to the primary and reads it back from there once it has written"""
+        app, _, account_id = replica_app
+        with app.app_context():
+            token = _use_replica.set(True)
+            try:
+                assert Trade.query.count() == 1  # Replica
+                db.session.add(_trade(account_id, 'AMD'))
+                db.session.commit()
+                assert Trade.query.count() == 3  # Primary, from now on
+            finally:
+                _use_replica.reset(token)
+                db.session.remove()
+
+            with db.engines[REPLICA_BIND].connect() as conn:
+                assert conn.exec_driver_sql('SELECT COUNT(*) FROM trades').scalar() == 1
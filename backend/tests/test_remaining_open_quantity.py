@@ -0,0 +1,149 @@
+"""
+Tests for the stored remaining_open_quantity on opening trades
+"""
+import pytest
+from datetime import date
+from models import db, Trade
+from routes.trades import handle_buy_to_close, handle_expired, handle_exercise
+from utils.open_quantity import check_remaining_open_quantities
+
+def _open_trade(account_id, quantity=3, trade_type='CSP', trade_action='Sold to Open'):
+    trade = Trade(
+        account_id=account_id,
+        symbol='AAPL',
+        trade_type=trade_type,
+        position_type='Open',
+        strike_price=150.00,
+        expiration_date=date(2025, 6, 20),
+        contract_quantity=quantity,
+        trade_price=2.00,
+        trade_action=trade_action,
+        premium=200.00 * quantity,
+        fees=0,
+        trade_date=date(2025, 1, 6),
+        status='Open'
+    )
+    db.session.add(trade)
+    db.session.commit()
+    return trade
+
+def _closing_leg(parent, quantity):
+    leg = Trade(
+        account_id=parent.account_id,
+        symbol=parent.symbol,
+        trade_type=parent.trade_type,
+        position_type='Close',
+        strike_price=parent.strike_price,
+        contract_quantity=quantity,
+        trade_price=0.50,
+        trade_action='Bought to Close',
+        premium=-50.00 * quantity,
+        fees=0,
+        trade_date=date(2025, 2, 3),
+        close_date=date(2025, 2, 3),
+        status='Closed',
+        parent_trade_id=parent.id
+    )
+    db.session.add(leg)
+    db.session.commit()
+    return leg
+
+class TestRemainingOpenQuantity:
+    """Test the close handlers, commit hook and consistency check keep the count in sync"""
+
+    def test_new_opening_trade_stores_full_quantity(self, test_app, test_account):
+        """Test a new opening trade starts with all of its contracts open"""
+        with test_app.app_context():
+            trade = _open_trade(test_account.id)
+            assert trade.remaining_open_quantity == 3
+
+    def test_close_handlers_reduce_count(self, test_app, test_account):
+        """Test partial and full closes through the handlers keep stored and derived counts equal"""
+        with test_app.app_context():
+            trade = _open_trade(test_account.id)
+
+            _, status = handle_buy_to_close(trade, {'trade_price': '0.50', 'contract_quantity': 2, 'close_date': '2025-02-03'})
+            assert status == 201
+            assert trade.remaining_open_quantity == 1
+            assert trade.compute_remaining_open_quantity() == 1
+
+            _, status = handle_expired(trade, {'close_date': '2025-06-20'})
+            assert status == 200
+            assert (trade.remaining_open_quantity, trade.status) == (0, 'Expired')
+            assert check_remaining_open_quantities() == []
+
+    def test_close_rejected_when_contracts_were_closed_concurrently(self, test_app, test_account):
+        """Test the guarded update refuses to close contracts another request already closed"""
+        with test_app.app_context():
+            trade = _open_trade(test_account.id, quantity=2)
+            trade.get_remaining_open_quantity()  # Loaded by this request before the other one commits
+
+            # Another request closes both contracts behind this session's back
+            table = Trade.__table__
+            db.session.execute(table.update().where(table.c.id == trade.id).values(remaining_open_quantity=0))
+
+            response, status = handle_buy_to_close(trade, {'trade_price': '0.50', 'close_date': '2025-02-03'})
+            assert status == 409
+            assert Trade.query.filter_by(parent_trade_id=trade.id).count() == 0
+
+    def test_partial_exercise_reduces_count(self, test_app, test_account):
+        """Test a partial LEAPS exercise stays closed when the count is re-derived from the children"""
+        with test_app.app_context():
+            trade = _open_trade(test_account.id, quantity=2, trade_type='LEAPS', trade_action='Bought to Open')
+
+            response, status = handle_exercise(trade, {'contract_quantity': 1, 'close_date': '2025-03-03'})
+            assert status == 201
+            assert trade.get_remaining_open_quantity() == 1
+            assert trade.compute_remaining_open_quantity() == 1
+            assert check_remaining_open_quantities() == []
+
+            # A later commit touching the LEAPS re-derives its count and must not reopen the contract
+            trade = db.session.get(Trade, trade.id)
+            trade.notes = 'rolled the rest'
+            db.session.commit()
+            assert trade.remaining_open_quantity == 1
+            assert trade.calculate_realized_pnl() == float(trade.premium) / 2  # The exercised contract's share
+
+    def test_closing_legs_written_directly_refresh_parent(self, test_app, test_account):
+        """Test closing legs added or deleted outside the handlers update the parent at commit"""
+        with test_app.app_context():
+            parent = _open_trade(test_account.id)
+
+            leg = _closing_leg(parent, 2)
+            assert parent.remaining_open_quantity == 1
+
+            db.session.delete(leg)
+            db.session.commit()
+            assert parent.remaining_open_quantity == 3
+
+    def test_closing_legs_written_directly_settle_parent_status(self, test_app, test_account):
+        """Test the commit that closes a parent's last contracts also closes the parent"""
+        with test_app.app_context():
+            parent = _open_trade(test_account.id)
+            parent.expiration_date = date(2030, 1, 17)  # Past trades left open keep their status
+            db.session.commit()
+
+            _closing_leg(parent, 2)
+            assert (parent.remaining_open_quantity, parent.status) == (1, 'Open')
+
+            _closing_leg(parent, 1)
+            assert (parent.remaining_open_quantity, parent.status) == (0, 'Closed')
+
+    def test_consistency_check_finds_and_fixes_drift(self, test_app, test_account):
+        """Test the bulk check reports rows changed behind the app's back and repairs them"""
+        with test_app.app_context():
+            parent = _open_trade(test_account.id)
+            untouched_id = _open_trade(test_account.id, quantity=1).id
+            _closing_leg(parent, 1)
+            parent_id = parent.id
+            table = Trade.__table__
+            db.session.execute(table.update().where(table.c.id == parent_id).values(remaining_open_quantity=None))
+            db.session.commit()
+
+            mismatches = check_remaining_open_quantities(batch_size=1)
+            assert [(m['trade_id'], m['stored'], m['derived']) for m in mismatches] == [(parent_id, None, 2)]
+
+            check_remaining_open_quantities(fix=True)
+            db.session.commit()
+            assert check_remaining_open_quantities() == []
+            assert db.session.get(Trade, untouched_id).remaining_open_quantity == 1
@@ -0,0 +1,55 @@
+"""
+Tests for per-request latency, SQL query counting and slow-query logging
+"""
+import logging
+from flask import jsonify
+from models import db, Account, Trade
+from utils.request_metrics import init_request_metrics, get_route_stats, reset_route_stats
+
+def _add_accounts_route(app):
+    @app.route('/api/test/accounts/<int:user_id>')
+    def list_accounts(user_id):
+        accounts = Account.query.filter_by(user_id=user_id).all()
+        # One count query per account
+        return jsonify({account.name: Trade.query.filter_by(account_id=account.id).count() for account in accounts})
+
+class TestRequestMetrics:
+    """Test the Server-Timing header, the per-route aggregate and the slow-query log"""
+
+    def test_counts_queries_per_request(self, test_app, test_user):
+        """Test each response reports its query count and the route aggregate accumulates"""
+        with test_app.app_context():
+            user_id = test_user.id
+            for name in ('IRA', 'Taxable'):
+                db.session.add(Account(user_id=user_id, name=name))
+            db.session.commit()
+        init_request_metrics(test_app)
+        _add_accounts_route(test_app)
+        reset_route_stats()
+
+        client = test_app.test_client()
+        for _ in range(2):
+            response = client.get(f'/api/test/accounts/{user_id}')
+            assert response.json == {'IRA': 0, 'Taxable': 0}
+            assert 'db;dur=' in response.headers['Server-Timing']
+            assert 'desc="3 queries"' in response.headers['Server-Timing']
+
+        stats = get_route_stats()['GET /api/test/accounts/<int:user_id>']
+        assert stats['requests'] == 2
+        assert stats['avg_queries'] == 3
+        assert stats['max_queries'] == 3
+        assert stats['errors'] == 0
+
+    def test_slow_queries_are_logged_with_route(self, test_app, test_user, caplog):
+        """Test statements over SLOW_QUERY_MS are logged with their route"""
+        init_request_metrics(test_app)
+        _add_accounts_route(test_app)
+        test_app.config['SLOW_QUERY_MS'] = 0
+
+        with caplog.at_level(logging.WARNING):
+            test_app.test_client().get('/api/test/accounts/1')
+
+        slow = [record.getMessage() for record in caplog.records if record.getMessage().startswith('Slow query')]
+        assert slow
+        assert 'GET /api/test/accounts/<int:user_id>' in slow[0]
+        assert 'FROM accounts' in slow[0]
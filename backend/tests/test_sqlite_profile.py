@@ -0,0 +1,79 @@
+"""
+Tests for the SQLite profile: pragmas on every connection, WAL concurrency and the pooled engine
+"""
+import threading
+import time
+from datetime import date
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import QueuePool
+from models import db, Account, Deposit
+
+class TestSqliteProfile:
+    """Test SQLite connections are tuned, pooled and safe to share across threads"""
+
+    def test_connections_get_pragmas(self, test_app):
+        """Test each pooled connection runs in WAL mode with the configured pragmas"""
+        with test_app.app_context():
+            assert isinstance(db.engine.pool, QueuePool)
+            assert db.engine.pool.size() == test_app.config['SQLITE_POOL_SIZE']
+            with db.engine.connect() as conn:
+                pragma = lambda name: conn.execute(text(f'PRAGMA {name}')).scalar()
+                assert pragma('journal_mode') == 'wal'
+                assert pragma('synchronous') == 1  # NORMAL
+                assert pragma('busy_timeout') == 5000
+                assert pragma('cache_size') == -16000
+                assert pragma('foreign_keys') == 1
+
+            with pytest.raises(IntegrityError):
+                db.session.add(Deposit(account_id=12345, amount=100, deposit_date=date(2025, 1, 2)))
+                db.session.commit()
+            db.session.rollback()
+
+    def test_open_read_does_not_block_commit(self, test_app, test_account):
+        """Test a writer commits while another connection holds a read snapshot, which keeps its view"""
+        with test_app.app_context():
+            reader = db.engine.raw_connection()
+            try:
+                reader.execute('BEGIN')
+                assert reader.execute('SELECT name FROM accounts').fetchone()[0] == 'Test Account'
+
+                started = time.perf_counter()
+                db.session.get(Account, test_account.id).name = 'Renamed'
+                db.session.commit()
+                # A rollback journal would make the commit wait out busy_timeout for the reader's lock
+                assert time.perf_counter() - started < 1
+
+                assert reader.execute('SELECT name FROM accounts').fetchone()[0] == 'Test Account'
+                reader.rollback()
+                assert reader.execute('SELECT name FROM accounts').fetchone()[0] == 'Renamed'
+            finally:
+                reader.close()
+
+    def test_threads_share_the_pool(self, test_app, test_account):
+        """Test concurrent threads reading and writing through the pool all succeed"""
+        account_id = test_account.id
+        errors = []
+
+        def worker():
+            try:
+                with test_app.app_context():
+                    for _ in range(10):
+                        db.session.add(Deposit(account_id=account_id, amount=10, deposit_date=date(2025, 1, 2)))
+                        db.session.commit()
+                        Deposit.query.filter_by(account_id=account_id).count()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        with test_app.app_context():
+            assert Deposit.query.filter_by(account_id=account_id).count() == 80
+            db.session.close()
+            assert db.engine.pool.checkedout() == 0
@@ -0,0 +1,84 @@
+"""
+Tests for available shares on stock positions computed with a grouped aggregate
+"""
+import pytest
+from datetime import date
+from sqlalchemy import event
+from models import db, Trade, StockPosition
+
+def _lot(account_id, shares=200):
+    position = StockPosition(
+        account_id=account_id,
+        symbol='AAPL',
+        shares=shares,
+        cost_basis_per_share=150.00,
+        acquired_date=date(2025, 1, 1),
+        status='Open'
+    )
+    db.session.add(position)
+    db.session.flush()
+    return position
+
+def _covered_call(account_id, position, contracts, status='Open'):
+    db.session.add(Trade(
+        account_id=account_id,
+        symbol='AAPL',
+        trade_type='Covered Call',
+        position_type='Open',
+        strike_price=160.00,
+        expiration_date=date(2025, 3, 21),
+        contract_quantity=contracts,
+        trade_price=2.00,
+        trade_action='Sold to Open',
+        premium=200.00 * contracts,
+        fees=0,
+        trade_date=date(2025, 1, 10),
+        status=status,
+        stock_position_id=position.id,
+        shares_used=contracts * 100
+    ))
+
+class TestStockPositionAvailability:
+    """Test committed shares come from one grouped query"""
+
+    def test_committed_shares_only_count_open_calls(self, test_app, test_account):
+        """Test closed covered calls release their shares"""
+        with test_app.app_context():
+            account_id = test_account.id
+            first = _lot(account_id, shares=300)
+            second = _lot(account_id)
+            free = _lot(account_id)
+            _covered_call(account_id, first, 1)
+            _covered_call(account_id, first, 1)
+            _covered_call(account_id, first, 1, status='Closed')
+            _covered_call(account_id, second, 2)
+            db.session.commit()
+
+            committed = StockPosition.committed_shares_by_position([first.id, second.id, free.id])
+            assert committed == {first.id: 200, second.id: 200}
+            assert first.get_available_shares(committed.get(first.id, 0)) == 100
+            assert second.get_available_shares() == 0
+            assert free.to_dict(include_available_shares=True)['available_shares'] == 200
+
+    def test_listing_positions_does_not_scan_covered_calls(self, test_app, test_account):
+        """Test serializing many lots runs one aggregate query instead of one per lot"""
+        with test_app.app_context():
+            account_id = test_account.id
+            positions = [_lot(account_id) for _ in range(10)]
+            for position in positions:
+                _covered_call(account_id, position, 1)
+            db.session.commit()
+            positions = StockPosition.query.all()
+
+            statements = []
+            def count(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                committed = StockPosition.committed_shares_by_position([pos.id for pos in positions])
+                dicts = [pos.to_dict(include_available_shares=True, committed_shares=committed.get(pos.id, 0)) for pos in positions]
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+
+            assert len(statements) == 1
+            assert all(d['available_shares'] == 100 and d['shares_used'] == 100 for d in dicts)
@@ -0,0 +1,59 @@
+"""
+Tests for the portfolio stress test under underlying price shocks
+"""
+import pytest
+from datetime import date
+from models import db, Trade, StockPosition
+from utils.stress_test import run_stress_test
+
+TODAY = date(2025, 1, 6)
+
+class TestStressTest:
+    """Test assignment exposure and scenario P&L across a shock grid"""
+
+    def test_assignment_exposure_grows_as_market_drops(self, test_app, test_account, open_leg):
+        """Test short puts flip to assigned once the shocked spot is below the strike"""
+        with test_app.app_context():
+            account_id = test_account.id
+            open_leg(account_id, 'AAPL', 'CSP', 'Sold to Open', 95.00, 300.00, quantity=2)  # 5% below spot
+            open_leg(account_id, 'AAPL', 'CSP', 'Sold to Open', 85.00, 150.00)  # 15% below spot
+            trades = Trade.query.all()
+
+            scenarios, unpriced = run_stress_test(trades, [], {'AAPL': 100.00}, [-20, -10, 0], today=TODAY)
+
+            assert unpriced == []
+            assert [s['assigned_shares'] for s in scenarios] == [300, 200, 0]
+            assert [s['assignment_cash_required'] for s in scenarios] == [27500.00, 19000.00, 0]
+            assert scenarios[2]['option_pnl'] == 0
+            # Short puts lose money as the market falls
+            assert scenarios[0]['option_pnl'] < scenarios[1]['option_pnl'] < 0
+
+    def test_symbol_shocks_and_stock_lots(self, test_app, test_account, open_leg):
+        """Test a per-symbol override moves only that symbol, shares included"""
+        with test_app.app_context():
+            account_id = test_account.id
+            lot = StockPosition(account_id=account_id, symbol='MSFT', shares=100, cost_basis_per_share=290.00,
+                                acquired_date=TODAY, status='Open')
+            db.session.add(lot)
+            db.session.commit()
+            open_leg(account_id, 'MSFT', 'Covered Call', 'Sold to Open', 310.00, 150.00, stock_position_id=lot.id)
+            open_leg(account_id, 'AAPL', 'CSP', 'Sold to Open', 95.00, 150.00)
+
+            scenarios, _ = run_stress_test(Trade.query.all(), [lot], {'AAPL': 100.00, 'MSFT': 300.00},
+                                           [-10, 10], symbol_shocks={'MSFT': [0, 5]}, today=TODAY)
+
+            down, up = scenarios
+            msft_down = next(s for s in down['by_symbol'] if s['symbol'] == 'MSFT')
+            assert (msft_down['shock_pct'], msft_down['stock_pnl'], msft_down['option_pnl']) == (0, 0, 0)
+            assert down['assigned_shares'] == 100  # AAPL put at 90 < 95
+            msft_up = next(s for s in up['by_symbol'] if s['symbol'] == 'MSFT')
+            assert msft_up['stock_pnl'] == 1500.00
+            assert msft_up['called_away_shares'] == 100  # 315 > 310
+            assert msft_up['called_away_proceeds'] == 31000.00
+            assert up['total_pnl'] == pytest.approx(up['option_pnl'] + 1500.00, abs=0.01)
+
+    def test_empty_book(self, test_app, test_account):
+        """Test no positions gives zeroed scenarios"""
+        with test_app.app_context():
+            scenarios, unpriced = run_stress_test([], [], {}, [-10, 0], today=TODAY)
+            assert [(s['total_pnl'], s['assigned_shares'], s['by_symbol']) for s in scenarios] == [(0, 0, []), (0, 0, [])]
@@ -0,0 +1,49 @@
+"""
+Tests for the synthetic wheel-trading data generator used by the benchmarks
+"""
+from models import Trade, StockPosition, MonthlyPnl
+from utils.synthetic_data import generate_wheel_data
+from utils.open_quantity import check_remaining_open_quantities
+
+class TestSyntheticData:
+    """Test the generator writes consistent, realistic chains"""
+
+    def test_generates_every_chain_shape(self, test_app):
+        """Test users x accounts x trades, every chain shape, consistent open quantities and a rebuilt rollup"""
+        with test_app.app_context():
+            data = generate_wheel_data(users=2, accounts_per_user=2, trades_per_account=150, seed=3)
+
+            assert len(data['user_ids']) == 2
+            account_ids = [account_id for ids in data['account_ids'].values() for account_id in ids]
+            assert len(account_ids) == 4
+            for account_id in account_ids:
+                assert Trade.query.filter_by(account_id=account_id).count() >= 150
+            assert Trade.query.count() == data['trades']
+            assert StockPosition.query.count() == data['stock_positions']
+
+            kinds = set((t.trade_type, t.trade_action, t.status, t.close_method) for t in Trade.query)
+            assert ('CSP', 'Sold to Open', 'Closed', 'buy_to_close') in kinds  # Single-entry close
+            assert ('CSP', 'Bought to Close', 'Closed', None) in kinds  # Two-entry partial close
+            assert ('Assignment', None, 'Assigned', None) in kinds
+            assert ('Covered Call', 'Sold to Open', 'Called Away', 'called_away') in kinds
+            assert ('LEAPS', 'Bought to Open', 'Closed', 'exercise') in kinds
+            assert ('CSP', 'Sold to Open', 'Open', None) in kinds
+
+            # Covered calls point at their lot, and stored open quantities match the chains
+            called_away = Trade.query.filter_by(status='Called Away').first()
+            assert StockPosition.query.get(called_away.stock_position_id).status == 'Called Away'
+            assert check_remaining_open_quantities() == []
+            assert MonthlyPnl.query.count() > 0
+
+    def test_same_seed_same_data(self, test_app):
+        """Test a seed reproduces the same trades"""
+        with test_app.app_context():
+            first = generate_wheel_data(trades_per_account=50, seed=9, email_prefix='first')
+            second = generate_wheel_data(trades_per_account=50, seed=9, email_prefix='second')
+
+            def rows(data):
+                account_id = data['account_ids'][data['user_ids'][0]][0]
+                return [(t.symbol, t.trade_type, t.status, str(t.strike_price), t.contract_quantity)
+                        for t in Trade.query.filter_by(account_id=account_id).order_by(Trade.id)]
+
+            assert rows(first) == rows(second)
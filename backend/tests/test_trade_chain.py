@@ -0,0 +1,67 @@
+"""
+Tests for retrieving a whole wheel chain with the recursive chain query
+"""
+import pytest
+from datetime import date
+from sqlalchemy import text
+from models import db
+from utils.trade_chain import CHAIN_COMPONENT_SQL, find_chain_ids, build_chain_tree
+
+class TestTradeChain:
+    """Test the recursive chain query and tree shape"""
+
+    def test_component_is_found_from_any_node(self, test_app, test_account, wheel, add_trade):
+        """Test starting from a closing leg still reaches the CSP at the top"""
+        with test_app.app_context():
+            account_id = test_account.id
+            csp, assignment, lot, calls, buy_back = wheel(account_id)
+            unrelated = add_trade(account_id, 'CSP', 'Sold to Open', date(2025, 1, 6))
+            db.session.commit()
+
+            expected = {csp.id, assignment.id, buy_back.id} | {call.id for call in calls}
+            assert find_chain_ids(buy_back.id) == (expected, {lot.id})
+            assert find_chain_ids(csp.id) == (expected, {lot.id})
+            assert find_chain_ids(unrelated.id) == ({unrelated.id}, set())
+
+    def test_chain_is_returned_as_a_tree(self, test_app, test_account, wheel):
+        """Test the chain nests CSP > assignment > lot > calls > closing legs"""
+        with test_app.app_context():
+            csp, assignment, lot, calls, buy_back = wheel(test_account.id)
+
+            tree = build_chain_tree(calls[0].id)
+
+            assert (tree['trade_count'], tree['stock_position_count']) == (5, 1)
+            assert len(tree['roots']) == 1
+            root = tree['roots'][0]
+            assert root['id'] == csp.id
+            assignment_node = root['children'][0]
+            assert assignment_node['id'] == assignment.id
+            lot_node = assignment_node['children'][0]
+            assert (lot_node['node_type'], lot_node['id']) == ('stock_position', lot.id)
+            assert [node['id'] for node in lot_node['children']] == [call.id for call in calls]
+            assert [node['id'] for node in lot_node['children'][0]['children']] == [buy_back.id]
+
+    def test_cycles_in_links_terminate(self, test_app, test_account, add_trade):
+        """Test a bad link loop doesn't recurse forever"""
+        with test_app.app_context():
+            account_id = test_account.id
+            first = add_trade(account_id, 'CSP', 'Sold to Open', date(2025, 1, 6))
+            second = add_trade(account_id, 'CSP', 'Sold to Open', date(2025, 1, 7), parent_trade_id=first.id)
+            first.parent_trade_id = second.id
+            db.session.commit()
+
+            assert find_chain_ids(first.id) == ({first.id, second.id}, set())
+            tree = build_chain_tree(first.id)
+            assert [root['id'] for root in tree['roots']] == [first.id]
+            assert [child['id'] for child in tree['roots'][0]['children']] == [second.id]
+
+    def test_chain_query_probes_indexes(self, test_app):
+        """Test the walk looks up each link by index instead of scanning or materializing every trade"""
+        with test_app.app_context():
+            sql = 'EXPLAIN QUERY PLAN ' + str(CHAIN_COMPONENT_SQL)
+            plan = [row[3] for row in db.session.execute(text(sql), {'trade_id': 1})]
+
+            table_steps = [step for step in plan if step.startswith(('SCAN', 'SEARCH'))
+                           and step.split()[1] in ('parent', 'child', 'own', 'created_lot', 'written', 'lot')]
+            assert len(table_steps) == 6
+            assert all(step.startswith('SEARCH') for step in table_steps), plan
@@ -0,0 +1,130 @@
+"""
+Tests for grouping trades into wheel cycles and per-cycle metrics
+"""
+import pytest
+from datetime import date
+from models import db, StockPosition
+from utils.wheel_cycles import get_wheel_cycles
+
+class TestWheelCycles:
+    """Test the wheel-cycle engine"""
+
+    def test_complete_cycle_metrics(self, test_app, test_account, wheel):
+        """Test premium, stock gain, fees and duration for a wheel that was called away"""
+        with test_app.app_context():
+            csp, assignment, lot, calls, buy_back = wheel(test_account.id)
+            trades = [csp, assignment, *calls, buy_back]
+
+            cycles = get_wheel_cycles([test_account.id])
+
+            assert len(cycles) == 1
+            cycle = cycles[0]
+            assert cycle['cycle_id'] == csp.id
+            assert cycle['trade_ids'] == sorted(trade.id for trade in trades)
+            assert (cycle['stage'], cycle['is_complete']) == ('called_away', True)
+            assert cycle['total_premium'] == 520.00  # 300 + 150 - 40 + 110
+            assert cycle['stock_gain'] == 550.00  # (152.50 - 147) x 100
+            assert cycle['net_pnl'] == 1055.00  # less the 15.00 assignment fee
+            assert cycle['capital'] == 15000.00
+            assert (cycle['start_date'], cycle['end_date']) == ('2025-01-06', '2025-04-17')
+            assert cycle['duration_days'] == 101
+            assert cycle['return_pct'] == 7.03
+            assert cycle['annualized_return_pct'] > cycle['return_pct']
+
+    def test_open_cycle_runs_to_today(self, test_app, test_account, wheel):
+        """Test a wheel still holding shares is open and measured up to today"""
+        with test_app.app_context():
+            wheel(test_account.id, lot_status='Open', final_call_status='Open')
+
+            cycle = get_wheel_cycles([test_account.id], today=date(2025, 4, 6))[0]
+
+            assert (cycle['stage'], cycle['is_complete']) == ('holding_shares', False)
+            assert cycle['end_date'] is None
+            assert cycle['duration_days'] == 90
+            assert cycle['stock_gain'] == 0
+
+    def test_separate_cycles_and_non_wheel_trades(self, test_app, test_account, wheel, add_trade):
+        """Test unrelated CSPs form their own cycles and LEAPS-only trades are skipped"""
+        with test_app.app_context():
+            account_id = test_account.id
+            wheel(account_id)
+            expired_csp = add_trade(account_id, 'CSP', 'Sold to Open', date(2025, 5, 5), symbol='MSFT',
+                                 strike_price=300.00, premium=250.00, status='Expired', close_date=date(2025, 6, 20))
+            add_trade(account_id, 'LEAPS', 'Bought to Open', date(2025, 6, 2), premium=-1200.00)
+            db.session.commit()
+
+            cycles = get_wheel_cycles([account_id])
+
+            assert [cycle['symbol'] for cycle in cycles] == ['MSFT', 'AAPL']
+            msft = cycles[0]
+            assert msft['cycle_id'] == expired_csp.id
+            assert (msft['stage'], msft['is_complete']) == ('csp_closed', True)
+            assert msft['net_pnl'] == 250.00
+
+    def test_cycle_through_assignment_endpoint(self, test_app, test_account, auth_headers):
+        """Test a CSP assigned via POST /api/trades/<id>/close joins its lot and covered call, with the fee counted once"""
+        client = test_app.test_client()
+        account_id = test_account.id
+        response = client.post('/api/trades', headers=auth_headers, json={
+            'account_id': account_id, 'symbol': 'AAPL', 'trade_type': 'CSP', 'trade_action': 'Sold to Open',
+            'strike_price': 150.00, 'expiration_date': '2025-02-21', 'contract_quantity': 1,
+            'trade_price': 3.00, 'fees': 0, 'trade_date': '2025-01-06', 'status': 'Open'
+        })
+        csp_id = response.get_json()['id']
+        response = client.post(f'/api/trades/{csp_id}/close', headers=auth_headers, json={
+            'close_method': 'assigned', 'close_date': '2025-02-21', 'assignment_fee': 15.00
+        })
+        assert response.status_code == 201
+        assignment_id = response.get_json()['id']
+
+        with test_app.app_context():
+            lot = StockPosition.query.filter_by(account_id=account_id).one()
+            assert lot.source_trade_id == assignment_id
+            lot_id = lot.id
+        response = client.post('/api/trades', headers=auth_headers, json={
+            'account_id': account_id, 'symbol': 'AAPL', 'trade_type': 'Covered Call', 'trade_action': 'Sold to Open',
+            'strike_price': 155.00, 'expiration_date': '2025-03-21', 'contract_quantity': 1, 'trade_price': 1.50,
+            'fees': 0, 'trade_date': '2025-02-24', 'status': 'Open', 'stock_position_id': lot_id
+        })
+        call_id = response.get_json()['id']
+
+        cycles = client.get('/api/dashboard/wheel-cycles', headers=auth_headers).get_json()['cycles']
+
+        assert len(cycles) == 1
+        cycle = cycles[0]
+        assert cycle['trade_ids'] == sorted([csp_id, assignment_id, call_id])
+        assert cycle['stage'] == 'holding_shares'
+        assert cycle['fees'] == 15.00
+        assert cycle['net_pnl'] == 435.00  # 300 + 150 premium less the 15.00 assignment fee
+
+    def test_called_away_fee_counted(self, test_app, test_account, auth_headers):
+        """Test the fee charged on a call-away via POST /api/trades/<id>/close is subtracted with the assignment fee"""
+        client = test_app.test_client()
+        account_id = test_account.id
+        response = client.post('/api/trades', headers=auth_headers, json={
+            'account_id': account_id, 'symbol': 'AAPL', 'trade_type': 'CSP', 'trade_action': 'Sold to Open',
+            'strike_price': 150.00, 'expiration_date': '2025-02-21', 'contract_quantity': 1,
+            'trade_price': 3.00, 'fees': 0, 'trade_date': '2025-01-06', 'status': 'Open'
+        })
+        csp_id = response.get_json()['id']
+        client.post(f'/api/trades/{csp_id}/close', headers=auth_headers, json={
+            'close_method': 'assigned', 'close_date': '2025-02-21', 'assignment_fee': 15.00
+        })
+        with test_app.app_context():
+            lot_id = StockPosition.query.filter_by(account_id=account_id).one().id
+        response = client.post('/api/trades', headers=auth_headers, json={
+            'account_id': account_id, 'symbol': 'AAPL', 'trade_type': 'Covered Call', 'trade_action': 'Sold to Open',
+            'strike_price': 155.00, 'expiration_date': '2025-03-21', 'contract_quantity': 1, 'trade_price': 1.50,
+            'fees': 0, 'trade_date': '2025-02-24', 'status': 'Open', 'stock_position_id': lot_id
+        })
+        call_id = response.get_json()['id']
+        response = client.post(f'/api/trades/{call_id}/close', headers=auth_headers, json={
+            'close_method': 'called_away', 'close_date': '2025-03-21', 'assignment_fee': 10.00
+        })
+        assert response.status_code == 200
+
+        cycle = client.get('/api/dashboard/wheel-cycles', headers=auth_headers).get_json()['cycles'][0]
+
+        assert (cycle['stage'], cycle['is_complete']) == ('called_away', True)
+        assert cycle['fees'] == 25.00
+        assert cycle['net_pnl'] == 925.00  # 300 + 150 premium + 500 stock gain less 15.00 + 10.00 fees
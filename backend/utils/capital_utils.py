@@ -0,0 +1,91 @@
+from datetime import date
+from sqlalchemy import func
+from models import db, Account, Deposit, Withdrawal, MonthlyPnl, REALIZED_STATUSES
+
+def _cash_flow_subqueries(as_of):
+    """(deposits, withdrawals) subqueries of account_id -> amount up to and including as_of"""
+    deposits = (
+        db.session.query(Deposit.account_id.label('account_id'), func.sum(Deposit.amount).label('amount'))
+        .filter(Deposit.deposit_date <= as_of)
+        .group_by(Deposit.account_id)
+        .subquery()
+    )
+    withdrawals = (
+        db.session.query(Withdrawal.account_id.label('account_id'), func.sum(Withdrawal.amount).label('amount'))
+        .filter(Withdrawal.withdrawal_date <= as_of)
+        .group_by(Withdrawal.account_id)
+        .subquery()
+    )
+    return deposits, withdrawals
+
+def account_capital_query(as_of=None):
+    """
+    Query of (Account, total_capital) rows computed in a single SQL statement.
+
+    total_capital = initial balance + deposits - withdrawals + realized P&L, the same
+    definition as get_total_capital on the dashboard. Each source table is reduced
+    with one GROUP BY subquery and outer-joined to accounts, and realized P&L comes
+    from the monthly_pnl rollup instead of re-pricing every trade.
+    Filter the result like any Account query (e.g. by user_id).
+    """
+    as_of = as_of or date.today()
+
+    deposits, withdrawals = _cash_flow_subqueries(as_of)
+    realized = (
+        db.session.query(MonthlyPnl.account_id.label('account_id'), func.sum(MonthlyPnl.realized_pnl).label('amount'))
+        .filter(MonthlyPnl.year * 12 + MonthlyPnl.month <= as_of.year * 12 + as_of.month)
+        .group_by(MonthlyPnl.account_id)
+        .subquery()
+    )
+
+    total_capital = (
+        func.coalesce(Account.initial_balance, 0)
+        + func.coalesce(deposits.c.amount, 0)
+        - func.coalesce(withdrawals.c.amount, 0)
+        + func.coalesce(realized.c.amount, 0)
+    ).label('total_capital')
+
+    return (
+        db.session.query(Account, total_capital)
+        .outerjoin(deposits, deposits.c.account_id == Account.id)
+        .outerjoin(withdrawals, withdrawals.c.account_id == Account.id)
+        .outerjoin(realized, realized.c.account_id == Account.id)
+    )
+
+def get_total_capital_by_account(account_ids, as_of=None):
+    """Map of account_id -> total capital for the given accounts, in one query"""
+    rows = account_capital_query(as_of).filter(Account.id.in_(account_ids))
+    return {account.id: round(float(total or 0), 2) for account, total in rows}
+
+def get_capital_at_date_by_account(account_ids, as_of, trades):
+    """
+    Map of account_id -> total capital as of as_of (inclusive), exact to the day.
+
+    Initial balances, deposits and withdrawals come from one grouped query; realized
+    P&L is summed from trades, the caller's already loaded opening trades for these
+    accounts (closing legs excluded, loaded with Trade.pnl_loader_options()), since
+    the monthly_pnl rollup only resolves whole months.
+    """
+    if not account_ids:
+        return {}
+    deposits, withdrawals = _cash_flow_subqueries(as_of)
+    rows = (
+        db.session.query(
+            Account.id,
+            func.coalesce(Account.initial_balance, 0)
+            + func.coalesce(deposits.c.amount, 0)
+            - func.coalesce(withdrawals.c.amount, 0)
+        )
+        .outerjoin(deposits, deposits.c.account_id == Account.id)
+        .outerjoin(withdrawals, withdrawals.c.account_id == Account.id)
+        .filter(Account.id.in_(account_ids))
+    )
+    capital = {acc_id: float(total or 0) for acc_id, total in rows}
+
+    for trade in trades:
+        if trade.account_id not in capital or trade.status not in REALIZED_STATUSES:
+            continue
+        pnl_date = trade.get_pnl_date()
+        if pnl_date and pnl_date <= as_of:
+            capital[trade.account_id] += trade.calculate_realized_pnl()
+    return capital
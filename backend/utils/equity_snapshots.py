@@ -0,0 +1,252 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy import func
+from models import db, Account, AccountSnapshot, Deposit, Withdrawal, Trade, MonthlyPnl, REALIZED_STATUSES, OPENING_ACTIONS
+
+CLOSING_ACTIONS = ['Bought to Close', 'Sold to Close']
+
+# Rows per bulk INSERT when writing a backfill
+SNAPSHOT_INSERT_BATCH = 5000
+
+# Value columns of account_snapshots (and of swept rows)
+SNAPSHOT_FIELDS = ('total_capital', 'realized_pnl', 'open_premium', 'capital_at_risk')
+
+def _risk_per_contract(trade, trades_by_id):
+    """
+    Capital at risk for one contract, same rule as the open positions allocation:
+    strike x 100, or the assignment price x 100 for covered calls written on assigned shares.
+    """
+    risk = float(trade.strike_price) * 100 if trade.strike_price else 0
+    if trade.trade_type == 'Covered Call' and trade.parent_trade_id:
+        parent = trades_by_id.get(trade.parent_trade_id)
+        if parent and parent.trade_type == 'Assignment' and parent.assignment_price:
+            risk = float(parent.assignment_price) * 100
+    return risk
+
+def _account_events(account):
+    """
+    Turn an account's history into per-day deltas.
+
+    Returns (first_activity_date, deltas) where deltas maps date -> dict with
+    capital, realized, premium and risk changes taking effect that day.
+    """
+    deltas = defaultdict(lambda: {'capital': 0.0, 'realized': 0.0, 'premium': 0.0, 'risk': 0.0})
+    dates = [account.created_at.date()] if account.created_at else []
+
+    for deposit in Deposit.query.filter_by(account_id=account.id):
+        deltas[deposit.deposit_date]['capital'] += float(deposit.amount) if deposit.amount else 0
+        dates.append(deposit.deposit_date)
+    for withdrawal in Withdrawal.query.filter_by(account_id=account.id):
+        deltas[withdrawal.withdrawal_date]['capital'] -= float(withdrawal.amount) if withdrawal.amount else 0
+        dates.append(withdrawal.withdrawal_date)
+
+    trades = Trade.query.options(*Trade.pnl_loader_options()).filter_by(account_id=account.id).all()
+    trades_by_id = {trade.id: trade for trade in trades}
+    closing_legs = defaultdict(list)
+    for trade in trades:
+        if trade.trade_action in CLOSING_ACTIONS and trade.parent_trade_id:
+            closing_legs[trade.parent_trade_id].append(trade)
+
+    for trade in trades:
+        if trade.trade_action in CLOSING_ACTIONS and trade.parent_trade_id:
+            continue  # Counted through the parent, like the rest of the dashboard
+        dates.append(trade.trade_date)
+
+        # Realized P&L lands on the realization date (same rule as get_total_capital_at_date)
+        pnl_date = trade.get_pnl_date() if trade.status in REALIZED_STATUSES else None
+        if pnl_date:
+            realized = trade.calculate_realized_pnl()
+            deltas[pnl_date]['realized'] += realized
+            deltas[pnl_date]['capital'] += realized
+
+        if trade.trade_action not in OPENING_ACTIONS:
+            continue
+
+        # Exposure: open from trade_date, reduced by each closing leg, gone on the realization date
+        quantity = trade.contract_quantity or 1
+        premium_per_contract = (float(trade.premium) if trade.premium else 0) / quantity
+        risk_per_contract = _risk_per_contract(trade, trades_by_id)
+        deltas[trade.trade_date]['premium'] += premium_per_contract * quantity
+        deltas[trade.trade_date]['risk'] += risk_per_contract * quantity
+
+        remaining = quantity
+        for leg in sorted(closing_legs.get(trade.id, []), key=lambda t: t.trade_date):
+            if pnl_date and leg.trade_date >= pnl_date:
+                break
+            closed = min(remaining, leg.contract_quantity or 1)
+            deltas[leg.trade_date]['premium'] -= premium_per_contract * closed
+            deltas[leg.trade_date]['risk'] -= risk_per_contract * closed
+            remaining -= closed
+        if pnl_date and remaining > 0:
+            deltas[pnl_date]['premium'] -= premium_per_contract * remaining
+            deltas[pnl_date]['risk'] -= risk_per_contract * remaining
+
+    return (min(dates) if dates else None), deltas
+
+def sweep_account_snapshots(account, start_date=None, end_date=None):
+    """
+    Compute end-of-day snapshots for every day in [start_date, end_date] in one
+    chronological pass over the account's history (events before start_date only
+    build up the opening state).
+
+    Returns a list of dicts ready to insert into account_snapshots.
+    """
+    end_date = end_date or date.today()
+    first_date, deltas = _account_events(account)
+    if first_date is None:
+        return []
+    start_date = max(start_date or first_date, first_date)
+
+    capital = float(account.initial_balance) if account.initial_balance else 0
+    realized = premium = risk = 0.0
+    for event_date in sorted(d for d in deltas if d < start_date):
+        delta = deltas[event_date]
+        capital += delta['capital']
+        realized += delta['realized']
+        premium += delta['premium']
+        risk += delta['risk']
+
+    rows = []
+    day = start_date
+    while day <= end_date:
+        delta = deltas.get(day)
+        if delta:
+            capital += delta['capital']
+            realized += delta['realized']
+            premium += delta['premium']
+            risk += delta['risk']
+        rows.append({
+            'account_id': account.id,
+            'snapshot_date': day,
+            'total_capital': round(capital, 2),
+            'realized_pnl': round(realized, 2),
+            'open_premium': round(premium, 2),
+            'capital_at_risk': round(risk, 2)
+        })
+        day += timedelta(days=1)
+    return rows
+
+def backfill_account_snapshots(account, start_date=None, end_date=None):
+    """
+    Replace the account's snapshots in [start_date, end_date] (default: full history
+    through today) with freshly swept values. Returns the number of rows written.
+    The caller commits.
+    """
+    rows = sweep_account_snapshots(account, start_date, end_date)
+    if not rows:
+        return 0
+    AccountSnapshot.query.filter(
+        AccountSnapshot.account_id == account.id,
+        AccountSnapshot.snapshot_date >= rows[0]['snapshot_date'],
+        AccountSnapshot.snapshot_date <= rows[-1]['snapshot_date']
+    ).delete(synchronize_session=False)
+    for i in range(0, len(rows), SNAPSHOT_INSERT_BATCH):
+        db.session.execute(AccountSnapshot.__table__.insert(), rows[i:i + SNAPSHOT_INSERT_BATCH])
+    return len(rows)
+
+def record_today_snapshot(account, today=None):
+    """
+    Write (or refresh) today's snapshot without replaying history: cash from SUM
+    aggregates, realized P&L from the monthly_pnl rollup and exposure from the
+    currently open trades only. The caller commits.
+    """
+    today = today or date.today()
+
+    deposits = db.session.query(func.coalesce(func.sum(Deposit.amount), 0)).filter(
+        Deposit.account_id == account.id, Deposit.deposit_date <= today).scalar()
+    withdrawals = db.session.query(func.coalesce(func.sum(Withdrawal.amount), 0)).filter(
+        Withdrawal.account_id == account.id, Withdrawal.withdrawal_date <= today).scalar()
+    realized = db.session.query(func.coalesce(func.sum(MonthlyPnl.realized_pnl), 0)).filter(
+        MonthlyPnl.account_id == account.id,
+        (MonthlyPnl.year * 12 + MonthlyPnl.month) <= (today.year * 12 + today.month)
+    ).scalar()
+
+    open_trades = Trade.query.filter(
+        Trade.account_id == account.id,
+        Trade.status == 'Open',
+        Trade.trade_action.in_(OPENING_ACTIONS),
+        Trade.trade_date <= today
+    ).all()
+    parent_ids = set(trade.parent_trade_id for trade in open_trades if trade.parent_trade_id)
+    parents = {t.id: t for t in Trade.query.filter(Trade.id.in_(parent_ids))} if parent_ids else {}
+
+    premium = risk = 0.0
+    for trade in open_trades:
+        remaining = trade.get_remaining_open_quantity()
+        quantity = trade.contract_quantity or 1
+        premium += (float(trade.premium) if trade.premium else 0) / quantity * remaining
+        risk += _risk_per_contract(trade, parents) * remaining
+
+    realized = float(realized)
+    capital = (float(account.initial_balance) if account.initial_balance else 0) + float(deposits) - float(withdrawals) + realized
+
+    snapshot = db.session.get(AccountSnapshot, (account.id, today))
+    if snapshot is None:
+        snapshot = AccountSnapshot(account_id=account.id, snapshot_date=today)
+        db.session.add(snapshot)
+    snapshot.total_capital = round(capital, 2)
+    snapshot.realized_pnl = round(realized, 2)
+    snapshot.open_premium = round(premium, 2)
+    snapshot.capital_at_risk = round(risk, 2)
+    return snapshot
+
+def ensure_snapshots(account_ids, today=None):
+    """
+    Bring snapshots up to date: backfill accounts that have none, sweep any missed
+    days since the last snapshot, and refresh today's row. The caller commits.
+    """
+    today = today or date.today()
+    last_dates = dict(
+        db.session.query(AccountSnapshot.account_id, func.max(AccountSnapshot.snapshot_date))
+        .filter(AccountSnapshot.account_id.in_(account_ids))
+        .group_by(AccountSnapshot.account_id)
+        .all()
+    )
+
+    for account in Account.query.filter(Account.id.in_(account_ids)):
+        last_date = last_dates.get(account.id)
+        yesterday = today - timedelta(days=1)
+        if last_date is None:
+            backfill_account_snapshots(account, end_date=yesterday)
+        elif last_date < yesterday:
+            backfill_account_snapshots(account, start_date=last_date + timedelta(days=1), end_date=yesterday)
+        record_today_snapshot(account, today)
+
+def load_snapshot_rows(account_ids, start_date, end_date):
+    """
+    Snapshot rows for the accounts in [start_date, end_date] (start_date None: from
+    each account's first activity), without writing anything: stored snapshots, plus
+    the days after an account's last stored one (not recorded yet, or deleted because
+    an earlier trade or cash flow changed) swept in memory.
+
+    Returns a list of dicts shaped like sweep_account_snapshots rows.
+    """
+    last_dates = dict(
+        db.session.query(AccountSnapshot.account_id, func.max(AccountSnapshot.snapshot_date))
+        .filter(AccountSnapshot.account_id.in_(account_ids))
+        .group_by(AccountSnapshot.account_id)
+        .all()
+    )
+
+    query = AccountSnapshot.query.filter(
+        AccountSnapshot.account_id.in_(account_ids),
+        AccountSnapshot.snapshot_date <= end_date
+    )
+    if start_date:
+        query = query.filter(AccountSnapshot.snapshot_date >= start_date)
+    rows = [
+        dict({field: float(getattr(snapshot, field) or 0) for field in SNAPSHOT_FIELDS},
+             account_id=snapshot.account_id, snapshot_date=snapshot.snapshot_date)
+        for snapshot in query
+    ]
+
+    behind = [account_id for account_id in account_ids
+              if last_dates.get(account_id) is None or last_dates[account_id] < end_date]
+    if behind:
+        for account in Account.query.filter(Account.id.in_(behind)):
+            last_date = last_dates.get(account.id)
+            gap_start = last_date + timedelta(days=1) if last_date else None
+            if start_date and (gap_start is None or gap_start < start_date):
+                gap_start = start_date
+            rows += sweep_account_snapshots(account, gap_start, end_date)
+    return rows
@@ -0,0 +1,67 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+# Column order for each exported sheet. Trade columns must stay in sync with
+# parse_trade_file so an export can be re-imported without edits.
+TRADE_EXPORT_COLUMNS = [
+    'account_id', 'symbol', 'trade_type', 'position_type', 'strike_price',
+    'expiration_date', 'contract_quantity', 'trade_price', 'trade_action',
+    'premium', 'fees', 'trade_date', 'open_date', 'close_date', 'status',
+    'parent_trade_id', 'assignment_price', 'close_price', 'close_fees',
+    'close_premium', 'close_method', 'notes'
+]
+
+DEPOSIT_EXPORT_COLUMNS = ['account_id', 'amount', 'deposit_date', 'notes']
+
+WITHDRAWAL_EXPORT_COLUMNS = ['account_id', 'amount', 'withdrawal_date', 'notes']
+
+STOCK_POSITION_EXPORT_COLUMNS = [
+    'account_id', 'symbol', 'shares', 'cost_basis_per_share', 'acquired_date',
+    'status', 'source_trade_id', 'notes'
+]
+
+def _export_value(value):
+    """Convert a database value into something a spreadsheet cell can hold"""
+    if value is None:
+        return None
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        # Same YYYY-MM-DD format as the CSV export so both re-import identically
+        return value.strftime('%Y-%m-%d')
+    return value
+
+def write_streaming_workbook(output, sheets):
+    """
+    Write an .xlsx file using openpyxl's write-only mode.
+
+    Write-only worksheets serialize each row as soon as it is appended instead of
+    keeping a cell object model for the whole workbook, so memory stays flat no
+    matter how many rows are exported. Rows can therefore come straight from a
+    streaming database result.
+
+    Args:
+        output: Binary file-like object to write the workbook to
+        sheets: Iterable of (sheet_name, columns, rows) tuples. Each row is a
+            sequence of values in the same order as columns.
+
+    Returns:
+        Dict mapping sheet name to number of data rows written
+    """
+    # Imported on first export so openpyxl isn't loaded by every worker at start-up
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    row_counts = {}
+
+    for sheet_name, columns, rows in sheets:
+        worksheet = workbook.create_sheet(title=sheet_name)
+        worksheet.append(list(columns))
+        count = 0
+        for row in rows:
+            worksheet.append([_export_value(value) for value in row])
+            count += 1
+        row_counts[sheet_name] = count
+
+    workbook.save(output)
+    return row_counts
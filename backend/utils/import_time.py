@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only the import/export paths need these; importing app must not load them
+LAZY_IMPORTS = ('pandas', 'openpyxl')
+
+def measure_import(module='app', cwd=BACKEND_DIR, env=None):
+    """
+    Import `module` in a fresh interpreter under `python -X importtime`.
+
+    Returns {'total_ms': cumulative import time of the module, 'modules': {name:
+    {'self_ms', 'cumulative_ms'}}} covering every module the import loaded.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=cwd, env=env, capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(f'import {module} failed: {result.stderr[-2000:]}')
+
+    modules = {}
+    total_ms = None
+    for line in result.stderr.splitlines():
+        # "import time:       901 |      78881 |         werkzeug.local"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = {'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000}
+        if name.strip() == module:
+            total_ms = int(cumulative_us) / 1000
+    return {'total_ms': total_ms, 'modules': modules}
+
+def top_level_packages(modules):
+    """Cumulative time per top-level package: the first time each package was imported"""
+    packages = {}
+    for name, timing in modules.items():
+        package = name.split('.')[0]
+        packages[package] = max(packages.get(package, 0), timing['cumulative_ms'])
+    return packages
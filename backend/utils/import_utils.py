@@ -1,10 +1,51 @@
-import pandas as pd
+import hashlib
+import io
+from collections import defaultdict
 from datetime import datetime
-from models import Trade
+from decimal import Decimal
+from models import db, Trade
+from utils.process_pool import get_pool
 
-def parse_trade_file(file, account_id):
+# Fields that identify a statement row. Lifecycle fields (status, close_*) are left out
+# on purpose so a trade that was open in one statement and closed in the next is still
+# recognized as the same row.
+FINGERPRINT_FIELDS = [
+    'symbol', 'trade_type', 'position_type', 'trade_action', 'strike_price',
+    'expiration_date', 'contract_quantity', 'trade_price', 'premium', 'fees',
+    'assignment_price', 'trade_date'
+]
+
+# Max fingerprints per IN (...) query; SQLite allows 32766 bind parameters
+FINGERPRINT_QUERY_CHUNK = 10000
+
+# Below this many upload bytes the pool's overhead (pickling files, pandas import in
+# each worker) costs more than parsing inline saves
+PARALLEL_PARSE_MIN_BYTES = 5000000
+
+def _fingerprint_value(value):
+    """Normalize a field so the same row always hashes the same way"""
+    if value is None:
+        return ''
+    if isinstance(value, (int, float, Decimal)):
+        return f'{float(value):.2f}'
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value).strip().upper()
+
+def compute_trade_fingerprint(record, occurrence=0):
+    """
+    Compute a stable content fingerprint for a parsed import row (dict of Trade fields).
+    
+    occurrence is the number of identical rows seen earlier in the same file, so two
+    genuinely identical trades (same day, same price) get distinct fingerprints and
+    re-importing the file still matches both.
     """
-    Parse CSV or Excel file and convert to Trade objects.
+    content = '|'.join(_fingerprint_value(record.get(field)) for field in FINGERPRINT_FIELDS)
+    return hashlib.sha256(f'{content}#{occurrence}'.encode('utf-8')).hexdigest()
+
+def parse_trade_records(content, filename):
+    """
+    Parse CSV or Excel file contents into a list of dicts of Trade fields.
     Expected columns (case-insensitive):
     - symbol, trade_type, strike_price, expiration_date, contract_quantity,
     - premium, fees, trade_date, status, notes, assignment_price, close_date,
@@ -12,21 +53,27 @@ def parse_trade_file(file, account_id):
     Supports both formats:
     - Old format: 2 entries (opening trade + closing trade with parent_trade_id)
     - New format: 1 entry with close_date, close_price, close_fees, close_premium, close_method
+    Each record has import_fingerprint set (see compute_trade_fingerprint).
+    
+    Records are plain picklable values so this can run in a worker process.
     """
+    # Imported here, not at module load: only imports need pandas (and openpyxl for Excel)
+    import pandas as pd
+
     try:
         # Read file based on extension
-        filename = file.filename.lower()
+        filename = filename.lower()
         if filename.endswith('.csv'):
-            df = pd.read_csv(file)
+            df = pd.read_csv(io.BytesIO(content))
         elif filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(file)
+            df = pd.read_excel(io.BytesIO(content))
         else:
             raise ValueError('Unsupported file format. Please use CSV or Excel files.')
         
         # Normalize column names (lowercase, strip whitespace)
         df.columns = df.columns.str.lower().str.strip()
         
-        trades = []
+        records = []
         for _, row in df.iterrows():
             # Parse dates - include all date fields needed for calculations
             trade_date = None
@@ -59,8 +106,7 @@ def parse_trade_file(file, account_id):
             close_premium = float(row['close_premium']) if pd.notna(row.get('close_premium')) else None
             close_method = str(row.get('close_method', '')).strip() if pd.notna(row.get('close_method')) else None
             
-            trade = Trade(
-                account_id=account_id,
+            record = dict(
                 symbol=str(row.get('symbol', '')).upper().strip(),
                 trade_type=str(row.get('trade_type', '')).strip(),
                 position_type=str(row.get('position_type', 'Open')).strip(),
@@ -84,9 +130,66 @@ def parse_trade_file(file, account_id):
                 notes=str(row.get('notes', '')) if pd.notna(row.get('notes')) else None
             )
             
-            trades.append(trade)
+            records.append(record)
         
-        return trades
+        # Assign fingerprints, numbering identical rows in file order
+        occurrences = defaultdict(int)
+        for record in records:
+            base = compute_trade_fingerprint(record)
+            record['import_fingerprint'] = compute_trade_fingerprint(record, occurrences[base])
+            occurrences[base] += 1
+        
+        return records
     except Exception as e:
         raise ValueError(f'Error parsing file: {str(e)}')
 
+def parse_trade_file(file, account_id):
+    """
+    Parse an uploaded CSV or Excel file and convert to Trade objects for an account.
+    See parse_trade_records for the expected columns.
+    """
+    records = parse_trade_records(file.read(), file.filename)
+    return [Trade(account_id=account_id, **record) for record in records]
+
+def _parse_records_worker(upload):
+    """Process pool entry point: (filename, content) -> records"""
+    filename, content = upload
+    try:
+        return parse_trade_records(content, filename)
+    except ValueError as e:
+        raise ValueError(f'{filename}: {str(e)}')
+
+def parse_trade_files_parallel(uploads, max_workers):
+    """
+    Parse several files, spreading the pandas work across worker processes when the
+    upload is large enough (PARALLEL_PARSE_MIN_BYTES) to be worth it.
+    
+    Args:
+        uploads: List of (filename, content bytes) tuples
+        max_workers: Upper bound on worker processes (1 parses inline)
+    
+    Returns:
+        List of record lists, in the same order as uploads
+    """
+    workers = min(max_workers or 1, len(uploads))
+    if workers <= 1 or sum(len(content) for _, content in uploads) < PARALLEL_PARSE_MIN_BYTES:
+        return [_parse_records_worker(upload) for upload in uploads]
+    
+    return list(get_pool(workers).map(_parse_records_worker, uploads))
+
+def find_imported_fingerprints(account_id, fingerprints):
+    """
+    Return {fingerprint: trade_id} for the given fingerprints that were already
+    imported into this account. Uses a single indexed set-membership query
+    (chunked only for very large files to stay under bind parameter limits).
+    """
+    fingerprints = list(set(fp for fp in fingerprints if fp))
+    known = {}
+    for start in range(0, len(fingerprints), FINGERPRINT_QUERY_CHUNK):
+        chunk = fingerprints[start:start + FINGERPRINT_QUERY_CHUNK]
+        rows = db.session.query(Trade.import_fingerprint, Trade.id).filter(
+            Trade.account_id == account_id,
+            Trade.import_fingerprint.in_(chunk)
+        ).all()
+        known.update({fingerprint: trade_id for fingerprint, trade_id in rows})
+    return known
@@ -0,0 +1,163 @@
+from datetime import date
+import numpy as np
+from models import Trade, OPENING_ACTIONS
+from utils.option_pricing import black_scholes, DEFAULT_VOLATILITY, DEFAULT_RISK_FREE_RATE
+
+# Option legs the engine can value, and whether each is a call
+MARKED_TRADE_TYPES = {'CSP': False, 'Covered Call': True, 'LEAPS': True}
+
+def open_option_legs_query(account_ids):
+    """Opening CSP, covered call and LEAPS trades that are still open"""
+    return Trade.query.filter(
+        Trade.account_id.in_(account_ids),
+        Trade.status == 'Open',
+        Trade.trade_action.in_(OPENING_ACTIONS),
+        Trade.trade_type.in_(list(MARKED_TRADE_TYPES))
+    )
+
+def leg_arrays(trades, prices, today=None):
+    """
+    Flatten open legs into parallel NumPy arrays for pricing.
+
+    Legs with no underlying price, no strike/expiration or nothing left open are
+    returned separately as unpriced trade ids instead.
+
+    Returns (legs, arrays, unpriced_ids); arrays holds spot, strike, years, is_call,
+    side (-1 short, +1 long), contracts (still open) and open_premium.
+    """
+    today = today or date.today()
+    legs = []
+    unpriced = []
+    for trade in trades:
+        remaining = trade.get_remaining_open_quantity()
+        spot = prices.get(trade.symbol)
+        if not spot or not trade.strike_price or not trade.expiration_date or remaining <= 0 or trade.trade_type not in MARKED_TRADE_TYPES:
+            unpriced.append(trade.id)
+            continue
+        legs.append((trade, remaining, float(spot)))
+
+    quantity = np.array([trade.contract_quantity or 1 for trade, _, _ in legs], dtype=float)
+    contracts = np.array([remaining for _, remaining, _ in legs], dtype=float)
+    premium = np.array([float(trade.premium) if trade.premium else 0.0 for trade, _, _ in legs])
+    arrays = {
+        'spot': np.array([spot for _, _, spot in legs], dtype=float),
+        'strike': np.array([float(trade.strike_price) for trade, _, _ in legs], dtype=float),
+        'years': np.array([(trade.expiration_date - today).days / 365 for trade, _, _ in legs], dtype=float),
+        'is_call': np.array([MARKED_TRADE_TYPES[trade.trade_type] for trade, _, _ in legs], dtype=bool),
+        'side': np.array([-1.0 if trade.trade_action == 'Sold to Open' else 1.0 for trade, _, _ in legs]),
+        'contracts': contracts,
+        # Premium (net of fees, received > 0, paid < 0) still attributable to the open contracts
+        'open_premium': premium / quantity * contracts
+    }
+    return [trade for trade, _, _ in legs], arrays, unpriced
+
+def mark_open_positions(trades, prices, volatility=DEFAULT_VOLATILITY, rate=DEFAULT_RISK_FREE_RATE,
+                        volatility_by_symbol=None, today=None):
+    """
+    Value open option legs at theoretical Black-Scholes prices in one vectorized pass.
+
+    Args:
+        trades: open opening trades (see open_option_legs_query)
+        prices: dict of symbol -> underlying price (e.g. the cached quotes)
+        volatility: annualized volatility used for symbols not in volatility_by_symbol
+        rate: risk-free rate
+
+    market_value is what closing the leg would cost (< 0 for shorts) or fetch (> 0
+    for longs); unrealized_pnl = open_premium + market_value. delta is in shares
+    (option delta x 100 x contracts, signed by side); theta is dollars per day and
+    vega dollars per vol point.
+
+    Returns dict with positions, by_symbol, totals and unpriced_trade_ids.
+    """
+    today = today or date.today()
+    legs, arrays, unpriced = leg_arrays(trades, prices, today)
+    volatility_by_symbol = volatility_by_symbol or {}
+    sigma = np.array([volatility_by_symbol.get(trade.symbol, volatility) for trade in legs], dtype=float)
+
+    greeks = black_scholes(arrays['spot'], arrays['strike'], arrays['years'], sigma, rate, arrays['is_call'])
+    scale = arrays['side'] * arrays['contracts'] * 100
+    market_value = greeks['price'] * scale
+    unrealized = arrays['open_premium'] + market_value
+    delta = greeks['delta'] * scale
+    gamma = greeks['gamma'] * scale
+    theta = greeks['theta'] * scale
+    vega = greeks['vega'] * scale
+
+    positions = []
+    for i, trade in enumerate(legs):
+        positions.append({
+            'trade_id': trade.id,
+            'account_id': trade.account_id,
+            'symbol': trade.symbol,
+            'trade_type': trade.trade_type,
+            'trade_action': trade.trade_action,
+            'strike_price': float(arrays['strike'][i]),
+            'expiration_date': trade.expiration_date.isoformat(),
+            'days_to_expiration': (trade.expiration_date - today).days,
+            'contracts': int(arrays['contracts'][i]),
+            'underlying_price': round(float(arrays['spot'][i]), 2),
+            'volatility': float(sigma[i]),
+            'option_price': round(float(greeks['price'][i]), 4),
+            'open_premium': round(float(arrays['open_premium'][i]), 2),
+            'market_value': round(float(market_value[i]), 2),
+            'unrealized_pnl': round(float(unrealized[i]), 2),
+            'delta': round(float(delta[i]), 2),
+            'gamma': round(float(gamma[i]), 4),
+            'theta': round(float(theta[i]), 2),
+            'vega': round(float(vega[i]), 2)
+        })
+
+    # Per-symbol sums with one bincount per measure
+    names, symbol_index = np.unique(np.array([trade.symbol for trade in legs], dtype=str), return_inverse=True)
+    def per_symbol(values):
+        return np.bincount(symbol_index, weights=values, minlength=len(names))
+    sums = {
+        'contracts': per_symbol(arrays['contracts']),
+        'open_premium': per_symbol(arrays['open_premium']),
+        'market_value': per_symbol(market_value),
+        'unrealized_pnl': per_symbol(unrealized),
+        'delta': per_symbol(delta),
+        'gamma': per_symbol(gamma),
+        'theta': per_symbol(theta),
+        'vega': per_symbol(vega)
+    }
+    counts = np.bincount(symbol_index, minlength=len(names))
+    symbols = []
+    for j, name in enumerate(names):
+        symbols.append({
+            'symbol': str(name),
+            'underlying_price': round(float(prices[name]), 2),
+            'positions': int(counts[j]),
+            'contracts': int(sums['contracts'][j]),
+            'open_premium': round(float(sums['open_premium'][j]), 2),
+            'market_value': round(float(sums['market_value'][j]), 2),
+            'unrealized_pnl': round(float(sums['unrealized_pnl'][j]), 2),
+            'delta': round(float(sums['delta'][j]), 2),
+            'gamma': round(float(sums['gamma'][j]), 4),
+            'theta': round(float(sums['theta'][j]), 2),
+            'vega': round(float(sums['vega'][j]), 2)
+        })
+
+    return {
+        'positions': positions,
+        'by_symbol': symbols,
+        'totals': {
+            'positions': len(legs),
+            'open_premium': round(float(arrays['open_premium'].sum()), 2),
+            'market_value': round(float(market_value.sum()), 2),
+            'unrealized_pnl': round(float(unrealized.sum()), 2),
+            'delta': round(float(delta.sum()), 2),
+            'theta': round(float(theta.sum()), 2),
+            'vega': round(float(vega.sum()), 2)
+        },
+        'unpriced_trade_ids': unpriced
+    }
+
+def unrealized_pnl_by_trade(trades, prices, volatility=DEFAULT_VOLATILITY, rate=DEFAULT_RISK_FREE_RATE, today=None):
+    """Marked unrealized P&L per trade id, for the legs that could be priced"""
+    legs, arrays, _ = leg_arrays(trades, prices, today)
+    if not legs:
+        return {}
+    greeks = black_scholes(arrays['spot'], arrays['strike'], arrays['years'], volatility, rate, arrays['is_call'])
+    unrealized = arrays['open_premium'] + greeks['price'] * arrays['side'] * arrays['contracts'] * 100
+    return {trade.id: float(value) for trade, value in zip(legs, unrealized)}
@@ -0,0 +1,122 @@
+import hmac
+import os
+import threading
+import time
+from prometheus_client import (CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST,
+                               generate_latest, multiprocess)
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Under gunicorn, PROMETHEUS_MULTIPROC_DIR (set in gunicorn.conf.py) makes every worker
+# write its samples to files there; a scrape of any worker aggregates all of them.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by route',
+    ['method', 'route', 'status'], buckets=LATENCY_BUCKETS
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL statements issued per request',
+    ['method', 'route'], buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled database connection', ['pool'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    'db_pool_checkout_timeouts_total', 'Checkouts that gave up after DB_POOL_TIMEOUT with every connection in use',
+    ['pool']
+)
+# Gauges are per worker; multiprocess_mode says how a scrape combines the live workers
+DB_POOL_IN_USE = Gauge(
+    'db_pool_connections_in_use', 'Pooled database connections checked out, summed over workers', ['pool'],
+    multiprocess_mode='livesum'
+)
+DB_POOL_SATURATION = Gauge(
+    'db_pool_saturation', 'Share of pool_size + max_overflow checked out in the busiest worker (1 = checkouts wait)',
+    ['pool'],
+    multiprocess_mode='livemax'
+)
+FINNHUB_REQUESTS = Counter(
+    'finnhub_requests_total', 'Finnhub API calls by endpoint and outcome (ok, empty, http_error, exception)',
+    ['endpoint', 'outcome']
+)
+FINNHUB_LATENCY = Histogram(
+    'finnhub_request_duration_seconds', 'Finnhub API call latency',
+    ['endpoint'], buckets=LATENCY_BUCKETS
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'In-process cache lookups by cache (quote, logo) and result (hit, miss)',
+    ['cache', 'result']
+)
+EMAILS_SENT = Counter(
+    'emails_sent_total', 'Outgoing email by kind and outcome (sent, failed, not_configured)',
+    ['kind', 'outcome']
+)
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records checkout waits, timeouts and how full the pool is, labelled
+    by the engine's pool_logging_name ('primary' when unset)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._checkout_state = threading.local()
+        self._pool_label = self.logging_name or 'primary'
+
+    def _record_usage(self):
+        in_use = self.checkedout()
+        DB_POOL_IN_USE.labels(self._pool_label).set(in_use)
+        DB_POOL_SATURATION.labels(self._pool_label).set(in_use / max(1, self.size() + max(0, self._max_overflow)))
+
+    def _do_get(self):
+        # QueuePool._do_get retries by calling itself; only the outermost call records
+        if getattr(self._checkout_state, 'active', False):
+            return super()._do_get()
+        self._checkout_state.active = True
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS.labels(self._pool_label).inc()
+            raise
+        finally:
+            self._checkout_state.active = False
+            DB_POOL_CHECKOUT_WAIT.labels(self._pool_label).observe(time.perf_counter() - started)
+        self._record_usage()
+        return record
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._record_usage()
+
+def record_request(method, route, status, seconds, queries):
+    REQUEST_LATENCY.labels(method, route, str(status)).observe(seconds)
+    REQUEST_QUERIES.labels(method, route).observe(queries)
+
+def record_finnhub_call(endpoint, outcome, seconds):
+    FINNHUB_REQUESTS.labels(endpoint, outcome).inc()
+    FINNHUB_LATENCY.labels(endpoint).observe(seconds)
+
+def record_cache_lookup(cache, hit):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+def record_email(kind, outcome):
+    EMAILS_SENT.labels(kind, outcome).inc()
+
+def metrics_authorized(authorization_header, token):
+    """True if the Authorization header is 'Bearer <token>' (constant-time compare)"""
+    if not token or not authorization_header:
+        return False
+    return hmac.compare_digest(authorization_header.encode('utf-8'), f'Bearer {token}'.encode('utf-8'))
+
+def render_metrics():
+    """(body, content_type) in Prometheus text format, aggregated across workers when multiprocess"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,199 @@
+import contextlib
+import hashlib
+import os
+import tempfile
+from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from flask import current_app
+from models import db
+from utils.statement_timeout import statement_timeout
+
+# Key for pg_advisory_lock; any constant unique to this app works
+MIGRATION_LOCK_KEY = 715_204_883
+
+def _is_postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+def _columns(table):
+    inspector = inspect(db.engine)
+    if table not in inspector.get_table_names():
+        return None
+    return set(col['name'] for col in inspector.get_columns(table))
+
+def _add_missing_columns(table, columns):
+    """ALTER TABLE ADD COLUMN for each (name, ddl) the table doesn't have yet"""
+    existing = _columns(table)
+    if existing is None:
+        return
+    with db.engine.connect() as conn:
+        for name, ddl in columns:
+            if name not in existing:
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {ddl}'))
+                print(f"  added {table}.{name}")
+        conn.commit()
+
+def _create_tables():
+    """Create any table that doesn't exist yet, at the current model schema"""
+    # Primary only: a read replica gets the tables through replication
+    db.create_all(bind_key=None)
+
+def _add_trade_columns():
+    """Columns added to trades since the first release"""
+    _add_missing_columns('trades', [
+        ('trade_price', 'NUMERIC(10, 2)'),
+        ('trade_action', 'VARCHAR(30)'),
+        ('open_date', 'DATE'),
+        ('close_date', 'DATE'),
+        ('parent_trade_id', 'INTEGER'),
+        ('assignment_price', 'NUMERIC(10, 2)'),
+        ('assignment_fee', 'NUMERIC(10, 2) DEFAULT 0'),
+        ('import_fingerprint', 'VARCHAR(64)'),
+        ('remaining_open_quantity', 'INTEGER')
+    ])
+
+def _add_trade_indexes():
+    """Indexes for imports, covered-call aggregates, the expiration calendar and chain walks"""
+    with db.engine.connect() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_trades_account_import_fingerprint ON trades (account_id, import_fingerprint)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_trades_stock_position_status ON trades (stock_position_id, status)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_trades_open_expiration ON trades (account_id, status, expiration_date)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_trades_parent_trade_id ON trades (parent_trade_id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_stock_positions_source_trade_id ON stock_positions (source_trade_id)"))
+        conn.commit()
+
+def _add_account_columns():
+    _add_missing_columns('accounts', [('assignment_fee', 'NUMERIC(10, 2) DEFAULT 0')])
+
+def _add_user_columns():
+    """Name, verification and password reset columns on users"""
+    datetime_type = 'TIMESTAMP' if _is_postgres() else 'DATETIME'
+    _add_missing_columns('users', [
+        ('first_name', "VARCHAR(100) NOT NULL DEFAULT ''"),
+        ('last_name', "VARCHAR(100) NOT NULL DEFAULT ''"),
+        ('email_verified', 'BOOLEAN NOT NULL DEFAULT ' + ('FALSE' if _is_postgres() else '0')),
+        # SQLite can't add a UNIQUE column; uniqueness is also enforced by the app
+        ('verification_token', 'VARCHAR(100)' if not _is_postgres() else 'VARCHAR(100) UNIQUE'),
+        ('verification_token_expires', datetime_type),
+        ('updated_at', f'{datetime_type} DEFAULT CURRENT_TIMESTAMP'),
+        ('reset_token', 'VARCHAR(100)'),
+        ('reset_token_expires', datetime_type)
+    ])
+
+def _build_monthly_pnl():
+    """Build the monthly P&L rollup from existing trades"""
+    from models import MonthlyPnl
+    rows = MonthlyPnl.rebuild(db.session)
+    db.session.commit()
+    print(f"  built monthly_pnl rollup ({rows} account-months)")
+
+def _backfill_remaining_open_quantity():
+    """Derive remaining_open_quantity for trades that predate the column"""
+    from utils.open_quantity import check_remaining_open_quantities
+    filled = check_remaining_open_quantities(fix=True)
+    db.session.commit()
+    print(f"  backfilled remaining_open_quantity ({len(filled)} trades)")
+
+def _add_user_last_write():
+    """users.last_write_at, for read-your-writes with a read replica"""
+    _add_missing_columns('users', [('last_write_at', 'TIMESTAMP' if _is_postgres() else 'DATETIME')])
+
+def _settle_open_statuses():
+    """Settle open trades stored with a stale status before it was corrected at commit"""
+    from utils.open_quantity import check_open_statuses
+    settled = check_open_statuses(fix=True)
+    print(f"  settled open trade statuses ({len(settled)} trades)")
+
+# Ordered schema steps: (version, name, step). Append new steps with the next version;
+# never renumber or edit an applied one. Steps 1-7 replay the checks the app used to run
+# on every boot, so they are no-ops on databases that already had them.
+MIGRATIONS = [
+    (1, 'create tables', _create_tables),
+    (2, 'trade columns', _add_trade_columns),
+    (3, 'trade indexes', _add_trade_indexes),
+    (4, 'account columns', _add_account_columns),
+    (5, 'user columns', _add_user_columns),
+    (6, 'monthly P&L rollup', _build_monthly_pnl),
+    (7, 'remaining open quantity backfill', _backfill_remaining_open_quantity),
+    (8, 'user last write', _add_user_last_write),
+    (9, 'open trade status settle', _settle_open_statuses),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version():
+    """Highest applied migration, 0 for a database that has never been migrated (one query)"""
+    try:
+        with db.engine.connect() as conn:
+            return conn.execute(text('SELECT MAX(version) FROM schema_version')).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return 0
+
+@contextlib.contextmanager
+def _migration_lock():
+    """
+    Hold a database-wide lock so only one process migrates: a Postgres advisory lock,
+    or an exclusive file lock for a SQLite file (SQLite has no advisory locks).
+    """
+    if _is_postgres():
+        with db.engine.connect() as conn:
+            # Waiting for another process's migration can outlast the default statement_timeout
+            conn.execute(text('SET LOCAL statement_timeout = 0'))
+            conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': MIGRATION_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': MIGRATION_LOCK_KEY})
+                conn.commit()
+        return
+
+    try:
+        import fcntl
+    except ImportError:  # Windows: single-process development server
+        yield
+        return
+    database = db.engine.url.database or ':memory:'
+    name = hashlib.sha1(os.path.abspath(database).encode('utf-8')).hexdigest()[:16]
+    with open(os.path.join(tempfile.gettempdir(), f'options-tracker-migrate-{name}.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def run_migrations():
+    """
+    Bring the schema up to LATEST_VERSION. Needs an app context.
+
+    Already current: one SELECT and return. Otherwise takes the migration lock,
+    re-reads the version (another worker may have just finished) and applies each
+    pending step in order, recording it in schema_version as it commits.
+    Returns the list of versions applied.
+    """
+    if get_schema_version() >= LATEST_VERSION:
+        return []
+
+    applied = []
+    with _migration_lock():
+        with db.engine.connect() as conn:
+            conn.execute(text(
+                'CREATE TABLE IF NOT EXISTS schema_version ('
+                'version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at TIMESTAMP NOT NULL)'
+            ))
+            conn.commit()
+
+        current = get_schema_version()
+        # Backfills and rebuilds scan whole tables
+        with statement_timeout(current_app.config.get('DB_LONG_STATEMENT_TIMEOUT_MS')):
+            for version, name, step in MIGRATIONS:
+                if version <= current:
+                    continue
+                print(f"Applying migration {version}: {name}...")
+                step()
+                with db.engine.connect() as conn:
+                    conn.execute(text('INSERT INTO schema_version (version, name, applied_at) VALUES (:version, :name, :applied_at)'),
+                                 {'version': version, 'name': name, 'applied_at': datetime.utcnow()})
+                    conn.commit()
+                applied.append(version)
+        if applied:
+            print(f"✓ Database schema at version {LATEST_VERSION}")
+    return applied
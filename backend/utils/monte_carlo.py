@@ -0,0 +1,145 @@
+import hashlib
+import time
+from datetime import date
+from collections import OrderedDict
+import numpy as np
+from utils.mark_to_market import leg_arrays
+from utils.option_pricing import DEFAULT_RISK_FREE_RATE
+from utils.process_pool import get_pool
+
+DEFAULT_PATHS = 20000
+MAX_PATHS = 200000
+# Legs x paths simulated per batch; bounds each batch's arrays to ~16 MB
+BATCH_CELLS = 2000000
+# Below this many legs x paths the pool's startup costs more than it saves
+PARALLEL_MIN_CELLS = 20000000
+PERCENTILES = [5, 25, 50, 75, 95]
+
+# Results per (position set, quote snapshot, inputs), kept for as long as quotes are cached
+RESULT_CACHE_SIZE = 32
+RESULT_CACHE_TTL = 300
+_result_cache = OrderedDict()
+
+def _simulate_batch(args):
+    """
+    Simulate one batch of terminal prices and the P&L at expiration of every leg.
+
+    Legs on the same underlying share a draw per path (they move together); different
+    underlyings are independent. Returns per-leg counts and sums plus the book P&L of
+    each path.
+    """
+    spot, strike, years, sigma, rate, is_call, side, shares, open_premium, symbol_index, n_symbols, paths, seed = args
+    rng = np.random.default_rng(seed)
+    draws = rng.standard_normal((paths, n_symbols))[:, symbol_index]
+
+    t = np.maximum(years, 0.0)
+    terminal = spot * np.exp((rate - 0.5 * sigma * sigma) * t + sigma * np.sqrt(t) * draws)
+    intrinsic = np.where(is_call, np.maximum(terminal - strike, 0.0), np.maximum(strike - terminal, 0.0))
+    pnl = open_premium + side * intrinsic * shares
+
+    return {
+        'profitable': (pnl > 0).sum(axis=0),
+        'in_the_money': (intrinsic > 0).sum(axis=0),
+        'pnl_sum': pnl.sum(axis=0),
+        'book_pnl': pnl.sum(axis=1)
+    }
+
+def simulation_key(trades, prices, volatility, volatility_by_symbol, rate, paths):
+    """Cache key for a position set, quote snapshot and simulation inputs"""
+    positions = sorted(
+        (trade.id, trade.get_remaining_open_quantity(), str(trade.strike_price), str(trade.expiration_date),
+         trade.trade_action, str(trade.premium), trade.contract_quantity)
+        for trade in trades
+    )
+    quotes = sorted((symbol, round(float(price), 4)) for symbol, price in prices.items())
+    inputs = (positions, quotes, volatility, sorted((volatility_by_symbol or {}).items()), rate, paths, date.today())
+    return hashlib.sha256(repr(inputs).encode('utf-8')).hexdigest()
+
+def simulate_positions(trades, prices, volatility, volatility_by_symbol=None, rate=DEFAULT_RISK_FREE_RATE,
+                       paths=DEFAULT_PATHS, seed=None, max_workers=1, today=None):
+    """
+    Monte Carlo the open option legs to expiration under geometric Brownian motion.
+
+    Paths are simulated in batches (vectorized over legs x paths); large books spread
+    the batches over up to max_workers processes. seed makes the run repeatable.
+
+    Returns dict with positions (probability_of_profit, assignment_probability for
+    short legs, expected_pnl), book (probability_of_profit, expected_pnl, pnl
+    percentiles), paths and unpriced_trade_ids.
+    """
+    legs, arrays, unpriced = leg_arrays(trades, prices, today)
+    volatility_by_symbol = volatility_by_symbol or {}
+    symbols = {symbol: i for i, symbol in enumerate(sorted(set(trade.symbol for trade in legs)))}
+    symbol_index = np.array([symbols[trade.symbol] for trade in legs], dtype=int)
+    sigma = np.array([volatility_by_symbol.get(trade.symbol, volatility) for trade in legs], dtype=float)
+
+    paths_per_batch = max(100, BATCH_CELLS // max(len(legs), 1))
+    batch_sizes = [min(paths_per_batch, paths - start) for start in range(0, paths, paths_per_batch)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+    batches = [
+        (arrays['spot'], arrays['strike'], arrays['years'], sigma, rate, arrays['is_call'], arrays['side'],
+         arrays['contracts'] * 100, arrays['open_premium'], symbol_index, len(symbols), size, batch_seed)
+        for size, batch_seed in zip(batch_sizes, seeds)
+    ]
+
+    workers = min(max_workers or 1, len(batches))
+    if workers <= 1 or len(legs) * paths < PARALLEL_MIN_CELLS:
+        results = [_simulate_batch(batch) for batch in batches]
+    else:
+        results = list(get_pool(workers).map(_simulate_batch, batches))
+
+    profitable = sum(result['profitable'] for result in results)
+    in_the_money = sum(result['in_the_money'] for result in results)
+    pnl_sum = sum(result['pnl_sum'] for result in results)
+    book_pnl = np.concatenate([result['book_pnl'] for result in results]) if results else np.zeros(0)
+
+    positions = []
+    for i, trade in enumerate(legs):
+        short = arrays['side'][i] < 0
+        positions.append({
+            'trade_id': trade.id,
+            'symbol': trade.symbol,
+            'trade_type': trade.trade_type,
+            'strike_price': float(arrays['strike'][i]),
+            'expiration_date': trade.expiration_date.isoformat(),
+            'contracts': int(arrays['contracts'][i]),
+            'volatility': float(sigma[i]),
+            'probability_of_profit': round(float(profitable[i]) / paths, 4),
+            'assignment_probability': round(float(in_the_money[i]) / paths, 4) if short else None,
+            'expected_pnl': round(float(pnl_sum[i]) / paths, 2)
+        })
+
+    book = {'probability_of_profit': None, 'expected_pnl': 0.0, 'percentiles': {}}
+    if legs:
+        book = {
+            'probability_of_profit': round(float((book_pnl > 0).mean()), 4),
+            'expected_pnl': round(float(book_pnl.mean()), 2),
+            'percentiles': {f'p{p}': round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(book_pnl, PERCENTILES))}
+        }
+
+    return {
+        'positions': positions,
+        'book': book,
+        'paths': paths,
+        'unpriced_trade_ids': unpriced
+    }
+
+def cached_simulation(trades, prices, volatility, volatility_by_symbol=None, rate=DEFAULT_RISK_FREE_RATE,
+                      paths=DEFAULT_PATHS, max_workers=1):
+    """
+    simulate_positions, cached per (position set, quote snapshot, inputs). The seed is
+    derived from the key so a given snapshot always gives the same answer.
+    """
+    key = simulation_key(trades, prices, volatility, volatility_by_symbol, rate, paths)
+    cached = _result_cache.get(key)
+    if cached and time.time() - cached[0] < RESULT_CACHE_TTL:
+        _result_cache.move_to_end(key)
+        return cached[1]
+
+    result = simulate_positions(trades, prices, volatility, volatility_by_symbol, rate, paths,
+                                seed=int(key[:16], 16), max_workers=max_workers)
+    _result_cache[key] = (time.time(), result)
+    _result_cache.move_to_end(key)
+    while len(_result_cache) > RESULT_CACHE_SIZE:
+        _result_cache.popitem(last=False)
+    return result
@@ -0,0 +1,98 @@
+from sqlalchemy.orm import selectinload
+from models import db, Trade, OPENING_ACTIONS
+
+# Opening trades loaded per round trip when checking the whole table
+CHECK_BATCH_SIZE = 1000
+
+def check_remaining_open_quantities(account_ids=None, fix=False, batch_size=CHECK_BATCH_SIZE):
+    """
+    Compare every opening trade's stored remaining_open_quantity with the count
+    derived from its closing children, in id-ordered batches (children are batch
+    loaded, so it is two queries per batch).
+
+    With fix=True mismatches (including rows never backfilled) are overwritten with
+    the derived value using bulk UPDATEs; the caller commits. The session is
+    expunged between batches, so don't call this with unflushed changes pending.
+
+    Returns a list of mismatch dicts (trade_id, account_id, symbol, stored, derived).
+    """
+    mismatches = []
+    last_id = 0
+    while True:
+        query = Trade.query.options(selectinload(Trade.child_trades)).filter(
+            Trade.trade_action.in_(OPENING_ACTIONS),
+            Trade.id > last_id
+        )
+        if account_ids is not None:
+            query = query.filter(Trade.account_id.in_(account_ids))
+        batch = query.order_by(Trade.id).limit(batch_size).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        updates = []
+        for trade in batch:
+            derived = trade.compute_remaining_open_quantity()
+            if trade.remaining_open_quantity != derived:
+                mismatches.append({
+                    'trade_id': trade.id,
+                    'account_id': trade.account_id,
+                    'symbol': trade.symbol,
+                    'stored': trade.remaining_open_quantity,
+                    'derived': derived
+                })
+                updates.append({'id': trade.id, 'remaining_open_quantity': derived})
+
+        if fix and updates:
+            db.session.execute(db.update(Trade), updates)
+        # Keep memory flat on large tables
+        db.session.expunge_all()
+
+    return mismatches
+
+def check_open_statuses(account_ids=None, fix=False, batch_size=CHECK_BATCH_SIZE):
+    """
+    Compare every open opening trade's stored status with Trade.corrected_status, in
+    id-ordered batches, for rows whose closing children were written before the status
+    was settled at commit.
+
+    With fix=True mismatches are set through the ORM and committed per batch, so the
+    monthly_pnl rollup and equity snapshots follow through the session hooks. Don't
+    call this with unflushed changes pending.
+
+    Returns a list of mismatch dicts (trade_id, account_id, symbol, stored, derived).
+    """
+    mismatches = []
+    last_id = 0
+    while True:
+        query = Trade.query.options(selectinload(Trade.child_trades)).filter(
+            Trade.trade_action.in_(OPENING_ACTIONS),
+            Trade.status == 'Open',
+            Trade.id > last_id
+        )
+        if account_ids is not None:
+            query = query.filter(Trade.account_id.in_(account_ids))
+        batch = query.order_by(Trade.id).limit(batch_size).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        for trade in batch:
+            derived = trade.corrected_status()
+            if trade.status != derived:
+                mismatches.append({
+                    'trade_id': trade.id,
+                    'account_id': trade.account_id,
+                    'symbol': trade.symbol,
+                    'stored': trade.status,
+                    'derived': derived
+                })
+                if fix:
+                    trade.status = derived
+
+        if fix:
+            db.session.commit()
+        # Keep memory flat on large tables
+        db.session.expunge_all()
+
+    return mismatches
@@ -0,0 +1,74 @@
+import numpy as np
+
+# Used when no volatility is given for a symbol (annualized)
+DEFAULT_VOLATILITY = 0.30
+# Annualized, continuously compounded
+DEFAULT_RISK_FREE_RATE = 0.045
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / np.sqrt(2 * np.pi)
+
+def norm_cdf(x):
+    """
+    Standard normal CDF over arrays (Abramowitz & Stegun 26.2.17, |error| < 7.5e-8),
+    so pricing needs NumPy only.
+    """
+    x = np.asarray(x, dtype=float)
+    t = 1.0 / (1.0 + 0.2316419 * np.abs(x))
+    poly = t * (0.319381530 + t * (-0.356563782 + t * (1.781477937 + t * (-1.821255978 + t * 1.330274429))))
+    upper = 1.0 - norm_pdf(x) * poly
+    return np.where(x >= 0, upper, 1.0 - upper)
+
+def black_scholes(spot, strike, years, volatility, rate, is_call):
+    """
+    Black-Scholes value and Greeks for European options, one element per option.
+
+    All arguments are arrays (or scalars) that broadcast together, so a whole book,
+    or a book against a grid of shocked spot prices, is priced in one pass.
+    Expired options (years <= 0) and zero volatility are valued at intrinsic.
+
+    Returns dict of arrays, per share of underlying:
+        price, delta, gamma, vega (per 1 vol point), theta (per calendar day)
+    """
+    spot = np.asarray(spot, dtype=float)
+    strike = np.asarray(strike, dtype=float)
+    years = np.asarray(years, dtype=float)
+    volatility = np.asarray(volatility, dtype=float)
+    rate = np.asarray(rate, dtype=float)
+    is_call = np.asarray(is_call, dtype=bool)
+
+    live = (years > 0) & (volatility > 0) & (spot > 0) & (strike > 0)
+    # Dummy inputs where the formula doesn't apply; those elements are replaced below
+    t = np.where(live, years, 1.0)
+    sigma = np.where(live, volatility, 1.0)
+    s = np.where(live, spot, 1.0)
+    k = np.where(live, strike, 1.0)
+
+    sqrt_t = np.sqrt(t)
+    d1 = (np.log(s / k) + (rate + 0.5 * sigma * sigma) * t) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    discount = np.exp(-rate * t)
+    pdf_d1 = norm_pdf(d1)
+    cdf_d1 = norm_cdf(d1)
+    cdf_d2 = norm_cdf(d2)
+
+    call_price = s * cdf_d1 - k * discount * cdf_d2
+    put_price = call_price - s + k * discount  # Put-call parity
+    price = np.where(is_call, call_price, put_price)
+    delta = np.where(is_call, cdf_d1, cdf_d1 - 1.0)
+    gamma = pdf_d1 / (s * sigma * sqrt_t)
+    vega = s * pdf_d1 * sqrt_t / 100
+    decay = -s * pdf_d1 * sigma / (2 * sqrt_t)
+    theta = np.where(is_call, decay - rate * k * discount * cdf_d2, decay + rate * k * discount * (1.0 - cdf_d2)) / 365
+
+    intrinsic = np.where(is_call, np.maximum(spot - strike, 0.0), np.maximum(strike - spot, 0.0))
+    in_the_money = np.where(is_call, spot > strike, spot < strike)
+    intrinsic_delta = np.where(in_the_money, np.where(is_call, 1.0, -1.0), 0.0)
+
+    return {
+        'price': np.where(live, price, intrinsic),
+        'delta': np.where(live, delta, intrinsic_delta),
+        'gamma': np.where(live, gamma, 0.0),
+        'vega': np.where(live, vega, 0.0),
+        'theta': np.where(live, theta, 0.0)
+    }
@@ -0,0 +1,29 @@
+"""
+Worker processes shared by the CPU-bound paths (statement parsing, Monte Carlo).
+
+Pools start on first use and are reused across requests (spawning costs ~100 ms).
+They are shut down at interpreter exit and from gunicorn's worker_exit hook.
+"""
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# One pool per size, so callers configured with different worker counts don't restart each other's
+_pools = {}
+
+def get_pool(workers):
+    """Return the shared pool of the given size, starting it on first use"""
+    pool = _pools.get(workers)
+    if pool is None:
+        # spawn instead of fork: request threads and open DB connections must not leak into workers
+        pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+    return pool
+
+def shutdown_pools():
+    """Stop every pool's workers; the next get_pool starts a fresh one"""
+    while _pools:
+        _, pool = _pools.popitem()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+atexit.register(shutdown_pools)
@@ -0,0 +1,89 @@
+import contextvars
+import functools
+from datetime import datetime, timedelta
+from flask import current_app, has_request_context
+from flask_jwt_extended import get_current_user, get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+# Flask-SQLAlchemy bind key of the replica engine (SQLALCHEMY_BINDS, set from DATABASE_REPLICA_URL)
+REPLICA_BIND = 'replica'
+
+# True while a @read_from_replica view runs
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to the replica inside @read_from_replica views. Writes,
+    and every statement after the session's first write, go to the primary, so a
+    request never reads back older data than it wrote.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _use_replica.get() and not self._writing(clause):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _writing(self, clause):
+        return (self._flushing or self.info.get('wrote') or isinstance(clause, UpdateBase)
+                or bool(self.new) or bool(self.deleted) or self.identity_map.check_modified())
+
+def _request_user_id():
+    if not has_request_context():
+        return None
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:  # Not a @jwt_required route
+        return None
+    return int(identity) if identity else None
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_write(session, flush_context):
+    session.info['wrote'] = True
+    session.info['stamp_due'] = True
+
+@event.listens_for(RoutingSession, 'before_commit')
+def _stamp_user_write(session):
+    """Record when the request's user last wrote, so their reads stay on the primary for a while"""
+    if REPLICA_BIND not in session._db.engines:
+        return
+    if not (session.info.get('stamp_due') or session.new or session.dirty or session.deleted):
+        return
+    user_id = _request_user_id()
+    if user_id is None:
+        return
+    from models import User
+    table = User.__table__
+    session.execute(table.update().where(table.c.id == user_id).values(last_write_at=datetime.utcnow()))
+
+@event.listens_for(RoutingSession, 'after_commit')
+@event.listens_for(RoutingSession, 'after_rollback')
+def _clear_stamp(session):
+    session.info.pop('stamp_due', None)
+
+def _recently_wrote(user):
+    if user is None or user.last_write_at is None:
+        return False
+    window = timedelta(seconds=current_app.config['DB_READ_YOUR_WRITES_SECONDS'])
+    return datetime.utcnow() - user.last_write_at < window
+
+def read_from_replica(view):
+    """
+    Route decorator for read-only views: run their queries on the replica when one is
+    configured, unless the user wrote within DB_READ_YOUR_WRITES_SECONDS. Put it below
+    @jwt_required() so the user (and their last write) is loaded from the primary first.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        engines = current_app.extensions['sqlalchemy'].engines
+        if REPLICA_BIND not in engines or _recently_wrote(get_current_user()):
+            return view(*args, **kwargs)
+        token = _use_replica.set(True)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapper
@@ -0,0 +1,112 @@
+import threading
+import time
+from flask import g, request, has_request_context, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from utils.metrics import record_request
+
+# Statements kept per slow-query log line
+SLOW_QUERY_STATEMENT_CHARS = 500
+
+# In-process aggregate per route ("GET /api/dashboard/pnl"), since process start
+_route_stats = {}
+_route_stats_lock = threading.Lock()
+_sql_hooks_installed = False
+
+def _route_key():
+    rule = request.url_rule.rule if request.url_rule else '<unmatched>'
+    return f'{request.method} {rule}'
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_start_time'].pop()
+    # Queries outside a request (startup migrations, scripts, worker threads) aren't attributed
+    if not has_request_context() or 'request_metrics' not in g:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    metrics = g.request_metrics
+    metrics['queries'] += 1
+    metrics['sql_ms'] += elapsed_ms
+
+    threshold = current_app.config.get('SLOW_QUERY_MS')
+    if threshold is not None and elapsed_ms >= threshold:
+        current_app.logger.warning(
+            f'Slow query ({elapsed_ms:.1f} ms) on {_route_key()}: {" ".join(statement.split())[:SLOW_QUERY_STATEMENT_CHARS]}'
+        )
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_start_time'):
+        connection.info['query_start_time'].pop()
+
+def _start_request():
+    g.request_metrics = {'started': time.perf_counter(), 'queries': 0, 'sql_ms': 0.0}
+
+def _finish_request(response):
+    metrics = g.pop('request_metrics', None)
+    if metrics is None:
+        return response
+    total_ms = (time.perf_counter() - metrics['started']) * 1000
+
+    response.headers.add(
+        'Server-Timing',
+        f'app;dur={total_ms:.1f}, db;dur={metrics["sql_ms"]:.1f};desc="{metrics["queries"]} queries"'
+    )
+
+    key = _route_key()
+    method, route = key.split(' ', 1)
+    record_request(method, route, response.status_code, total_ms / 1000, metrics['queries'])
+    with _route_stats_lock:
+        stats = _route_stats.setdefault(key, {'requests': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                              'queries': 0, 'max_queries': 0, 'sql_ms': 0.0})
+        stats['requests'] += 1
+        stats['errors'] += response.status_code >= 500
+        stats['total_ms'] += total_ms
+        stats['max_ms'] = max(stats['max_ms'], total_ms)
+        stats['queries'] += metrics['queries']
+        stats['max_queries'] = max(stats['max_queries'], metrics['queries'])
+        stats['sql_ms'] += metrics['sql_ms']
+    return response
+
+def init_request_metrics(app):
+    """
+    Time every request and count the SQL it issues.
+
+    Each response carries a Server-Timing header (total and SQL time, query count);
+    statements slower than SLOW_QUERY_MS are logged with their route; per-route totals
+    accumulate in-process (see get_route_stats).
+    """
+    global _sql_hooks_installed
+    if not _sql_hooks_installed:
+        # On the Engine class so engines Flask-SQLAlchemy creates lazily are covered too
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+        _sql_hooks_installed = True
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+def get_route_stats():
+    """Per-route request count, errors, latency (avg/max ms), queries (avg/max) and SQL time"""
+    with _route_stats_lock:
+        snapshot = {key: dict(stats) for key, stats in _route_stats.items()}
+    return {
+        key: {
+            'requests': stats['requests'],
+            'errors': stats['errors'],
+            'avg_ms': round(stats['total_ms'] / stats['requests'], 2),
+            'max_ms': round(stats['max_ms'], 2),
+            'avg_queries': round(stats['queries'] / stats['requests'], 2),
+            'max_queries': stats['max_queries'],
+            'avg_sql_ms': round(stats['sql_ms'] / stats['requests'], 2)
+        }
+        for key, stats in sorted(snapshot.items())
+    }
+
+def reset_route_stats():
+    """Clear the in-process aggregate"""
+    with _route_stats_lock:
+        _route_stats.clear()
@@ -0,0 +1,44 @@
+from sqlalchemy import event
+from utils.metrics import InstrumentedQueuePool
+
+# Set on every new SQLite connection (see install_sqlite_pragmas)
+SQLITE_PRAGMAS = {
+    # Write-ahead log: readers don't block the writer or each other (one writer at a time)
+    'journal_mode': 'WAL',
+    # fsync at checkpoints instead of every commit; in WAL mode the file can't corrupt,
+    # a power cut can only lose the last few commits
+    'synchronous': 'NORMAL',
+    # Wait up to 5 s for the write lock instead of failing with "database is locked"
+    'busy_timeout': 5000,
+    # Read pages through a 256 MB memory map instead of read() calls
+    'mmap_size': 256 * 1024 * 1024,
+    # Page cache per connection; negative is KiB (16 MB)
+    'cache_size': -16000,
+    # Enforce REFERENCES like PostgreSQL does (off by default in SQLite)
+    'foreign_keys': 'ON'
+}
+
+def sqlite_engine_options(pool_size):
+    """
+    Engine options for a SQLite file: a small pool of connections shared by the
+    worker's threads. check_same_thread=False lets a connection be returned by one
+    thread and checked out by another; the pool never hands it to two at once.
+    """
+    return {
+        'poolclass': InstrumentedQueuePool,  # Exports checkout waits and saturation like PostgreSQL's
+        'pool_size': pool_size,
+        'max_overflow': 2 * pool_size,  # Burst connections are closed when returned
+        'connect_args': {'check_same_thread': False}
+    }
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Run PRAGMA name=value for each of `pragmas` whenever the engine opens a connection"""
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
@@ -0,0 +1,57 @@
+import contextlib
+import contextvars
+import functools
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from models import db
+
+# Statement timeout (ms) for transactions begun in the current context; None keeps the
+# engine default (DB_STATEMENT_TIMEOUT_MS, set per connection in app._engine_options)
+_timeout_ms = contextvars.ContextVar('statement_timeout_ms', default=None)
+
+def _set_local_sql(timeout_ms):
+    return f'SET LOCAL statement_timeout = {int(timeout_ms)}'
+
+def _on_begin(conn):
+    timeout_ms = _timeout_ms.get()
+    if timeout_ms is None or conn.dialect.name != 'postgresql':
+        return
+    # Raw cursor: psycopg2 opens the transaction with this statement, and SET LOCAL
+    # lasts until it ends, so the pooled connection goes back with the default
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(_set_local_sql(timeout_ms))
+    finally:
+        cursor.close()
+
+# On the Engine class so it covers ORM sessions and engine.connect() alike
+event.listen(Engine, 'begin', _on_begin)
+
+@contextlib.contextmanager
+def statement_timeout(timeout_ms):
+    """
+    Give PostgreSQL statements in the block `timeout_ms` instead of the engine-wide
+    statement_timeout, without touching the engine: each transaction begun in the
+    block starts with SET LOCAL, as does db.session's transaction if one is already
+    open. No-op on SQLite.
+    """
+    token = _timeout_ms.set(timeout_ms)
+    try:
+        session = db.session() if has_app_context() else None
+        if session is not None and session.in_transaction() and session.get_bind().dialect.name == 'postgresql':
+            session.connection().exec_driver_sql(_set_local_sql(timeout_ms))
+        yield
+    finally:
+        _timeout_ms.reset(token)
+
+def long_statement_timeout(view):
+    """
+    Route decorator for imports and exports: run under DB_LONG_STATEMENT_TIMEOUT_MS.
+    Put it above @jwt_required() so the user lookup's transaction begins with it.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with statement_timeout(current_app.config['DB_LONG_STATEMENT_TIMEOUT_MS']):
+            return view(*args, **kwargs)
+    return wrapper
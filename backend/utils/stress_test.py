@@ -0,0 +1,103 @@
+import numpy as np
+from utils.mark_to_market import leg_arrays
+from utils.option_pricing import black_scholes, DEFAULT_VOLATILITY, DEFAULT_RISK_FREE_RATE
+
+# Default grid of underlying moves, in percent
+DEFAULT_SHOCKS = [-20, -15, -10, -5, 0, 5, 10]
+# Upper bound on scenarios per request (the grid is scenarios x legs)
+MAX_SCENARIOS = 101
+
+def _shock_grid(symbols, shocks, symbol_shocks):
+    """(scenarios x symbols) matrix of fractional moves: the global shock, or a symbol's override"""
+    grid = np.repeat(np.asarray(shocks, dtype=float)[:, None] / 100, len(symbols), axis=1)
+    for column, symbol in enumerate(symbols):
+        if symbol in symbol_shocks:
+            grid[:, column] = np.asarray(symbol_shocks[symbol], dtype=float) / 100
+    return grid
+
+def run_stress_test(trades, stock_positions, prices, shocks, symbol_shocks=None,
+                    volatility=DEFAULT_VOLATILITY, rate=DEFAULT_RISK_FREE_RATE, today=None):
+    """
+    Re-price every open option leg under each underlying shock in one broadcast pass.
+
+    shocks is the scenario axis (percent moves applied to every symbol); symbol_shocks
+    optionally maps a symbol to its own list of moves, one per scenario. Options are
+    re-priced at the shocked spot with the same volatility and time to expiration.
+    A short put (call) counts as assigned in a scenario if the shocked spot is below
+    (above) its strike. Open stock lots move with their symbol's shock.
+
+    Returns (scenarios, unpriced_trade_ids); each scenario has option, stock and total
+    P&L versus today, assignment shares and cash, called-away shares and proceeds,
+    and the same per symbol.
+    """
+    symbol_shocks = symbol_shocks or {}
+    legs, arrays, unpriced = leg_arrays(trades, prices, today)
+    lots = [lot for lot in stock_positions if prices.get(lot.symbol) and lot.shares]
+    symbols = sorted(set(trade.symbol for trade in legs) | set(lot.symbol for lot in lots))
+    column = {symbol: i for i, symbol in enumerate(symbols)}
+    grid = _shock_grid(symbols, shocks, symbol_shocks)
+
+    # Options: legs along axis 1, scenarios along axis 0
+    leg_symbol = np.array([column[trade.symbol] for trade in legs], dtype=int)
+    shocked_spot = arrays['spot'] * (1 + grid[:, leg_symbol])
+    now = black_scholes(arrays['spot'], arrays['strike'], arrays['years'], volatility, rate, arrays['is_call'])['price']
+    shocked = black_scholes(shocked_spot, arrays['strike'], arrays['years'], volatility, rate, arrays['is_call'])['price']
+    shares = arrays['contracts'] * 100
+    option_pnl = (shocked - now) * arrays['side'] * shares
+
+    short = arrays['side'] < 0
+    assigned = short & ~arrays['is_call'] & (shocked_spot < arrays['strike'])
+    called_away = short & arrays['is_call'] & (shocked_spot > arrays['strike'])
+    assigned_shares = assigned * shares
+    assignment_cash = assigned_shares * arrays['strike']
+    called_shares = called_away * shares
+    called_proceeds = called_shares * arrays['strike']
+
+    # Stock lots
+    lot_symbol = np.array([column[lot.symbol] for lot in lots], dtype=int)
+    lot_value = np.array([float(prices[lot.symbol]) * lot.shares for lot in lots], dtype=float)
+    stock_pnl = grid[:, lot_symbol] * lot_value
+
+    # Per-symbol totals: (scenarios x legs) @ (legs x symbols) one-hot
+    leg_onehot = np.zeros((len(legs), len(symbols)))
+    leg_onehot[np.arange(len(legs)), leg_symbol] = 1
+    lot_onehot = np.zeros((len(lots), len(symbols)))
+    lot_onehot[np.arange(len(lots)), lot_symbol] = 1
+    per_symbol = {
+        'option_pnl': option_pnl @ leg_onehot,
+        'stock_pnl': stock_pnl @ lot_onehot,
+        'assigned_shares': assigned_shares @ leg_onehot,
+        'assignment_cash_required': assignment_cash @ leg_onehot,
+        'called_away_shares': called_shares @ leg_onehot,
+        'called_away_proceeds': called_proceeds @ leg_onehot
+    }
+
+    scenarios = []
+    for i, shock in enumerate(shocks):
+        by_symbol = []
+        for j, symbol in enumerate(symbols):
+            by_symbol.append({
+                'symbol': symbol,
+                'shock_pct': round(float(grid[i, j] * 100), 2),
+                'underlying_price': round(float(prices[symbol]) * (1 + float(grid[i, j])), 2),
+                'option_pnl': round(float(per_symbol['option_pnl'][i, j]), 2),
+                'stock_pnl': round(float(per_symbol['stock_pnl'][i, j]), 2),
+                'assigned_shares': int(per_symbol['assigned_shares'][i, j]),
+                'assignment_cash_required': round(float(per_symbol['assignment_cash_required'][i, j]), 2),
+                'called_away_shares': int(per_symbol['called_away_shares'][i, j]),
+                'called_away_proceeds': round(float(per_symbol['called_away_proceeds'][i, j]), 2)
+            })
+        scenario_option_pnl = float(option_pnl[i].sum())
+        scenario_stock_pnl = float(stock_pnl[i].sum())
+        scenarios.append({
+            'shock_pct': float(shock),
+            'option_pnl': round(scenario_option_pnl, 2),
+            'stock_pnl': round(scenario_stock_pnl, 2),
+            'total_pnl': round(scenario_option_pnl + scenario_stock_pnl, 2),
+            'assigned_shares': int(assigned_shares[i].sum()),
+            'assignment_cash_required': round(float(assignment_cash[i].sum()), 2),
+            'called_away_shares': int(called_shares[i].sum()),
+            'called_away_proceeds': round(float(called_proceeds[i].sum()), 2),
+            'by_symbol': by_symbol
+        })
+    return scenarios, unpriced
@@ -0,0 +1,231 @@
+import random
+from datetime import date, timedelta
+from sqlalchemy import bindparam, func
+from models import db, User, Account, Deposit, Trade, StockPosition, MonthlyPnl
+
+# Underlyings and a rough share price for each (strikes and premiums scale from it)
+SYMBOL_PRICES = {
+    'AAPL': 190.0, 'MSFT': 410.0, 'AMD': 160.0, 'TSLA': 240.0, 'NVDA': 120.0,
+    'SOFI': 9.0, 'PLTR': 25.0, 'F': 12.0, 'INTC': 30.0, 'KO': 62.0
+}
+
+# Relative frequency of each chain shape
+CHAIN_WEIGHTS = {
+    'single_close': 20,     # CSP/CC bought back in full (close fields on the opener)
+    'expired': 15,          # CSP expired worthless (single-entry)
+    'partial_close': 15,    # Multi-contract CSP with a partial Buy to Close child
+    'wheel': 25,            # CSP assigned -> stock lot -> covered calls -> called away
+    'leaps_exercise': 5,    # LEAPS bought, then exercised into a stock lot
+    'open': 20              # Still-open CSP or LEAPS expiring in the future
+}
+
+INSERT_BATCH = 10000
+
+class _Builder:
+    """Accumulates trade and stock position rows with explicit ids so links can be set up front"""
+
+    def __init__(self, rng, today, first_trade_id, first_position_id):
+        self.rng = rng
+        self.today = today
+        self.trades = []
+        self.positions = []
+        self.position_links = []  # (trade_id, stock_position_id), applied after both tables are inserted
+        self.next_trade_id = first_trade_id
+        self.next_position_id = first_position_id
+
+    def trade(self, account_id, symbol, trade_type, trade_action, strike, quantity, trade_price, trade_date,
+              expiration_date, **kwargs):
+        trade_id = self.next_trade_id
+        self.next_trade_id += 1
+        fees = 0.65
+        base = trade_price * quantity * 100
+        premium = base - fees * quantity if trade_action in ('Sold to Open', 'Sold to Close') else -(base + fees * quantity)
+        row = {
+            'id': trade_id, 'account_id': account_id, 'symbol': symbol, 'trade_type': trade_type,
+            'position_type': 'Open', 'strike_price': round(strike, 2), 'expiration_date': expiration_date,
+            'contract_quantity': quantity, 'trade_price': round(trade_price, 2), 'trade_action': trade_action,
+            'premium': round(premium, 2), 'fees': fees, 'assignment_price': None, 'trade_date': trade_date,
+            'open_date': None, 'close_date': None, 'close_price': None, 'close_fees': None, 'close_premium': None,
+            'close_method': None, 'assignment_fee': 0, 'status': 'Open', 'parent_trade_id': None,
+            'stock_position_id': None, 'shares_used': None, 'import_fingerprint': None,
+            'remaining_open_quantity': quantity if trade_action in ('Sold to Open', 'Bought to Open') else None,
+            'notes': None
+        }
+        stock_position_id = kwargs.pop('stock_position_id', None)
+        row.update(kwargs)
+        if stock_position_id:
+            self.position_links.append((trade_id, stock_position_id))
+        self.trades.append(row)
+        return row
+
+    def position(self, account_id, symbol, shares, cost_basis, acquired_date, status, source_trade_id):
+        position_id = self.next_position_id
+        self.next_position_id += 1
+        self.positions.append({
+            'id': position_id, 'account_id': account_id, 'symbol': symbol, 'shares': shares,
+            'cost_basis_per_share': round(cost_basis, 2), 'acquired_date': acquired_date, 'status': status,
+            'source_trade_id': source_trade_id, 'notes': None
+        })
+        return position_id
+
+    def chain(self, shape, account_id):
+        """Append one chain of the given shape; returns how many trades it added"""
+        rng = self.rng
+        before = len(self.trades)
+        symbol = rng.choice(list(SYMBOL_PRICES))
+        spot = SYMBOL_PRICES[symbol] * rng.uniform(0.8, 1.2)
+        # Wheels span up to ~195 days (CSP + up to five 30-day calls), so they start early enough to be finished
+        opened = self.today - timedelta(days=rng.randint(200 if shape == 'wheel' else 45, 730))
+        expiration = opened + timedelta(days=rng.choice((7, 14, 30, 45)))
+        put_strike = spot * rng.uniform(0.85, 0.97)
+        credit = max(0.05, spot * rng.uniform(0.005, 0.02))
+
+        if shape == 'single_close':
+            trade_type = rng.choice(('CSP', 'CSP', 'Covered Call'))
+            strike = put_strike if trade_type == 'CSP' else spot * 1.05
+            closed = opened + timedelta(days=rng.randint(1, (expiration - opened).days))
+            close_price = round(credit * rng.uniform(0.1, 0.6), 2)
+            self.trade(account_id, symbol, trade_type, 'Sold to Open', strike, 1, credit, opened, expiration,
+                       status='Closed', open_date=opened, close_date=closed, close_price=close_price,
+                       close_fees=0.65, close_premium=-round(close_price * 100 + 0.65, 2),
+                       close_method='buy_to_close', remaining_open_quantity=0)
+
+        elif shape == 'expired':
+            self.trade(account_id, symbol, 'CSP', 'Sold to Open', put_strike, 1, credit, opened, expiration,
+                       status='Expired', open_date=opened, close_date=expiration, close_premium=0,
+                       close_method='expired', remaining_open_quantity=0)
+
+        elif shape == 'partial_close':
+            quantity = rng.randint(2, 5)
+            closed_quantity = rng.randint(1, quantity - 1)
+            closed = opened + timedelta(days=rng.randint(1, (expiration - opened).days))
+            parent = self.trade(account_id, symbol, 'CSP', 'Sold to Open', put_strike, quantity, credit, opened,
+                                expiration, open_date=opened, remaining_open_quantity=0)
+            self.trade(account_id, symbol, 'CSP', 'Bought to Close', put_strike, closed_quantity,
+                       credit * rng.uniform(0.1, 0.6), closed, expiration, position_type='Close',
+                       open_date=opened, close_date=closed, status='Closed', parent_trade_id=parent['id'])
+            # The rest expire worthless (two-entry: an Expired child for the remaining contracts)
+            self.trade(account_id, symbol, 'CSP', 'Expired', put_strike, quantity - closed_quantity, 0, expiration,
+                       expiration, position_type='Close', premium=0, fees=0, open_date=opened,
+                       close_date=expiration, status='Expired', parent_trade_id=parent['id'])
+            parent['status'] = 'Expired'
+
+        elif shape == 'wheel':
+            strike = round(put_strike)
+            csp = self.trade(account_id, symbol, 'CSP', 'Sold to Open', strike, 1, credit, opened, expiration,
+                             status='Assigned', open_date=opened, close_date=expiration, assignment_price=strike,
+                             close_method='assigned', remaining_open_quantity=0)
+            assignment = self.trade(account_id, symbol, 'Assignment', None, strike, 1, 0, expiration, expiration,
+                                    position_type='Assignment', premium=0, fees=0, assignment_price=strike,
+                                    open_date=opened, status='Assigned', parent_trade_id=csp['id'],
+                                    remaining_open_quantity=None)
+            called_away = rng.random() < 0.7
+            position_id = self.position(account_id, symbol, 0 if called_away else 100, strike, expiration,
+                                        'Called Away' if called_away else 'Open', assignment['id'])
+            day = expiration
+            for _ in range(rng.randint(1, 4)):
+                call_expiration = day + timedelta(days=30)
+                call_strike = strike * rng.uniform(1.0, 1.08)
+                self.trade(account_id, symbol, 'Covered Call', 'Sold to Open', call_strike, 1, credit * 0.6, day,
+                           call_expiration, status='Expired', open_date=day, close_date=call_expiration,
+                           close_premium=0, close_method='expired', stock_position_id=position_id,
+                           shares_used=100, remaining_open_quantity=0)
+                day = call_expiration
+            if called_away:
+                call_strike = strike * rng.uniform(1.0, 1.08)
+                call_expiration = day + timedelta(days=30)
+                self.trade(account_id, symbol, 'Covered Call', 'Sold to Open', call_strike, 1, credit * 0.6, day,
+                           call_expiration, status='Called Away', open_date=day, close_date=call_expiration,
+                           close_premium=0, close_fees=0, close_method='called_away', assignment_price=call_strike,
+                           stock_position_id=position_id, shares_used=100, remaining_open_quantity=0)
+
+        elif shape == 'leaps_exercise':
+            strike = round(spot * 0.8)
+            leaps_expiration = opened + timedelta(days=rng.randint(365, 720))
+            exercised = min(leaps_expiration, self.today - timedelta(days=1))
+            leaps = self.trade(account_id, symbol, 'LEAPS', 'Bought to Open', strike, 1, spot * 0.25, opened,
+                               leaps_expiration, status='Closed', open_date=opened, close_date=exercised,
+                               close_price=strike, close_fees=0, close_premium=0, close_method='exercise',
+                               remaining_open_quantity=0)
+            self.position(account_id, symbol, 100, strike, exercised, 'Open', leaps['id'])
+
+        else:  # open
+            future = self.today + timedelta(days=rng.choice((3, 10, 24, 38, 52)))
+            if rng.random() < 0.85:
+                quantity = rng.randint(1, 3)
+                self.trade(account_id, symbol, 'CSP', 'Sold to Open', put_strike, quantity, credit,
+                           self.today - timedelta(days=rng.randint(1, 20)), future)
+            else:
+                self.trade(account_id, symbol, 'LEAPS', 'Bought to Open', round(spot * 0.8), 1, spot * 0.25,
+                           self.today - timedelta(days=rng.randint(30, 300)), self.today + timedelta(days=rng.randint(200, 600)))
+
+        return len(self.trades) - before
+
+def generate_wheel_data(users=1, accounts_per_user=1, trades_per_account=100, seed=0, today=None,
+                        email_prefix='synthetic', password_hash='x'):
+    """
+    Bulk insert synthetic users, accounts and realistic wheel-trading chains.
+
+    Each account gets chains (see CHAIN_WEIGHTS) until it has at least
+    trades_per_account trades: single-entry closes, two-entry partial closes,
+    assignments with stock positions and covered calls (some called away), LEAPS
+    exercises and still-open positions. Rows are written with Core bulk inserts;
+    remaining_open_quantity is set directly and the monthly P&L rollup is rebuilt
+    for the new accounts. The same seed always gives the same data.
+
+    Returns dict with user_ids, account_ids (per user), trades and stock_positions.
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    shapes = list(CHAIN_WEIGHTS)
+    weights = [CHAIN_WEIGHTS[shape] for shape in shapes]
+
+    user_ids = []
+    account_ids = {}
+    for u in range(users):
+        user = User(email=f'{email_prefix}-{seed}-{u}@example.com', first_name='Synthetic', last_name=f'User {u + 1}',
+                    password_hash=password_hash, email_verified=True)
+        db.session.add(user)
+        db.session.flush()
+        user_ids.append(user.id)
+        account_ids[user.id] = []
+        for a in range(accounts_per_user):
+            account = Account(user_id=user.id, name=f'Account {a + 1}', account_type=rng.choice(('IRA', 'Taxable', 'Margin')),
+                              initial_balance=rng.choice((25000, 50000, 100000)), default_fee=0.65)
+            db.session.add(account)
+            db.session.flush()
+            account_ids[user.id].append(account.id)
+            db.session.add(Deposit(account_id=account.id, amount=rng.choice((5000, 10000)),
+                                   deposit_date=today - timedelta(days=rng.randint(30, 700))))
+
+    builder = _Builder(
+        rng, today,
+        (db.session.query(func.max(Trade.id)).scalar() or 0) + 1,
+        (db.session.query(func.max(StockPosition.id)).scalar() or 0) + 1
+    )
+    all_account_ids = [account_id for ids in account_ids.values() for account_id in ids]
+    for account_id in all_account_ids:
+        count = 0
+        while count < trades_per_account:
+            count += builder.chain(rng.choices(shapes, weights)[0], account_id)
+
+    # Trades first (covered-call links deferred), then lots, then the links: the two
+    # tables reference each other, so this order satisfies foreign keys on Postgres
+    for i in range(0, len(builder.trades), INSERT_BATCH):
+        db.session.execute(Trade.__table__.insert(), builder.trades[i:i + INSERT_BATCH])
+    for i in range(0, len(builder.positions), INSERT_BATCH):
+        db.session.execute(StockPosition.__table__.insert(), builder.positions[i:i + INSERT_BATCH])
+    table = Trade.__table__
+    link = table.update().where(table.c.id == bindparam('trade_id')).values(stock_position_id=bindparam('position_id'))
+    links = [{'trade_id': trade_id, 'position_id': position_id} for trade_id, position_id in builder.position_links]
+    for i in range(0, len(links), INSERT_BATCH):
+        db.session.execute(link, links[i:i + INSERT_BATCH])
+
+    MonthlyPnl.rebuild(db.session, all_account_ids)
+    db.session.commit()
+    return {
+        'user_ids': user_ids,
+        'account_ids': account_ids,
+        'trades': len(builder.trades),
+        'stock_positions': len(builder.positions)
+    }
@@ -0,0 +1,143 @@
+from sqlalchemy import text
+from sqlalchemy.orm import selectinload
+from models import db, Trade, StockPosition
+
+# Connected component of a trade over every link that ties a wheel together:
+#   trade -> parent trade            (closing legs, rolls, assignments)
+#   trade -> stock position          (covered calls written on a lot)
+#   stock position -> source trade   (assignment / exercise that created the lot)
+# Nodes are (kind, id) pairs, 'T' for trades and 'P' for stock positions. Each node is
+# expanded by six steps, one per link direction, and each step joins the one column it
+# follows, so every lookup is a primary key or index probe (ix_trades_parent_trade_id,
+# ix_trades_stock_position_status, ix_stock_positions_source_trade_id) and the query
+# touches only the chain's own rows. The recursive CTE may be referenced only once in
+# the recursive term (SQLite and Postgres), hence the steps table rather than six
+# UNIONed selects; only the step's own join matches, so COALESCE picks the next node.
+# UNION (not UNION ALL) drops nodes already visited, so the walk ends even on cycles.
+CHAIN_COMPONENT_SQL = text("""
+    WITH RECURSIVE steps(step) AS (
+        VALUES (1), (2), (3), (4), (5), (6)
+    ),
+    component(kind, id) AS (
+        SELECT 'T', :trade_id
+        UNION
+        SELECT CASE WHEN steps.step IN (3, 4) THEN 'P' ELSE 'T' END,
+               COALESCE(parent.parent_trade_id, child.id, own.stock_position_id,
+                        created_lot.id, written.id, lot.source_trade_id)
+        FROM component
+        CROSS JOIN steps
+        -- 1: trade -> its parent trade
+        LEFT JOIN trades AS parent
+            ON steps.step = 1 AND component.kind = 'T' AND parent.id = component.id
+        -- 2: trade -> trades whose parent it is
+        LEFT JOIN trades AS child
+            ON steps.step = 2 AND component.kind = 'T' AND child.parent_trade_id = component.id
+        -- 3: trade -> the lot it was written on
+        LEFT JOIN trades AS own
+            ON steps.step = 3 AND component.kind = 'T' AND own.id = component.id
+        -- 4: trade -> lots it created
+        LEFT JOIN stock_positions AS created_lot
+            ON steps.step = 4 AND component.kind = 'T' AND created_lot.source_trade_id = component.id
+        -- 5: lot -> trades written on it
+        LEFT JOIN trades AS written
+            ON steps.step = 5 AND component.kind = 'P' AND written.stock_position_id = component.id
+        -- 6: lot -> the trade that created it
+        LEFT JOIN stock_positions AS lot
+            ON steps.step = 6 AND component.kind = 'P' AND lot.id = component.id
+        WHERE COALESCE(parent.parent_trade_id, child.id, own.stock_position_id,
+                       created_lot.id, written.id, lot.source_trade_id) IS NOT NULL
+    )
+    SELECT kind, id FROM component
+""")
+
+def find_chain_ids(trade_id):
+    """
+    Return (trade_ids, stock_position_ids) of everything connected to trade_id,
+    found with a single recursive query.
+    """
+    trade_ids = set()
+    position_ids = set()
+    for kind, node_id in db.session.execute(CHAIN_COMPONENT_SQL, {'trade_id': trade_id}):
+        if kind == 'T':
+            trade_ids.add(node_id)
+        else:
+            position_ids.add(node_id)
+    return trade_ids, position_ids
+
+def _trade_node(trade):
+    node = trade.to_dict()
+    node['node_type'] = 'trade'
+    node['children'] = []
+    return node
+
+def _position_node(position):
+    node = position.to_dict()
+    node['node_type'] = 'stock_position'
+    node['children'] = []
+    return node
+
+def build_chain_tree(trade_id):
+    """
+    Load a trade's whole chain and arrange it as a tree.
+
+    A trade hangs under its parent trade, or else under the stock position it was
+    written on; a stock position hangs under the trade that created it. Nodes with
+    none of those links in the chain are roots (normally exactly one). Children are
+    ordered by date.
+
+    Returns dict with roots, trade_count and stock_position_count.
+    """
+    trade_ids, position_ids = find_chain_ids(trade_id)
+
+    # Two queries for the nodes; child_trades is batch loaded for to_dict()
+    trades = Trade.query.options(selectinload(Trade.child_trades)).filter(Trade.id.in_(trade_ids)).all() if trade_ids else []
+    positions = StockPosition.query.filter(StockPosition.id.in_(position_ids)).all() if position_ids else []
+
+    nodes = {('T', trade.id): _trade_node(trade) for trade in trades}
+    nodes.update({('P', position.id): _position_node(position) for position in positions})
+
+    # Pick one parent per node (parent trade first, then the lot it was written on)
+    parent_of = {}
+    dated = []
+    for trade in trades:
+        key = ('T', trade.id)
+        dated.append((trade.trade_date, key))
+        if ('T', trade.parent_trade_id) in nodes:
+            parent_of[key] = ('T', trade.parent_trade_id)
+        elif ('P', trade.stock_position_id) in nodes:
+            parent_of[key] = ('P', trade.stock_position_id)
+    for position in positions:
+        key = ('P', position.id)
+        dated.append((position.acquired_date, key))
+        if ('T', position.source_trade_id) in nodes:
+            parent_of[key] = ('T', position.source_trade_id)
+    order = [key for _, key in sorted(dated)]
+
+    # Bad data can link nodes in a loop; cut each loop at its earliest node so the
+    # result stays a tree
+    settled = set()
+    for key in order:
+        path = []
+        current = key
+        while current in parent_of and current not in settled:
+            if current in path:
+                loop = path[path.index(current):]
+                del parent_of[min(loop, key=order.index)]
+                break
+            path.append(current)
+            current = parent_of[current]
+        settled.update(path)
+
+    roots = []
+    for key in order:
+        if key in parent_of:
+            nodes[parent_of[key]]['children'].append(nodes[key])
+        else:
+            roots.append(nodes[key])
+
+    return {
+        'trade_id': trade_id,
+        'trade_count': len(trades),
+        'stock_position_count': len(positions),
+        'roots': roots
+    }
@@ -0,0 +1,159 @@
+from collections import defaultdict
+from datetime import date
+from models import Trade, StockPosition
+
+# Trade types that make a connected group of trades a wheel cycle
+WHEEL_TRADE_TYPES = ['CSP', 'Covered Call', 'Assignment']
+
+def _find(parents, node):
+    """Union-find root lookup with path halving"""
+    while parents[node] != node:
+        parents[node] = parents[parents[node]]
+        node = parents[node]
+    return node
+
+def _union(parents, a, b):
+    root_a = _find(parents, a)
+    root_b = _find(parents, b)
+    if root_a != root_b:
+        parents[root_b] = root_a
+
+def group_wheel_components(trades, positions):
+    """
+    Split trades and stock positions into connected groups over the same links as
+    the trade chain (parent_trade_id, stock_position_id, source_trade_id).
+
+    Union-find over one pass of the links, so this is linear in trades + positions.
+    Returns a list of (trades, positions) tuples.
+    """
+    parents = {('T', trade.id): ('T', trade.id) for trade in trades}
+    parents.update({('P', position.id): ('P', position.id) for position in positions})
+
+    for trade in trades:
+        if ('T', trade.parent_trade_id) in parents:
+            _union(parents, ('T', trade.parent_trade_id), ('T', trade.id))
+        if ('P', trade.stock_position_id) in parents:
+            _union(parents, ('P', trade.stock_position_id), ('T', trade.id))
+    for position in positions:
+        if ('T', position.source_trade_id) in parents:
+            _union(parents, ('T', position.source_trade_id), ('P', position.id))
+
+    groups = defaultdict(lambda: ([], []))
+    for trade in trades:
+        groups[_find(parents, ('T', trade.id))][0].append(trade)
+    for position in positions:
+        groups[_find(parents, ('P', position.id))][1].append(position)
+    return list(groups.values())
+
+def summarize_cycle(trades, positions, today=None):
+    """
+    Per-cycle metrics for one connected group.
+
+    total_premium is net of per-contract commissions (premium and close_premium
+    already include them); fees reports those commissions plus the assignment and
+    call-away fees for reference, and net_pnl subtracts only the latter. stock_gain is
+    (call strike - lot cost basis) on shares called away. capital is the larger of
+    the CSP collateral and the cost of the shares held.
+    """
+    today = today or date.today()
+    positions_by_id = {position.id: position for position in positions}
+
+    total_premium = 0.0
+    commissions = 0.0
+    assignment_fees = 0.0
+    stock_gain = 0.0
+    collateral = 0.0
+    end_dates = []
+    # handle_assigned stores the fee on both the CSP and its Assignment trade; count the Assignment's
+    fee_on_assignment = set(trade.parent_trade_id for trade in trades
+                            if trade.trade_type == 'Assignment' and trade.assignment_fee)
+
+    for trade in trades:
+        quantity = trade.contract_quantity or 1
+        total_premium += float(trade.premium) if trade.premium else 0
+        total_premium += float(trade.close_premium) if trade.close_premium else 0
+        commissions += (float(trade.fees) if trade.fees else 0) * quantity
+        commissions += (float(trade.close_fees) if trade.close_fees else 0) * quantity
+        if trade.assignment_fee and trade.id not in fee_on_assignment:
+            assignment_fees += float(trade.assignment_fee)
+        end_dates.append(trade.close_date or trade.trade_date)
+
+        if trade.trade_type == 'CSP' and trade.trade_action == 'Sold to Open' and trade.strike_price:
+            collateral = max(collateral, float(trade.strike_price) * quantity * 100)
+
+        # Shares called away: realize the stock move against the lot's cost basis
+        called_away = trade.status == 'Called Away' or trade.close_method == 'called_away'
+        position = positions_by_id.get(trade.stock_position_id)
+        if trade.trade_type == 'Covered Call' and called_away and position and trade.strike_price:
+            shares = trade.shares_used or quantity * 100
+            stock_gain += (float(trade.strike_price) - float(position.cost_basis_per_share)) * shares
+
+    share_cost = sum(float(p.cost_basis_per_share) * p.shares for p in positions if p.cost_basis_per_share)
+    capital = max(collateral, share_cost)
+
+    has_open_trade = any(trade.status == 'Open' for trade in trades)
+    has_open_lot = any(position.status == 'Open' for position in positions)
+    is_complete = not has_open_trade and not has_open_lot
+    if not positions:
+        stage = 'csp_open' if has_open_trade else 'csp_closed'
+    elif has_open_lot:
+        stage = 'holding_shares'
+    else:
+        stage = 'called_away'
+
+    start_date = min(trade.trade_date for trade in trades)
+    end_date = max(end_dates) if is_complete else today
+    duration_days = max((end_date - start_date).days, 1)
+
+    net_pnl = total_premium + stock_gain - assignment_fees
+    return_pct = None
+    annualized_return_pct = None
+    if capital > 0:
+        return_pct = round(net_pnl / capital * 100, 2)
+        # Compounded like Trade.calculate_time_based_return; very short cycles can overflow
+        if net_pnl / capital > -1:
+            try:
+                annualized_return_pct = round(((1 + net_pnl / capital) ** (365 / duration_days) - 1) * 100, 2)
+            except OverflowError:
+                annualized_return_pct = None
+
+    first_trade = min(trades, key=lambda t: (t.trade_date, t.id))
+    return {
+        'cycle_id': first_trade.id,
+        'account_id': first_trade.account_id,
+        'symbol': first_trade.symbol,
+        'stage': stage,
+        'is_complete': is_complete,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat() if is_complete else None,
+        'duration_days': duration_days,
+        'trade_count': len(trades),
+        'total_premium': round(total_premium, 2),
+        'stock_gain': round(stock_gain, 2),
+        'fees': round(commissions + assignment_fees, 2),
+        'net_pnl': round(net_pnl, 2),
+        'capital': round(capital, 2),
+        'return_pct': return_pct,
+        'annualized_return_pct': annualized_return_pct,
+        'trade_ids': sorted(trade.id for trade in trades)
+    }
+
+def get_wheel_cycles(account_ids, today=None):
+    """
+    Group every trade in the accounts into wheel cycles (two queries, one graph pass)
+    and return cycle summaries, newest first. Groups without any CSP, covered call,
+    assignment or stock position (e.g. LEAPS only) are not wheel cycles and are skipped.
+    """
+    trades = Trade.query.filter(Trade.account_id.in_(account_ids)).all()
+    positions = StockPosition.query.filter(StockPosition.account_id.in_(account_ids)).all()
+
+    cycles = []
+    for group_trades, group_positions in group_wheel_components(trades, positions):
+        if not group_trades:
+            continue  # Stock position entered by hand with no option trades
+        if not group_positions and not any(t.trade_type in WHEEL_TRADE_TYPES for t in group_trades):
+            continue
+        cycles.append(summarize_cycle(group_trades, group_positions, today))
+
+    cycles.sort(key=lambda cycle: (cycle['start_date'], cycle['cycle_id']), reverse=True)
+    return cycles
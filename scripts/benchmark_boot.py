@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Measure gunicorn worker boot time and per-worker memory, with and without --preload.
+
+Starts gunicorn from the backend directory against a temporary SQLite database,
+once per mode and run. A wrapper config loads backend/gunicorn.conf.py, forces
+preload_app on or off, and records when each worker is forked and when it has
+loaded the app. Once every worker is ready the script reads each worker's
+/proc/<pid>/smaps_rollup (Linux only):
+
+- RSS counts pages shared copy-on-write with the master in full for every worker
+- PSS splits shared pages between the processes sharing them
+- USS (private pages) is what each additional worker really costs
+
+no-preload only defers the import to the workers if the config's hooks don't load
+the app in the master themselves (backend/gunicorn.conf.py's when_ready does).
+Point --app-dir at a checkout of another commit to compare before and after.
+
+Usage:
+    python benchmark_boot.py [--workers 4] [--runs 3] [--modes preload,no-preload]
+                             [--app-dir ../backend] [--output results.json]
+"""
+import json
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+
+# Loads the app's own gunicorn.conf.py, then overrides preload and chains boot-time hooks
+WRAPPER_CONFIG = '''
+import os
+import time
+
+_conf = os.path.join(os.getcwd(), 'gunicorn.conf.py')
+if os.path.exists(_conf):
+    with open(_conf) as _f:
+        exec(compile(_f.read(), _conf, 'exec'))
+
+preload_app = os.environ['BOOT_BENCH_PRELOAD'] == '1'
+
+def _record(event, pid):
+    with open(os.environ['BOOT_BENCH_TIMES'], 'a') as f:
+        f.write(f'{event} {pid} {time.time()}\\n')
+
+_app_post_fork = globals().get('post_fork')
+_app_post_worker_init = globals().get('post_worker_init')
+
+def post_fork(server, worker):
+    _record('fork', os.getpid())
+    if _app_post_fork:
+        _app_post_fork(server, worker)
+
+def post_worker_init(worker):
+    if _app_post_worker_init:
+        _app_post_worker_init(worker)
+    _record('ready', os.getpid())
+'''
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _memory_kb(pid):
+    """Rss, Pss and private (USS) kB from /proc/<pid>/smaps_rollup"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+def _read_events(path):
+    events = {'fork': {}, 'ready': {}}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                event, pid, timestamp = line.split()
+                events[event][int(pid)] = float(timestamp)
+    return events
+
+def run_once(app_dir, workers, preload, timeout=120):
+    """Boot gunicorn once; returns timings (seconds) and memory (kB) for the master and each worker"""
+    work_dir = tempfile.mkdtemp(prefix='boot-bench-')
+    config_path = os.path.join(work_dir, 'gunicorn_wrapper.py')
+    with open(config_path, 'w') as f:
+        f.write(WRAPPER_CONFIG)
+    times_path = os.path.join(work_dir, 'times')
+    port = _free_port()
+
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(work_dir, 'bench.db')}",
+        'PROMETHEUS_MULTIPROC_DIR': os.path.join(work_dir, 'metrics'),
+        'BOOT_BENCH_PRELOAD': '1' if preload else '0',
+        'BOOT_BENCH_TIMES': times_path
+    })
+    for name in ('FLASK_ENV', 'RENDER', 'RENDER_EXTERNAL_URL'):
+        env.pop(name, None)
+    os.makedirs(env['PROMETHEUS_MULTIPROC_DIR'])
+
+    started = time.time()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '-c', config_path, '--workers', str(workers),
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+        cwd=app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    try:
+        while True:
+            events = _read_events(times_path)
+            if len(events['ready']) >= workers:
+                break
+            if server.poll() is not None:
+                raise RuntimeError(f'gunicorn exited: {server.stderr.read().decode()[-2000:]}')
+            if time.time() - started > timeout:
+                raise RuntimeError(f'workers not ready after {timeout}s')
+            time.sleep(0.02)
+        all_ready = max(events['ready'].values()) - started
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health', timeout=10) as response:
+            response.read()
+
+        worker_pids = sorted(events['ready'])
+        return {
+            'all_ready_s': all_ready,
+            'worker_boot_s': [events['ready'][pid] - events['fork'][pid] for pid in worker_pids],
+            'master': _memory_kb(server.pid),
+            'workers': [_memory_kb(pid) for pid in worker_pids]
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def summarize(runs):
+    median = statistics.median
+    return {
+        'all_ready_s': round(median(run['all_ready_s'] for run in runs), 3),
+        'worker_boot_s': round(median(median(run['worker_boot_s']) for run in runs), 3),
+        'master_rss_mb': round(median(run['master']['rss'] for run in runs) / 1024, 1),
+        'worker_rss_mb': round(median(median(w['rss'] for w in run['workers']) for run in runs) / 1024, 1),
+        'worker_pss_mb': round(median(median(w['pss'] for w in run['workers']) for run in runs) / 1024, 1),
+        'worker_uss_mb': round(median(median(w['uss'] for w in run['workers']) for run in runs) / 1024, 1),
+        'total_pss_mb': round(median(run['master']['pss'] + sum(w['pss'] for w in run['workers']) for run in runs) / 1024, 1)
+    }
+
+def main(workers, runs, modes, app_dir, output):
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        print("❌ /proc/<pid>/smaps_rollup is not available (Linux 4.14+ only)")
+        sys.exit(1)
+
+    results = {}
+    for mode in modes:
+        print(f"\n{mode}: {workers} workers x {runs} runs")
+        samples = []
+        for _ in range(runs):
+            sample = run_once(app_dir, workers, preload=(mode == 'preload'))
+            print(f"  all workers ready in {sample['all_ready_s']:.2f}s")
+            samples.append(sample)
+        results[mode] = summarize(samples)
+
+    print(f"\n{'='*80}")
+    print(f"Gunicorn boot: {workers} workers, median of {runs} runs ({app_dir})")
+    print(f"{'='*80}")
+    columns = [('all_ready_s', 'all ready s'), ('worker_boot_s', 'worker boot s'), ('master_rss_mb', 'master RSS'),
+               ('worker_rss_mb', 'worker RSS'), ('worker_pss_mb', 'worker PSS'), ('worker_uss_mb', 'worker USS'),
+               ('total_pss_mb', 'total PSS')]
+    print('mode'.ljust(12) + ''.join(f'{title:>14}' for _, title in columns))
+    for mode, summary in results.items():
+        print(mode.ljust(12) + ''.join(f'{summary[key]:>14}' for key, _ in columns))
+    print("(memory in MB)")
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"✓ Results written to {output}")
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Measure gunicorn worker boot time and per-worker memory')
+    parser.add_argument('--workers', type=int, default=4, help='Gunicorn worker processes')
+    parser.add_argument('--runs', type=int, default=3, help='Boots per mode')
+    parser.add_argument('--modes', default='preload,no-preload', help='Comma-separated: preload, no-preload')
+    parser.add_argument('--app-dir', default=BACKEND_DIR, help='Backend directory to boot (e.g. a checkout of an older commit)')
+    parser.add_argument('--output', help='Write results as JSON')
+    args = parser.parse_args()
+    main(args.workers, args.runs, args.modes.split(','), os.path.abspath(args.app_dir), args.output)
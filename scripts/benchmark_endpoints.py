@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Benchmark every dashboard, trades, accounts, stock position and import/export endpoint
+at several data sizes.
+
+For each size, seeds a temporary SQLite database with synthetic wheel-trading data
+(utils.synthetic_data: N users x M accounts x K trades per account, with single-entry
+closes, partial closes, assignments, called-away covered calls and LEAPS exercises),
+then calls each endpoint through the Flask test client as the first synthetic user.
+Finnhub is never called: the API key is blanked and the quote cache is pre-filled.
+
+Reports the median and cold (first call) latency, SQL query count (from the
+Server-Timing header) and response size per endpoint and size. Save a run with
+--output and compare a later run against it with --compare.
+
+Usage:
+    python benchmark_endpoints.py [--sizes 100,1000,5000] [--users 1] [--accounts 2] [--repeat 3]
+                                  [--only dashboard] [--output results.json] [--compare baseline.json]
+"""
+import io
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+BENCHMARKED_PREFIXES = ('/api/dashboard', '/api/trades', '/api/accounts', '/api/stock-positions')
+# Extra query strings for endpoints that do nothing useful without them
+QUERY_STRINGS = {
+    '/api/dashboard/market-data': 'symbols=AAPL,MSFT,TSLA',
+    '/api/dashboard/company-logos': 'symbols=AAPL,MSFT,TSLA',
+    '/api/dashboard/probability-of-profit': 'paths=5000'
+}
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+def _endpoint_cases(app, ids):
+    """(label, method, url, request kwargs or a callable returning them) for every benchmarked endpoint"""
+    cases = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if not rule.rule.startswith(BENCHMARKED_PREFIXES) or 'GET' not in rule.methods:
+            continue
+        if not set(rule.arguments) <= set(ids):
+            continue
+        url = rule.rule
+        for name in rule.arguments:
+            url = re.sub(rf'<(?:\w+:)?{name}>', str(ids[name]), url)
+        query = QUERY_STRINGS.get(rule.rule)
+        cases.append((f'GET {rule.rule}', 'GET', f'{url}?{query}' if query else url, {}))
+
+    cases.append(('GET /api/trades/export?format=xlsx', 'GET', '/api/trades/export?format=xlsx', {}))
+    cases.append(('POST /api/dashboard/stress-test', 'POST', '/api/dashboard/stress-test', {'json': {}}))
+    return cases
+
+def _time_case(client, headers, method, url, kwargs, repeat):
+    """Call once cold, then repeat times; returns the timing summary"""
+    samples = []
+    queries = None
+    status = None
+    size = 0
+    for _ in range(repeat + 1):
+        request_kwargs = kwargs() if callable(kwargs) else kwargs
+        started = time.perf_counter()
+        response = client.open(url, method=method, headers=headers, **request_kwargs)
+        body = response.get_data()
+        samples.append((time.perf_counter() - started) * 1000)
+        status = response.status_code
+        size = len(body)
+        match = SERVER_TIMING_QUERIES.search(response.headers.get('Server-Timing', ''))
+        queries = int(match.group(1)) if match else None
+    return {
+        'status': status,
+        'cold_ms': round(samples[0], 2),
+        'median_ms': round(statistics.median(samples[1:]), 2),
+        'min_ms': round(min(samples[1:]), 2),
+        'queries': queries,
+        'bytes': size
+    }
+
+def run_size(app, trades_per_account, users, accounts, repeat, only):
+    from flask_jwt_extended import create_access_token
+    from models import db, Account, Trade, StockPosition
+    from utils.synthetic_data import generate_wheel_data
+
+    with app.app_context():
+        started = time.perf_counter()
+        data = generate_wheel_data(users, accounts, trades_per_account, seed=trades_per_account,
+                                   email_prefix=f'bench-{trades_per_account}')
+        seed_seconds = time.perf_counter() - started
+        user_id = data['user_ids'][0]
+        account_ids = data['account_ids'][user_id]
+        ids = {
+            'account_id': account_ids[0],
+            'trade_id': Trade.query.filter_by(account_id=account_ids[0]).order_by(Trade.id).first().id,
+            'position_id': StockPosition.query.filter(StockPosition.account_id.in_(account_ids)).order_by(StockPosition.id).first().id
+        }
+        token = create_access_token(identity=str(user_id))
+    print(f"  seeded {data['trades']} trades, {data['stock_positions']} stock positions in {seed_seconds:.1f}s")
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    # Import: re-import this account's CSV export into a fresh empty account each call
+    export_csv = client.get(f'/api/trades/export?format=csv&account_id={ids["account_id"]}', headers=headers).get_data()
+
+    def import_request():
+        with app.app_context():
+            account = Account(user_id=user_id, name='Import target')
+            db.session.add(account)
+            db.session.commit()
+            account_id = account.id
+        return {'data': {'account_id': str(account_id), 'file': (io.BytesIO(export_csv), 'trades.csv')},
+                'content_type': 'multipart/form-data'}
+
+    cases = _endpoint_cases(app, ids)
+    cases.append(('POST /api/trades/import (csv)', 'POST', '/api/trades/import', import_request))
+
+    results = {}
+    for label, method, url, kwargs in cases:
+        if only and only not in label:
+            continue
+        results[label] = _time_case(client, headers, method, url, kwargs, repeat)
+    return results
+
+def print_report(results_by_size, baseline=None):
+    sizes = sorted(results_by_size, key=int)
+    labels = sorted(set(label for results in results_by_size.values() for label in results))
+    width = max(len(label) for label in labels) + 2
+
+    print(f"\n{'='*80}")
+    print("Endpoint benchmark: median ms / SQL queries per call (trades per account across)")
+    print(f"{'='*80}")
+    print('endpoint'.ljust(width) + ''.join(f'{size:>22}' for size in sizes))
+    for label in labels:
+        line = label.ljust(width)
+        for size in sizes:
+            result = results_by_size[size].get(label)
+            if not result:
+                line += f'{"-":>22}'
+                continue
+            cell = f"{result['median_ms']:.1f}ms/{result['queries'] if result['queries'] is not None else '?'}q"
+            previous = (baseline or {}).get(size, {}).get(label)
+            if previous and previous['median_ms'] > 0:
+                change = (result['median_ms'] - previous['median_ms']) / previous['median_ms'] * 100
+                cell += f' ({change:+.0f}%)'
+            if result['status'] >= 400:
+                cell = f"❌ {result['status']} " + cell
+            line += f'{cell:>22}'
+        print(line)
+
+def main(sizes, users, accounts, repeat, only, output, compare):
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    db_file.close()
+    # The app reads its configuration at import time
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_file.name}'
+    os.environ['FINNHUB_API_KEY'] = ''
+    os.environ.setdefault('SLOW_QUERY_MS', '100000')
+
+    try:
+        from app import app, initialize_database
+        from routes.dashboard import INDEX_SYMBOL_MAPPING, _set_cached_market_data
+        from utils.synthetic_data import SYMBOL_PRICES
+
+        initialize_database(app)
+        quotes = dict(SYMBOL_PRICES)
+        quotes.update({symbol: 50.0 for symbol, _ in INDEX_SYMBOL_MAPPING.values()})
+        for symbol, price in quotes.items():
+            _set_cached_market_data(symbol, {'current_price': price, 'previous_close': price, 'change': 0,
+                                             'change_percent': 0, 'high': price, 'low': price, 'open': price, 'timestamp': 0})
+
+        results_by_size = {}
+        for size in sizes:
+            print(f"\nSize: {users} user(s) x {accounts} account(s) x {size} trades")
+            results_by_size[str(size)] = run_size(app, size, users, accounts, repeat, only)
+
+        baseline = None
+        if compare:
+            with open(compare) as f:
+                baseline = json.load(f)
+        print_report(results_by_size, baseline)
+
+        failures = [label for results in results_by_size.values() for label, r in results.items() if r['status'] >= 400]
+        if failures:
+            print(f"\n❌ {len(failures)} calls returned an error status")
+        else:
+            print("\n✓ Every endpoint answered successfully")
+
+        if output:
+            with open(output, 'w') as f:
+                json.dump(results_by_size, f, indent=2, sort_keys=True)
+            print(f"✓ Results written to {output}")
+    finally:
+        os.unlink(db_file.name)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the API endpoints on synthetic wheel data')
+    parser.add_argument('--sizes', default='100,1000,5000', help='Comma-separated trades per account')
+    parser.add_argument('--users', type=int, default=1, help='Synthetic users per size')
+    parser.add_argument('--accounts', type=int, default=2, help='Accounts per user')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed calls per endpoint (after one cold call)')
+    parser.add_argument('--only', help='Only endpoints whose label contains this text')
+    parser.add_argument('--output', help='Write results as JSON')
+    parser.add_argument('--compare', help='Show changes against a previous --output file')
+    args = parser.parse_args()
+    main([int(size) for size in args.sizes.split(',')], args.users, args.accounts, args.repeat,
+         args.only, args.output, args.compare)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark the streaming (write-only) Excel export against the previous
+pandas ExcelWriter export.
+
+Seeds a temporary SQLite database with N trades for one account, then times both
+export paths and reports rows/second. Peak Python memory is measured with
+tracemalloc in a separate pass (--memory) because tracing slows both paths down
+by an order of magnitude.
+
+Usage:
+    python benchmark_excel_export.py [--rows 100000] [--memory]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+import pandas as pd
+from flask import Flask
+from models import db, User, Account, Trade
+from routes.trades import _stream_export_rows
+from utils.export_utils import write_streaming_workbook, TRADE_EXPORT_COLUMNS
+
+def seed(account_id, rows):
+    """Bulk insert synthetic trades without going through the ORM unit of work"""
+    start = date(2020, 1, 1)
+    batch = []
+    for i in range(rows):
+        trade_date = start + timedelta(days=i % 1500)
+        batch.append({
+            'account_id': account_id,
+            'symbol': ('AAPL', 'MSFT', 'TSLA', 'AMD', 'NVDA')[i % 5],
+            'trade_type': 'CSP',
+            'position_type': 'Open',
+            'strike_price': 100 + (i % 50),
+            'expiration_date': trade_date + timedelta(days=30),
+            'contract_quantity': 1 + (i % 3),
+            'trade_price': 1.25,
+            'trade_action': 'Sold to Open',
+            'premium': 125.00,
+            'fees': 0.65,
+            'trade_date': trade_date,
+            'status': 'Closed',
+            'close_date': trade_date + timedelta(days=10),
+            'close_premium': -25.00,
+            'close_method': 'buy_to_close',
+            'notes': f'Synthetic trade {i}'
+        })
+        if len(batch) == 10000:
+            db.session.execute(Trade.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Trade.__table__.insert(), batch)
+    db.session.commit()
+
+def export_with_pandas(account_id):
+    """Previous implementation: load ORM objects, build a DataFrame, write with ExcelWriter"""
+    trades = Trade.query.filter(Trade.account_id.in_([account_id])).order_by(Trade.trade_date.desc()).all()
+    data = {column: [] for column in TRADE_EXPORT_COLUMNS}
+    for trade in trades:
+        for column in TRADE_EXPORT_COLUMNS:
+            data[column].append(getattr(trade, column))
+    df = pd.DataFrame(data)
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='Trades')
+    return output.tell()
+
+def export_streaming(account_id):
+    """Current implementation: cursor rows straight into a write-only workbook"""
+    output = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    rows = _stream_export_rows(Trade, TRADE_EXPORT_COLUMNS, [account_id], Trade.trade_date.desc())
+    write_streaming_workbook(output, [('Trades', TRADE_EXPORT_COLUMNS, rows)])
+    return output.tell()
+
+def measure(label, func, account_id, rows, trace_memory):
+    db.session.expunge_all()
+    started = time.perf_counter()
+    size = func(account_id)
+    elapsed = time.perf_counter() - started
+    line = f"{label:<12} {elapsed:8.2f}s {rows / elapsed:10.0f} rows/s  file {size / 1024 / 1024:6.1f} MB"
+
+    if trace_memory:
+        db.session.expunge_all()
+        tracemalloc.start()
+        func(account_id)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        line += f"  peak {peak / 1024 / 1024:8.1f} MB"
+
+    print(line, flush=True)
+
+def main(rows, trace_memory):
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    db_file.close()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_file.name}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    try:
+        with app.app_context():
+            db.create_all()
+            user = User(email='bench@example.com', first_name='Bench', last_name='User', password_hash='x')
+            db.session.add(user)
+            db.session.flush()
+            account = Account(user_id=user.id, name='Bench', initial_balance=100000)
+            db.session.add(account)
+            db.session.commit()
+            account_id = account.id
+
+            print(f"Seeding {rows} trades...")
+            seed(account_id, rows)
+
+            print(f"\n{'='*80}")
+            print(f"Excel export benchmark ({rows} rows)")
+            print(f"{'='*80}")
+            measure('streaming', export_streaming, account_id, rows, trace_memory)
+            measure('pandas', export_with_pandas, account_id, rows, trace_memory)
+    finally:
+        os.unlink(db_file.name)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark streaming Excel export')
+    parser.add_argument('--rows', type=int, default=100000, help='Number of trades to export')
+    parser.add_argument('--memory', action='store_true', help='Also measure peak memory with tracemalloc (slow)')
+    args = parser.parse_args()
+    main(args.rows, args.memory)
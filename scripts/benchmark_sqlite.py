@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Benchmark mixed concurrent reads and writes against SQLite, comparing the legacy
+setup with the tuned profile (utils.sqlite_profile).
+
+- legacy: NullPool (a new connection per request), no pragmas, so rollback-journal
+  mode where a commit waits for every open reader
+- tuned:  the app's defaults, a small QueuePool and WAL, synchronous=NORMAL,
+  mmap_size, cache_size, busy_timeout and foreign_keys on every connection
+
+For each profile, seeds a fresh database file with synthetic wheel data, then runs
+--processes processes (like gunicorn workers) with --threads threads each for
+--duration seconds. Each thread calls the API through the Flask test client: a
+--write-ratio share of calls create a trade (POST /api/trades), the rest read
+(trade list, positions, accounts). Reports throughput, read/write p50/p95/p99 and
+errors (for SQLite mostly "database is locked").
+
+Usage:
+    python benchmark_sqlite.py [--processes 2] [--threads 4] [--duration 15] [--write-ratio 0.2]
+                               [--trades 500] [--profiles legacy,tuned] [--output results.json]
+"""
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+READ_PATHS = ['/api/trades?account_id={account_id}', '/api/dashboard/positions', '/api/accounts']
+
+def _profile_config(profile, database_path):
+    from sqlalchemy.pool import NullPool
+
+    config = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database_path}',
+        'FINNHUB_API_KEY': '',  # Never call Finnhub
+        'SLOW_QUERY_MS': 1e9
+    }
+    if profile == 'legacy':
+        config['SQLITE_PRAGMAS'] = {}
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = {'poolclass': NullPool, 'connect_args': {'check_same_thread': False}}
+    return config
+
+def _percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def seed(profile, database_path, trades):
+    """Create the schema and synthetic data; returns (token, account_ids)"""
+    from flask_jwt_extended import create_access_token
+    from app import create_app, initialize_database
+    from models import db
+    from utils.synthetic_data import generate_wheel_data
+
+    app = create_app(_profile_config(profile, database_path))
+    initialize_database(app)
+    with app.app_context():
+        data = generate_wheel_data(1, 2, trades, seed=48, email_prefix='sqlite-bench')
+        user_id = data['user_ids'][0]
+        token = create_access_token(identity=str(user_id))
+        db.engine.dispose()
+    return token, data['account_ids'][user_id]
+
+def _client_loop(app, token, account_ids, write_ratio, stop_at, samples, seed):
+    rng = random.Random(seed)
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    while time.time() < stop_at:
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                kind = 'write'
+                trade_date = date.today() - timedelta(days=rng.randint(0, 20))
+                response = client.post('/api/trades', headers=headers, json={
+                    'account_id': rng.choice(account_ids),
+                    'symbol': rng.choice(['AAPL', 'MSFT', 'TSLA', 'AMD']),
+                    'trade_type': 'CSP',
+                    'trade_action': 'Sold to Open',
+                    'strike_price': round(rng.uniform(10, 400), 2),
+                    'expiration_date': (trade_date + timedelta(days=30)).isoformat(),
+                    'contract_quantity': 1,
+                    'trade_price': round(rng.uniform(0.2, 5.0), 2),
+                    'fees': 0.65,
+                    'trade_date': trade_date.isoformat(),
+                    'status': 'Open'
+                })
+            else:
+                kind = 'read'
+                path = rng.choice(READ_PATHS).format(account_id=rng.choice(account_ids))
+                response = client.get(path, headers=headers)
+            status = response.status_code
+        except Exception:
+            status = 0
+        samples.append((kind, status, (time.perf_counter() - started) * 1000))
+
+def _run_process(profile, database_path, token, account_ids, threads, write_ratio, stop_at, process_index, results):
+    from app import create_app
+
+    app = create_app(_profile_config(profile, database_path))
+    samples = []  # list.append is atomic under the GIL
+    workers = [threading.Thread(target=_client_loop,
+                                args=(app, token, account_ids, write_ratio, stop_at, samples, process_index * 1000 + i))
+               for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put(samples)
+
+def run_profile(profile, processes, threads, duration, write_ratio, trades):
+    work_dir = tempfile.mkdtemp(prefix='sqlite-bench-')
+    database_path = os.path.join(work_dir, 'bench.db')
+    try:
+        token, account_ids = seed(profile, database_path, trades)
+
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        started = time.time()
+        stop_at = started + duration
+        children = [context.Process(target=_run_process, args=(profile, database_path, token, account_ids, threads,
+                                                               write_ratio, stop_at, i, results))
+                    for i in range(processes)]
+        for child in children:
+            child.start()
+        samples = []
+        for _ in children:
+            samples.extend(results.get())
+        for child in children:
+            child.join()
+        seconds = time.time() - started
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = {'ops_per_s': round(len(samples) / seconds, 1)}
+    for kind in ('read', 'write'):
+        rows = [(status, ms) for sample_kind, status, ms in samples if sample_kind == kind]
+        latencies = sorted(ms for _, ms in rows)
+        summary[kind] = {
+            'requests': len(rows),
+            'p50_ms': round(_percentile(latencies, 50), 1),
+            'p95_ms': round(_percentile(latencies, 95), 1),
+            'p99_ms': round(_percentile(latencies, 99), 1),
+            'errors': sum(1 for status, _ in rows if status == 0 or status >= 500)
+        }
+    return summary
+
+def main(processes, threads, duration, write_ratio, trades, profiles, output):
+    results = {}
+    for profile in profiles:
+        print(f"\n{profile}: {processes} process(es) x {threads} thread(s) for {duration}s, {write_ratio:.0%} writes")
+        results[profile] = run_profile(profile, processes, threads, duration, write_ratio, trades)
+
+    print(f"\n{'='*80}")
+    print(f"SQLite mixed read/write benchmark ({processes} x {threads}, {trades} trades per account)")
+    print(f"{'='*80}")
+    print(f"{'profile':<10}{'ops/s':>8}  {'read p50/p95/p99 ms':>22}{'write p50/p95/p99 ms':>24}{'errors':>9}")
+    for profile, summary in results.items():
+        read, write = summary['read'], summary['write']
+        print(f"{profile:<10}{summary['ops_per_s']:>8.1f}  "
+              f"{read['p50_ms']:>8.0f}{read['p95_ms']:>7.0f}{read['p99_ms']:>7.0f}"
+              f"{write['p50_ms']:>10.0f}{write['p95_ms']:>7.0f}{write['p99_ms']:>7.0f}"
+              f"{read['errors'] + write['errors']:>9}")
+
+    failed = sum(summary['read']['errors'] + summary['write']['errors'] for summary in results.values())
+    if failed:
+        print(f"\n❌ {failed} requests failed")
+    else:
+        print("\n✓ No failed requests")
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"✓ Results written to {output}")
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark concurrent SQLite reads and writes: legacy vs tuned profile')
+    parser.add_argument('--processes', type=int, default=2, help='Worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per process')
+    parser.add_argument('--duration', type=int, default=15, help='Seconds per profile')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='Share of calls that create a trade')
+    parser.add_argument('--trades', type=int, default=500, help='Seeded trades per account')
+    parser.add_argument('--profiles', default='legacy,tuned', help='Comma-separated: legacy, tuned')
+    parser.add_argument('--output', help='Write results as JSON')
+    args = parser.parse_args()
+    main(args.processes, args.threads, args.duration, args.write_ratio, args.trades,
+         args.profiles.split(','), args.output)
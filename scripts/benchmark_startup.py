@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Measure the cost of importing the app, which every gunicorn worker pays on a cold start.
+
+Imports the module in fresh interpreters under `python -X importtime` and reports
+the median total, the packages with the largest cumulative import time and the
+modules with the largest self time. Flags any of utils.import_time.LAZY_IMPORTS
+(pandas, openpyxl) that the import loaded. Save a run with --output and compare a
+later one against it with --compare.
+
+Usage:
+    python benchmark_startup.py [--module app] [--runs 7] [--top 15]
+                                [--output results.json] [--compare baseline.json]
+"""
+import json
+import os
+import statistics
+import sys
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+def _change(value, previous):
+    if not previous:
+        return ''
+    return f' ({(value - previous) / previous * 100:+.0f}%)'
+
+def main(module, runs, top, output, compare):
+    from utils.import_time import measure_import, top_level_packages, LAZY_IMPORTS
+
+    samples = [measure_import(module) for _ in range(runs)]
+    median_run = sorted(samples, key=lambda run: run['total_ms'])[len(samples) // 2]
+    packages = top_level_packages(median_run['modules'])
+    results = {
+        'total_ms': round(statistics.median(run['total_ms'] for run in samples), 1),
+        'modules_loaded': len(median_run['modules']),
+        'packages_ms': {name: round(ms, 1) for name, ms in packages.items()}
+    }
+    baseline = None
+    if compare:
+        with open(compare) as f:
+            baseline = json.load(f)
+
+    print(f"\n{'='*80}")
+    print(f"import {module}: median of {runs} runs")
+    print(f"{'='*80}")
+    print(f"Total: {results['total_ms']:.1f} ms{_change(results['total_ms'], (baseline or {}).get('total_ms'))}, "
+          f"{results['modules_loaded']} modules")
+
+    print(f"\nLargest packages (cumulative ms):")
+    for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        previous = (baseline or {}).get('packages_ms', {}).get(name)
+        print(f"  {name:<40} {ms:>9.1f}{_change(ms, previous)}")
+
+    print(f"\nSlowest modules (self ms):")
+    for name, timing in sorted(median_run['modules'].items(), key=lambda item: -item[1]['self_ms'])[:top]:
+        print(f"  {name:<60} {timing['self_ms']:>9.1f}")
+
+    lazy_loaded = sorted(set(name.split('.')[0] for name in median_run['modules']) & set(LAZY_IMPORTS))
+    if lazy_loaded:
+        print(f"\n❌ import {module} loaded {', '.join(lazy_loaded)}; these should be imported where they are used")
+    else:
+        print(f"\n✓ None of {', '.join(LAZY_IMPORTS)} loaded at import")
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"✓ Results written to {output}")
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Measure app import time with python -X importtime')
+    parser.add_argument('--module', default='app', help='Module to import (from backend/)')
+    parser.add_argument('--runs', type=int, default=7, help='Fresh interpreters to time')
+    parser.add_argument('--top', type=int, default=15, help='Packages and modules to list')
+    parser.add_argument('--output', help='Write results as JSON')
+    parser.add_argument('--compare', help='Show changes against a previous --output file')
+    args = parser.parse_args()
+    main(args.module, args.runs, args.top, args.output, args.compare)
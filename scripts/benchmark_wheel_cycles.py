@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark the wheel-cycle engine on synthetic accounts.
+
+Seeds a temporary SQLite database with N complete wheels per account (CSP ->
+assignment -> stock lot -> covered calls -> called away) plus some CSPs that
+expire worthless, then times get_wheel_cycles and reports cycles/second and
+the number of SQL statements issued.
+
+Usage:
+    python benchmark_wheel_cycles.py [--accounts 5] [--cycles 2000]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from flask import Flask
+from sqlalchemy import event
+from models import db, User, Account, Trade, StockPosition
+from utils.wheel_cycles import get_wheel_cycles
+
+SYMBOLS = ('AAPL', 'MSFT', 'TSLA', 'AMD', 'NVDA')
+CALLS_PER_WHEEL = 3
+
+def _option(account_id, trade_id, symbol, trade_type, trade_date, strike, premium, status, **kwargs):
+    row = {
+        'id': trade_id,
+        'account_id': account_id,
+        'symbol': symbol,
+        'trade_type': trade_type,
+        'position_type': 'Open',
+        'strike_price': strike,
+        'expiration_date': trade_date + timedelta(days=30),
+        'contract_quantity': 1,
+        'trade_action': 'Sold to Open',
+        'premium': premium,
+        'fees': 0.65,
+        'trade_date': trade_date,
+        'status': status,
+        'close_date': trade_date + timedelta(days=30),
+        'parent_trade_id': None,
+        'stock_position_id': None,
+        'shares_used': None,
+        'assignment_price': None
+    }
+    row.update(kwargs)
+    return row
+
+def seed(account_ids, cycles_per_account):
+    """Bulk insert synthetic wheels with explicit ids so the links can be set up front"""
+    trades = []
+    positions = []
+    trade_id = 0
+    position_id = 0
+    start = date(2018, 1, 1)
+
+    for account_id in account_ids:
+        for i in range(cycles_per_account):
+            symbol = SYMBOLS[i % len(SYMBOLS)]
+            strike = 50 + (i % 100)
+            day = start + timedelta(days=(i * 7) % 2500)
+
+            trade_id += 1
+            csp_id = trade_id
+            if i % 4 == 3:
+                # Every fourth CSP expires worthless: a one-trade cycle
+                trades.append(_option(account_id, csp_id, symbol, 'CSP', day, strike, 150.00, 'Expired'))
+                continue
+            trades.append(_option(account_id, csp_id, symbol, 'CSP', day, strike, 150.00, 'Assigned'))
+
+            trade_id += 1
+            assignment_id = trade_id
+            day += timedelta(days=30)
+            trades.append(_option(account_id, assignment_id, symbol, 'Assignment', day, strike, 0, 'Assigned',
+                                  position_type='Assignment', trade_action=None, parent_trade_id=csp_id,
+                                  assignment_price=strike))
+
+            position_id += 1
+            positions.append({
+                'id': position_id,
+                'account_id': account_id,
+                'symbol': symbol,
+                'shares': 100,
+                'cost_basis_per_share': strike - 1.5,
+                'acquired_date': day,
+                'status': 'Called Away',
+                'source_trade_id': assignment_id
+            })
+
+            for call in range(CALLS_PER_WHEEL):
+                trade_id += 1
+                last = call == CALLS_PER_WHEEL - 1
+                trades.append(_option(account_id, trade_id, symbol, 'Covered Call', day, strike + 2, 80.00,
+                                      'Called Away' if last else 'Expired', stock_position_id=position_id,
+                                      shares_used=100))
+                day += timedelta(days=30)
+
+    for i in range(0, len(positions), 10000):
+        db.session.execute(StockPosition.__table__.insert(), positions[i:i + 10000])
+    for i in range(0, len(trades), 10000):
+        db.session.execute(Trade.__table__.insert(), trades[i:i + 10000])
+    db.session.commit()
+    return len(trades), len(positions)
+
+def main(accounts, cycles):
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    db_file.close()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_file.name}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    try:
+        with app.app_context():
+            db.create_all()
+            user = User(email='bench@example.com', first_name='Bench', last_name='User', password_hash='x')
+            db.session.add(user)
+            db.session.flush()
+            account_ids = []
+            for n in range(accounts):
+                account = Account(user_id=user.id, name=f'Bench {n + 1}', initial_balance=100000)
+                db.session.add(account)
+                db.session.flush()
+                account_ids.append(account.id)
+            db.session.commit()
+
+            print(f"Seeding {cycles} cycles in each of {accounts} accounts...")
+            trade_count, position_count = seed(account_ids, cycles)
+
+            statements = []
+            count = lambda *args: statements.append(1)
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                db.session.expunge_all()
+                started = time.perf_counter()
+                result = get_wheel_cycles(account_ids)
+                elapsed = time.perf_counter() - started
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+
+            print(f"\n{'='*80}")
+            print(f"Wheel cycle benchmark ({trade_count} trades, {position_count} stock positions)")
+            print(f"{'='*80}")
+            print(f"cycles       {len(result):8d}")
+            print(f"elapsed      {elapsed:8.2f}s {len(result) / elapsed:10.0f} cycles/s")
+            print(f"SQL queries  {len(statements):8d}")
+            if len(result) != accounts * cycles:
+                print(f"❌ Expected {accounts * cycles} cycles")
+            else:
+                print("✓ Every synthetic wheel was found")
+    finally:
+        os.unlink(db_file.name)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the wheel-cycle engine')
+    parser.add_argument('--accounts', type=int, default=5, help='Number of synthetic accounts')
+    parser.add_argument('--cycles', type=int, default=2000, help='Wheel cycles per account')
+    args = parser.parse_args()
+    main(args.accounts, args.cycles)
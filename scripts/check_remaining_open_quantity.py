@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Check the stored remaining_open_quantity of every opening trade against the
+count derived from its closing trades.
+
+The close handlers and the commit hook keep the column current; mismatches mean
+something wrote trades outside the app (raw SQL, restores) or a bug. Note that a
+partial LEAPS exercise records no closing trade, so the stored count (which the
+exercise did reduce) is reported as differing from the derived one; review those
+before running with --fix.
+
+Usage:
+    python check_remaining_open_quantity.py [--account-id ACCOUNT_ID ...] [--fix]
+
+    Exits with status 1 if mismatches are found and --fix is not given.
+    Uses DATABASE_URL from the environment / .env, like the app.
+"""
+import os
+import sys
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from app import app
+from models import db
+from utils.open_quantity import check_remaining_open_quantities
+from utils.statement_timeout import statement_timeout
+
+def check(account_ids=None, fix=False):
+    with app.app_context(), statement_timeout(app.config['DB_LONG_STATEMENT_TIMEOUT_MS']):
+        print(f"\n{'='*80}")
+        print("Check remaining_open_quantity")
+        print(f"{'='*80}")
+        if account_ids:
+            print(f"Accounts: {', '.join(str(account_id) for account_id in account_ids)}")
+        else:
+            print("Accounts: all")
+
+        try:
+            mismatches = check_remaining_open_quantities(account_ids, fix=fix)
+            if fix:
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Check failed: {e}")
+            sys.exit(1)
+
+        if not mismatches:
+            print("✓ All opening trades match their closing trades")
+            return
+
+        for mismatch in mismatches:
+            print(f"  Trade #{mismatch['trade_id']} ({mismatch['symbol']}, account {mismatch['account_id']}): "
+                  f"stored {mismatch['stored']}, derived {mismatch['derived']}")
+        if fix:
+            print(f"✓ Fixed {len(mismatches)} trades")
+        else:
+            print(f"❌ {len(mismatches)} trades out of sync (run with --fix to repair)")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Verify the denormalized remaining_open_quantity column')
+    parser.add_argument('--account-id', type=int, action='append', dest='account_ids',
+                        help='Only check this account (repeatable)')
+    parser.add_argument('--fix', action='store_true', help='Overwrite mismatches with the derived value')
+    args = parser.parse_args()
+    check(args.account_ids, args.fix)
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Load test the API with many concurrent, authenticated virtual users.
+
+Seeds a database with synthetic wheel-trading data (utils.synthetic_data) and mints a
+JWT for each synthetic user with create_access_token. Then starts a local Finnhub stub
+(quotes and logos with a configurable delay) and a gunicorn server pointed at both.
+--users virtual users then run for --duration seconds. Each one repeatedly picks an
+action from ACTION_WEIGHTS (dashboard polls, trade list, trade creates, closes of the
+trades it created, small CSV imports) and waits a random think time between actions.
+
+Reports throughput, p50/p95/p99 latency and error rate per endpoint, so gunicorn worker
+and thread counts can be sized from measurements (--workers, --threads).
+
+To drive a server you started yourself, pass --url. That server must use the same
+DATABASE_URL and JWT_SECRET_KEY as this script (both read from the environment).
+
+Usage:
+    python load_test.py [--users 20] [--duration 60] [--ramp-up 5] [--think-ms 500]
+                        [--workers 2] [--threads 4] [--seed-users 5] [--accounts 1] [--trades 500]
+                        [--finnhub-latency-ms 150] [--url http://127.0.0.1:5000] [--output results.json]
+"""
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+
+# Add backend directory to path
+sys.path.insert(0, BACKEND_DIR)
+
+# Relative frequency of each virtual-user action
+ACTION_WEIGHTS = {
+    'GET /api/dashboard/pnl': 20,
+    'GET /api/dashboard/positions': 15,
+    'GET /api/dashboard/market-data': 10,
+    'GET /api/dashboard/ticker-performance': 8,
+    'GET /api/dashboard/open-positions-allocation': 5,
+    'GET /api/dashboard/summary': 4,
+    'GET /api/trades': 10,
+    'POST /api/trades': 12,
+    'POST /api/trades/<id>/close': 10,
+    'POST /api/trades/import': 2
+}
+IMPORT_ROWS = 5
+
+class FinnhubStub(BaseHTTPRequestHandler):
+    """Answers /quote and /stock/profile2 like Finnhub, after latency seconds"""
+    latency = 0.0
+    prices = {}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        symbol = parse_qs(url.query).get('symbol', [''])[0].upper()
+        time.sleep(self.latency)
+        price = self.prices.get(symbol, 100.0) * random.uniform(0.99, 1.01)
+        if url.path.endswith('/quote'):
+            body = {'c': round(price, 2), 'pc': round(price * 0.995, 2), 'h': round(price * 1.01, 2),
+                    'l': round(price * 0.99, 2), 'o': round(price, 2), 't': int(time.time())}
+        elif url.path.endswith('/stock/profile2'):
+            body = {'logo': f'https://static.example.com/logos/{symbol}.png', 'ticker': symbol}
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def seed(seed_users, accounts, trades):
+    """Seed synthetic users and return [(token, account_ids, symbols)] per user"""
+    from flask_jwt_extended import create_access_token
+    from app import app, initialize_database
+    from utils.synthetic_data import generate_wheel_data, SYMBOL_PRICES
+
+    initialize_database(app)
+    with app.app_context():
+        started = time.perf_counter()
+        data = generate_wheel_data(seed_users, accounts, trades, seed=int(time.time()),
+                                   email_prefix='loadtest')
+        print(f"✓ Seeded {data['trades']} trades for {seed_users} users in {time.perf_counter() - started:.1f}s")
+        return [
+            (create_access_token(identity=str(user_id)), data['account_ids'][user_id], list(SYMBOL_PRICES))
+            for user_id in data['user_ids']
+        ]
+
+def start_server(port, workers, threads):
+    """Start gunicorn from backend/ and wait until /api/health answers"""
+    import requests
+
+    command = [sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--threads', str(threads), '--log-level', 'warning']
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=os.environ.copy())
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with code {server.returncode}')
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/api/health', timeout=1).status_code == 200:
+                return server
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    server.terminate()
+    raise RuntimeError('gunicorn did not answer /api/health within 60s')
+
+class VirtualUser(threading.Thread):
+    """One simulated user: a keep-alive session looping over weighted actions until stop_at"""
+
+    def __init__(self, base_url, token, account_ids, symbols, think_ms, start_at, stop_at, samples, seed):
+        super().__init__(daemon=True)
+        import requests
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f'Bearer {token}'
+        self.base_url = base_url
+        self.account_ids = account_ids
+        self.symbols = symbols
+        self.think_ms = think_ms
+        self.start_at = start_at
+        self.stop_at = stop_at
+        self.samples = samples
+        self.rng = random.Random(seed)
+        self.open_trade_ids = []  # CSPs this user created and can still close
+        self.actions = list(ACTION_WEIGHTS)
+        self.weights = [ACTION_WEIGHTS[action] for action in self.actions]
+
+    def _request(self, label, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=60, **kwargs)
+            status = response.status_code
+        except Exception:
+            response, status = None, 0
+        self.samples.append((label, status, (time.perf_counter() - started) * 1000))
+        return response if status and status < 400 else None
+
+    def _new_csp(self):
+        symbol = self.rng.choice(self.symbols)
+        trade_date = date.today() - timedelta(days=self.rng.randint(0, 20))
+        return {
+            'account_id': self.rng.choice(self.account_ids),
+            'symbol': symbol,
+            'trade_type': 'CSP',
+            'trade_action': 'Sold to Open',
+            'strike_price': round(self.rng.uniform(10, 400), 2),
+            'expiration_date': (trade_date + timedelta(days=self.rng.choice((7, 14, 30, 45)))).isoformat(),
+            'contract_quantity': self.rng.randint(1, 3),
+            'trade_price': round(self.rng.uniform(0.2, 5.0), 2),
+            'fees': 0.65,
+            'trade_date': trade_date.isoformat(),
+            'status': 'Open'
+        }
+
+    def _import_csv(self):
+        columns = ['symbol', 'trade_type', 'trade_action', 'strike_price', 'expiration_date',
+                   'contract_quantity', 'trade_price', 'premium', 'fees', 'trade_date', 'status']
+        lines = [','.join(columns)]
+        for _ in range(IMPORT_ROWS):
+            trade = self._new_csp()
+            trade['premium'] = round(trade['trade_price'] * trade['contract_quantity'] * 100 - trade['fees'], 2)
+            lines.append(','.join(str(trade[column]) for column in columns))
+        return '\n'.join(lines).encode('utf-8')
+
+    def act(self, action):
+        if action == 'POST /api/trades/<id>/close' and not self.open_trade_ids:
+            action = 'POST /api/trades'
+
+        if action == 'GET /api/dashboard/market-data':
+            symbols = ','.join(self.rng.sample(self.symbols, 3))
+            self._request(action, 'GET', f'/api/dashboard/market-data?symbols={symbols}')
+        elif action == 'POST /api/trades':
+            response = self._request(action, 'POST', '/api/trades', json=self._new_csp())
+            if response is not None:
+                self.open_trade_ids.append(response.json()['id'])
+        elif action == 'POST /api/trades/<id>/close':
+            trade_id = self.open_trade_ids.pop(self.rng.randrange(len(self.open_trade_ids)))
+            self._request(action, 'POST', f'/api/trades/{trade_id}/close', json={
+                'close_method': 'buy_to_close',
+                'close_date': date.today().isoformat(),
+                'trade_price': round(self.rng.uniform(0.05, 1.0), 2),
+                'fees': 0.65
+            })
+        elif action == 'POST /api/trades/import':
+            self._request(action, 'POST', '/api/trades/import', data={'account_id': str(self.rng.choice(self.account_ids))},
+                          files={'file': ('loadtest.csv', io.BytesIO(self._import_csv()), 'text/csv')})
+        else:
+            method, path = action.split(' ', 1)
+            self._request(action, method, path)
+
+    def run(self):
+        time.sleep(max(0.0, self.start_at - time.time()))
+        while time.time() < self.stop_at:
+            self.act(self.rng.choices(self.actions, self.weights)[0])
+            time.sleep(self.rng.uniform(0.5, 1.5) * self.think_ms / 1000)
+
+def summarize(samples, seconds):
+    """Per-endpoint (and total) requests, throughput, latency percentiles and error rate"""
+    by_label = {}
+    for label, status, elapsed_ms in samples:
+        by_label.setdefault(label, []).append((status, elapsed_ms))
+    by_label['TOTAL'] = [(status, elapsed_ms) for _, status, elapsed_ms in samples]
+
+    summary = {}
+    for label, rows in by_label.items():
+        latencies = sorted(elapsed_ms for _, elapsed_ms in rows)
+        errors = sum(1 for status, _ in rows if status == 0 or status >= 400)
+        summary[label] = {
+            'requests': len(rows),
+            'rps': round(len(rows) / seconds, 2),
+            'p50_ms': round(_percentile(latencies, 50), 1),
+            'p95_ms': round(_percentile(latencies, 95), 1),
+            'p99_ms': round(_percentile(latencies, 99), 1),
+            'max_ms': round(latencies[-1], 1) if latencies else 0.0,
+            'error_rate': round(errors / len(rows), 4) if rows else 0.0
+        }
+    return summary
+
+def print_report(summary, seconds, users, workers, threads):
+    print(f"\n{'='*80}")
+    print(f"Load test: {users} virtual users for {seconds:.0f}s"
+          + (f" against {workers} worker(s) x {threads} thread(s)" if workers else ''))
+    print(f"{'='*80}")
+    width = max(len(label) for label in summary) + 2
+    print('endpoint'.ljust(width) + f"{'reqs':>7}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>9}")
+    for label in sorted(summary, key=lambda label: (label == 'TOTAL', label)):
+        row = summary[label]
+        print(label.ljust(width) + f"{row['requests']:>7}{row['rps']:>8.1f}{row['p50_ms']:>8.0f}ms"
+              f"{row['p95_ms']:>7.0f}ms{row['p99_ms']:>7.0f}ms{row['error_rate'] * 100:>8.1f}%")
+
+def main(users, duration, ramp_up, think_ms, workers, threads, seed_users, accounts, trades,
+         finnhub_latency_ms, url, output):
+    db_file = None
+    if url:
+        workers = threads = None
+    elif not os.getenv('DATABASE_URL'):
+        db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        db_file.close()
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_file.name}'
+    # The app reads its configuration at import time, and gunicorn inherits this environment
+    os.environ.setdefault('JWT_SECRET_KEY', os.urandom(24).hex())
+    os.environ.setdefault('SLOW_QUERY_MS', '100000')
+
+    stub = None
+    server = None
+    try:
+        if not url:
+            from utils.synthetic_data import SYMBOL_PRICES
+            FinnhubStub.latency = finnhub_latency_ms / 1000
+            FinnhubStub.prices = SYMBOL_PRICES
+            stub = ThreadingHTTPServer(('127.0.0.1', 0), FinnhubStub)
+            threading.Thread(target=stub.serve_forever, daemon=True).start()
+            os.environ['FINNHUB_API_KEY'] = 'loadtest'
+            os.environ['FINNHUB_BASE_URL'] = f'http://127.0.0.1:{stub.server_address[1]}'
+            print(f"✓ Finnhub stub on {os.environ['FINNHUB_BASE_URL']} ({finnhub_latency_ms} ms per call)")
+
+        seeded = seed(seed_users, accounts, trades)
+
+        if not url:
+            port = _free_port()
+            server = start_server(port, workers, threads)
+            url = f'http://127.0.0.1:{port}'
+            print(f"✓ gunicorn on {url} ({workers} worker(s) x {threads} thread(s))")
+
+        samples = []  # (label, status, ms); list.append is atomic under the GIL
+        started = time.time()
+        stop_at = started + duration
+        virtual_users = []
+        for i in range(users):
+            token, account_ids, symbols = seeded[i % len(seeded)]
+            start_at = started + (ramp_up * i / users if users else 0)
+            virtual_users.append(VirtualUser(url.rstrip('/'), token, account_ids, symbols, think_ms,
+                                             start_at, stop_at, samples, seed=i))
+        print(f"Running {users} virtual users for {duration}s (ramp-up {ramp_up}s)...")
+        for virtual_user in virtual_users:
+            virtual_user.start()
+        for virtual_user in virtual_users:
+            virtual_user.join()
+        seconds = time.time() - started
+
+        summary = summarize(samples, seconds)
+        print_report(summary, seconds, users, workers, threads)
+
+        error_rate = summary['TOTAL']['error_rate'] if samples else 0
+        if error_rate:
+            print(f"\n❌ {error_rate * 100:.1f}% of requests failed")
+        else:
+            print("\n✓ No failed requests")
+
+        if output:
+            with open(output, 'w') as f:
+                json.dump({'users': users, 'duration': round(seconds, 1), 'workers': workers, 'threads': threads,
+                           'endpoints': summary}, f, indent=2, sort_keys=True)
+            print(f"✓ Results written to {output}")
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+        if stub:
+            stub.shutdown()
+        if db_file:
+            os.unlink(db_file.name)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Load test the API with concurrent authenticated virtual users')
+    parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+    parser.add_argument('--duration', type=int, default=60, help='Seconds to run')
+    parser.add_argument('--ramp-up', type=float, default=5, help='Seconds over which virtual users start')
+    parser.add_argument('--think-ms', type=int, default=500, help='Mean pause between a user\'s actions')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--seed-users', type=int, default=5, help='Synthetic users to seed (virtual users share them)')
+    parser.add_argument('--accounts', type=int, default=1, help='Accounts per seeded user')
+    parser.add_argument('--trades', type=int, default=500, help='Trades per seeded account')
+    parser.add_argument('--finnhub-latency-ms', type=int, default=150, help='Delay of each stubbed Finnhub call')
+    parser.add_argument('--url', help='Drive an already running server instead of starting gunicorn')
+    parser.add_argument('--output', help='Write results as JSON')
+    args = parser.parse_args()
+    main(args.users, args.duration, args.ramp_up, args.think_ms, args.workers, args.threads, args.seed_users,
+         args.accounts, args.trades, args.finnhub_latency_ms, args.url, args.output)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Apply pending schema migrations (utils.migrations) and show the applied history.
+
+The gunicorn master migrates before it forks the workers if it finds the schema
+behind (under a database lock, so only one server does the work), but running this
+as the deploy's release / pre-deploy command keeps that work out of server start-up
+entirely: boot is then a single version check.
+
+Usage:
+    python migrate.py
+
+    Uses DATABASE_URL from the environment / .env, like the app.
+"""
+import os
+import sys
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from sqlalchemy import text
+from app import app
+from models import db
+from utils.migrations import run_migrations, get_schema_version, LATEST_VERSION
+
+def migrate():
+    with app.app_context():
+        print(f"\n{'='*80}")
+        print("Schema Migrations")
+        print(f"{'='*80}")
+
+        try:
+            run_migrations()
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            sys.exit(1)
+
+        with db.engine.connect() as conn:
+            rows = conn.execute(text('SELECT version, name, applied_at FROM schema_version ORDER BY version')).all()
+        for version, name, applied_at in rows:
+            print(f"  {version:>3}  {name:<40} {applied_at}")
+
+        version = get_schema_version()
+        if version < LATEST_VERSION:
+            print(f"❌ Schema at version {version}, expected {LATEST_VERSION}")
+            sys.exit(1)
+        print(f"✓ Schema at version {version}")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Rebuild the monthly_pnl rollup table from trades.
+
+The rollup is kept up to date automatically whenever trades are committed. Run
+this after bulk changes made outside the app (raw SQL, restores, data fixes) or
+if the monthly returns on the dashboard look out of sync with the trades.
+
+Usage:
+    python rebuild_monthly_pnl.py [--account-id ACCOUNT_ID ...]
+
+    Uses DATABASE_URL from the environment / .env, like the app.
+"""
+import os
+import sys
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from app import app
+from models import db, MonthlyPnl
+from utils.statement_timeout import statement_timeout
+
+def rebuild(account_ids=None):
+    # Rebuilding every account can outlast the interactive statement timeout
+    with app.app_context(), statement_timeout(app.config['DB_LONG_STATEMENT_TIMEOUT_MS']):
+        print(f"\n{'='*80}")
+        print("Rebuild Monthly P&L Rollup")
+        print(f"{'='*80}")
+        if account_ids:
+            print(f"Accounts: {', '.join(str(account_id) for account_id in account_ids)}")
+        else:
+            print("Accounts: all")
+        
+        try:
+            rows = MonthlyPnl.rebuild(db.session, account_ids)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Rebuild failed: {e}")
+            sys.exit(1)
+        
+        print(f"✓ Wrote {rows} account-month rows")
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Rebuild the monthly_pnl rollup table')
+    parser.add_argument('--account-id', type=int, action='append', dest='account_ids',
+                        help='Only rebuild this account (repeatable)')
+    args = parser.parse_args()
+    rebuild(args.account_ids)
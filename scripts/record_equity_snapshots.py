@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Record daily account snapshots for the equity curve.
+
+Run once a day (e.g. from cron) to append today's snapshot for every account.
+Accounts with no snapshots yet get their full history backfilled first, as do the
+days dropped when an earlier trade or cash flow was changed. The equity-curve
+endpoint computes days that aren't recorded on the fly without storing them, so a
+missed run only makes it slower.
+
+Pass --backfill to rebuild history from scratch after changing data outside the app.
+
+Usage:
+    python record_equity_snapshots.py [--backfill] [--account-id ACCOUNT_ID ...]
+
+    Uses DATABASE_URL from the environment / .env, like the app.
+"""
+import os
+import sys
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from app import app
+from models import db, Account
+from utils.equity_snapshots import backfill_account_snapshots, ensure_snapshots
+from utils.statement_timeout import statement_timeout
+
+def record(backfill=False, account_ids=None):
+    with app.app_context(), statement_timeout(app.config['DB_LONG_STATEMENT_TIMEOUT_MS']):
+        if not account_ids:
+            account_ids = [account_id for (account_id,) in db.session.query(Account.id)]
+        
+        print(f"\n{'='*80}")
+        print("Backfill Equity Snapshots" if backfill else "Record Equity Snapshots")
+        print(f"{'='*80}")
+        print(f"Accounts: {len(account_ids)}")
+        
+        try:
+            if backfill:
+                for account in Account.query.filter(Account.id.in_(account_ids)):
+                    rows = backfill_account_snapshots(account)
+                    print(f"✓ Account {account.id}: {rows} days")
+            ensure_snapshots(account_ids)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Snapshot run failed: {e}")
+            sys.exit(1)
+        
+        print("✓ Snapshots up to date")
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Record daily equity snapshots')
+    parser.add_argument('--backfill', action='store_true', help='Rebuild full history instead of only appending')
+    parser.add_argument('--account-id', type=int, action='append', dest='account_ids',
+                        help='Only process this account (repeatable)')
+    args = parser.parse_args()
+    record(args.backfill, args.account_ids)